@@ -1,27 +1,28 @@
 # 1.before_trans.py (수정: -l 옵션 필수 추가, collect_srt 후 rename_all.py 호출)
 import argparse
-import subprocess
 from pathlib import Path
 import os
 from utils import get_srt_home
-
-def run_command(cmd):
-    try:
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        print(result.stdout)
-        if result.stderr:
-            print(f"경고: {result.stderr}")
-    except subprocess.CalledProcessError as e:
-        print(f"오류: 명령어 실행 실패 - {e}")
-        print(f"stdout: {e.stdout}")
-        print(f"stderr: {e.stderr}")
-        raise
+from pipeline import run_before_trans
+from separate_srt import add_chunk_arguments, chunk_options
+from metrics import MetricsRun, stage
+from run_log import RunLog, log_stage, run_command
 
 def main():
-    parser = argparse.ArgumentParser(description="SRT 번역 전처리: collect_srt.py → rename_all.py → trim_repeats_srt.py → separate_all.py 순서로 실행합니다.")
+    parser = argparse.ArgumentParser(description="SRT 번역 전처리: collect_srt.py → rename_all.py → trim_repeats_srt.py → separate_all.py 순서로 실행합니다. "
+                                                 "기본 실행은 trim 결과를 메모리로만 separate에 전달하므로 origin 파일은 트리밍되지 않은 채 남습니다 (trim 출력 [MEMORY ]). "
+                                                 "--materialize 또는 --subprocess 실행은 origin 파일을 직접 트리밍합니다 ([UPDATED]).")
     parser.add_argument('-t', '--target', help="collect_srt.py의 검색 대상 경로 (기본: Windows V:/, Linux /home)")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
     parser.add_argument('-l', '--lang', required=True, help="언어 코드 (e.g., ja, 필수: 파일 이름 변경에 사용)")
+    parser.add_argument('--materialize', action="store_true", help="trim 결과를 origin 파일에 기록 (기본: 메모리로 separate에 전달, origin 파일은 트리밍 전 그대로)")
+    parser.add_argument('--no-cache', action="store_true", help="파싱 캐시(SRT_HOME/cache/parsed)와 처리 상태(SRT_HOME/cache/state.json) 사용 안 함")
+    parser.add_argument('--full-rescan', action="store_true", help="저장된 볼륨 인덱스를 무시하고 대상 경로 전체를 다시 탐색")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="separate/restore/merge/compare 병렬 처리 프로세스 수 (기본: 1)")
+    add_chunk_arguments(parser)
+    parser.add_argument('--subprocess', action="store_true", help="각 stage를 별도 python 프로세스로 실행 (이전 방식, trim이 origin 파일을 직접 수정)")
+    parser.add_argument('--profile', action="store_true", help="stage별 cProfile 통계를 SRT_HOME/metrics에 저장 (병렬 작업의 자식 프로세스는 제외)")
+    parser.add_argument('-q', '--quiet', action="store_true", help="파일별 출력 생략 (경고/오류/요약만 출력, JSONL 로그에는 모두 기록)")
     args = parser.parse_args()
     
     srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
@@ -32,27 +33,61 @@ def main():
     print(f"target 경로: {target_path}")
     print(f"언어 코드: {args.lang}")
     
+    # stage별 시간/카운터: SRT_HOME/metrics/{시각}_before_trans.json, stage별 출력: SRT_HOME/logs/{시각}_before_trans.jsonl (실패해도 기록)
+    metrics = MetricsRun('before_trans', profile=args.profile)
+    log = RunLog('before_trans', srt_home_path, quiet=args.quiet)
+    try:
+        if args.subprocess:
+            run_subprocess_stages(args, srt_home_path, target_path, metrics, log)
+        else:
+            run_before_trans(target_path, srt_home_path, args.lang, materialize=args.materialize, use_cache=not args.no_cache, rescan=args.full_rescan, jobs=args.jobs,
+                             chunk_options=chunk_options(args, srt_home_path), metrics=metrics, run_log=log)
+    finally:
+        print(f"\n메트릭 저장됨: {metrics.save(srt_home_path)}")
+        print(f"로그 저장됨: {log.path}")
+        log.close()
+    print("\nbefore_trans.py 완료")
+
+def run_subprocess_stages(args, srt_home_path, target_path, metrics, run_log=None):
+    """각 stage를 별도 python 프로세스로 실행 (metrics에는 시간만 기록, 카운터는 in-process 실행에서만). 자식 출력은 라인 단위로 run_log에 전달됩니다."""
     # 1-1. collect_srt.py 호출
     print("\n--- collect_srt.py 실행 ---")
     collect_cmd = ['python', 'collect_srt.py', '-t', str(target_path), '-s', str(srt_home_path)]
-    run_command(collect_cmd)
+    if args.full_rescan:
+        collect_cmd.append('--full-rescan')
+    with log_stage(run_log, 'collect'), stage(metrics, 'collect'):
+        run_command(collect_cmd)
     
     # 1-2. rename_all.py 호출 (collect 후 이름 변경)
     print("\n--- rename_all.py 실행 ---")
     rename_cmd = ['python', 'rename_all.py', '-l', args.lang, '-s', str(srt_home_path)]
-    run_command(rename_cmd)
+    with log_stage(run_log, 'rename'), stage(metrics, 'rename'):
+        run_command(rename_cmd)
     
     # 1-3. trim_repeats_srt.py 호출
     print("\n--- trim_repeats_srt.py 실행 ---")
     trim_cmd = ['python', 'trim_repeats_srt.py', '-s', str(srt_home_path)]
-    run_command(trim_cmd)
+    if args.no_cache:
+        trim_cmd.append('--no-cache')
+    with log_stage(run_log, 'trim'), stage(metrics, 'trim'):
+        run_command(trim_cmd)
     
     # 1-4. separate_all.py 호출
     print("\n--- separate_all.py 실행 ---")
-    separate_all_cmd = ['python', 'separate_all.py', '-s', str(srt_home_path)]
-    run_command(separate_all_cmd)
-    
-    print("\nbefore_trans.py 완료")
+    separate_all_cmd = ['python', 'separate_all.py', '-s', str(srt_home_path), '-j', str(args.jobs),
+                        '--chunk-size', str(args.chunk_size), '--tokenizer', args.tokenizer, '--overlap', str(args.overlap)]
+    if args.budget:
+        separate_all_cmd += ['--budget', str(args.budget)]
+    if args.max_blocks:
+        separate_all_cmd += ['--max-blocks', str(args.max_blocks)]
+    if args.tm:
+        separate_all_cmd.append('--tm')
+    if args.dedup:
+        separate_all_cmd.append('--dedup')
+    if args.no_cache:
+        separate_all_cmd.append('--no-cache')
+    with log_stage(run_log, 'separate'), stage(metrics, 'separate'):
+        run_command(separate_all_cmd)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
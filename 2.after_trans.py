@@ -1,26 +1,23 @@
 import argparse
-import subprocess
 from pathlib import Path
 import os
 from utils import get_srt_home  # 공통 utils import
-
-def run_command(cmd):
-    """subprocess로 명령어 실행, 실패 시 예외 발생."""
-    try:
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        print(result.stdout)
-        if result.stderr:
-            print(f"경고: {result.stderr}")
-    except subprocess.CalledProcessError as e:
-        print(f"오류: 명령어 실행 실패 - {e}")
-        print(f"stdout: {e.stdout}")
-        print(f"stderr: {e.stderr}")
-        raise
+from pipeline import run_after_trans
+from metrics import MetricsRun, stage
+from run_log import RunLog, log_stage, run_command
 
 def main():
     parser = argparse.ArgumentParser(description="SRT 번역 후처리: restore_all.py → merge_all.py → compare_all.py 순서로 실행합니다.")
     parser.add_argument('-t', '--target', help="compare_all.py의 mp4 검색 대상 경로 (기본: Windows V:/, Linux /home)")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--materialize', action="store_true", help="restore 결과를 trans_separate chunk에 기록 (기본: 메모리로 merge에 전달). 이미 복원된 chunk 건너뛰기(처리 상태)는 이 옵션에서만 동작")
+    parser.add_argument('--no-cache', action="store_true", help="파싱 캐시(SRT_HOME/cache/parsed)와 처리 상태(SRT_HOME/cache/state.json) 사용 안 함")
+    parser.add_argument('--full-rescan', action="store_true", help="저장된 볼륨 인덱스를 무시하고 대상 경로 전체를 다시 탐색")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="separate/restore/merge/compare 병렬 처리 프로세스 수 (기본: 1)")
+    parser.add_argument('--no-tm', action="store_true", help="복원한 원문/번역 대사를 번역 메모리(SRT_HOME/cache/tm.sqlite)에 추가하지 않음")
+    parser.add_argument('--subprocess', action="store_true", help="각 stage를 별도 python 프로세스로 실행 (이전 방식)")
+    parser.add_argument('--profile', action="store_true", help="stage별 cProfile 통계를 SRT_HOME/metrics에 저장 (병렬 작업의 자식 프로세스는 제외)")
+    parser.add_argument('-q', '--quiet', action="store_true", help="파일별 출력 생략 (경고/오류/요약만 출력, JSONL 로그에는 모두 기록)")
     args = parser.parse_args()
     
     # SRT_HOME 설정
@@ -33,22 +30,51 @@ def main():
     print(f"SRT_HOME: {srt_home_path}")
     print(f"target 경로: {target_path}")
     
+    # stage별 시간/카운터: SRT_HOME/metrics/{시각}_after_trans.json, stage별 출력: SRT_HOME/logs/{시각}_after_trans.jsonl (실패해도 기록)
+    metrics = MetricsRun('after_trans', profile=args.profile)
+    log = RunLog('after_trans', srt_home_path, quiet=args.quiet)
+    try:
+        if args.subprocess:
+            run_subprocess_stages(args, srt_home_path, target_path, metrics, log)
+        else:
+            run_after_trans(target_path, srt_home_path, materialize=args.materialize, use_cache=not args.no_cache, rescan=args.full_rescan, jobs=args.jobs,
+                            use_tm=not args.no_tm, metrics=metrics, run_log=log)
+    finally:
+        print(f"\n메트릭 저장됨: {metrics.save(srt_home_path)}")
+        print(f"로그 저장됨: {log.path}")
+        log.close()
+    print("\nafter_trans.py 완료")
+
+def run_subprocess_stages(args, srt_home_path, target_path, metrics, run_log=None):
+    """각 stage를 별도 python 프로세스로 실행 (metrics에는 시간만 기록, 카운터는 in-process 실행에서만). 자식 출력은 라인 단위로 run_log에 전달됩니다."""
     # 2-2. restore_all.py 호출
     print("\n--- restore_all.py 실행 ---")
-    restore_all_cmd = ['python', 'restore_all.py', '-s', str(srt_home_path)]
-    run_command(restore_all_cmd)
+    restore_all_cmd = ['python', 'restore_all.py', '-s', str(srt_home_path), '-j', str(args.jobs)]
+    if args.no_cache:
+        restore_all_cmd.append('--no-cache')
+    if args.no_tm:
+        restore_all_cmd.append('--no-tm')
+    with log_stage(run_log, 'restore'), stage(metrics, 'restore'):
+        run_command(restore_all_cmd)
     
     # 2-4. merge_all.py 호출
     print("\n--- merge_all.py 실행 ---")
-    merge_all_cmd = ['python', 'merge_all.py', '-s', str(srt_home_path)]
-    run_command(merge_all_cmd)
+    merge_all_cmd = ['python', 'merge_all.py', '-s', str(srt_home_path), '-j', str(args.jobs)]
+    if args.no_cache:
+        merge_all_cmd.append('--no-cache')
+    with log_stage(run_log, 'merge'), stage(metrics, 'merge'):
+        run_command(merge_all_cmd)
     
     # 2-6. compare_all.py 호출
     print("\n--- compare_all.py 실행 ---")
     compare_all_cmd = ['python', 'compare_all.py', '-t', str(target_path), '-s', str(srt_home_path)]
-    run_command(compare_all_cmd)
-    
-    print("\nafter_trans.py 완료")
+    if args.full_rescan:
+        compare_all_cmd.append('--full-rescan')
+    compare_all_cmd += ['-j', str(args.jobs)]
+    if args.no_cache:
+        compare_all_cmd.append('--no-cache')
+    with log_stage(run_log, 'compare'), stage(metrics, 'compare'):
+        run_command(compare_all_cmd)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,285 @@
+# benchmark_srt.py (stage별 처리량/최대 메모리 측정 + 결과 해시를 기준값과 비교해 출력이 바뀌지 않았는지 확인)
+import argparse
+import hashlib
+import io
+import json
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import NamedTuple
+from utils import parse_srt_blocks, compress_repeats, build_auto_repeat_regex, auto_compress_repeats, load_patterns, read_text_preserve_encoding, is_trash_path
+from separate_srt import separate_srt_file
+from restore_srt import restore_srt_file
+from merge_srt import merge_srt_file
+from compare_srt import compare_srt_file
+from restore_all import _list_chunks
+from volume_index import build_volume_index, DEFAULT_WALK_WORKERS
+from mock_translate_server import mock_translate
+from gen_srt_corpus import generate_corpus
+
+# trim_repeats_srt.py 기본값과 동일
+TRIM_MIN_REPEAT = 7
+TRIM_KEEP_REPEAT = 3
+NON_LETTER_RE = re.compile(r"[^\w\s]+|\d+")  # 자동 반복 제거 후에도 그대로 남아야 하는 숫자/문장부호
+# 기본 코퍼스(--titles/--cues/--seed 기본값)에서 원래 코드(e74a120)가 낸 stage별 결과 해시
+DEFAULT_BASELINE = Path(__file__).with_name('benchmark_baseline.json')
+
+class Stage(NamedTuple):
+    """run(ctx) → (결과 해시, 처리 블록 수, 입력 bytes, 파일 수). setup(ctx)은 측정 전에 한 번 실행 (시간 제외).
+    prepares=True인 stage는 다음 stage의 입력을 만들므로 --stages에서 빠져도 측정 없이 한 번 실행합니다."""
+    name: str
+    run: object
+    setup: object = None
+    prepares: bool = False
+
+def _digest(parts):
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else part.encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+def _dir_digest(dir_path, pattern='*'):
+    return _digest(part for path in sorted(Path(dir_path).glob(pattern)) if path.is_file()
+                   for part in (path.name, path.read_bytes()))
+
+def prepare(corpus_dir, work_dir):
+    """코퍼스의 외국어 자막(휴지통, KR- 제외)을 읽고 work_dir/srt_home/origin에 {base}.ja.srt로 복사합니다."""
+    srt_home = Path(work_dir) / 'srt_home'
+    shutil.rmtree(srt_home, ignore_errors=True)
+    origin_dir = srt_home / 'origin'
+    origin_dir.mkdir(parents=True)
+    titles = []
+    for path in sorted(Path(corpus_dir, 'vol').rglob('*.srt')):
+        if is_trash_path(path) or path.name.startswith('KR-'):
+            continue
+        data = path.read_bytes()
+        text, enc = read_text_preserve_encoding(path)
+        origin_file = origin_dir / f"{path.stem}.ja.srt"
+        origin_file.write_bytes(data)
+        titles.append({'base': path.stem, 'origin': origin_file, 'text': text, 'bytes': len(data)})
+    return {
+        'corpus': Path(corpus_dir),
+        'srt_home': srt_home,
+        'titles': titles,
+        'cues': None,
+        'bytes': sum(title['bytes'] for title in titles),
+        'patterns': load_patterns(Path(corpus_dir) / 'srt_home' / 'patterns.txt'),
+    }
+
+def bench_parse(ctx):
+    blocks = [parse_srt_blocks(title['text']) for title in ctx['titles']]
+    ctx['cues'] = sum(len(b) for b in blocks)
+    return _digest(block for b in blocks for block in b), ctx['cues'], ctx['bytes'], len(blocks)
+
+def bench_compress(ctx):
+    outputs = [compress_repeats(title['text'], ctx['patterns'], TRIM_MIN_REPEAT, TRIM_KEEP_REPEAT, False) for title in ctx['titles']]
+    return _digest(outputs), ctx['cues'], ctx['bytes'], len(outputs)
+
+def bench_auto_compress(ctx):
+    """trim --auto: 자동 감지 반복 제거. 숫자/문장부호가 바뀌면 실패 (e.g., 10000000 → 000)."""
+    rx = build_auto_repeat_regex(TRIM_MIN_REPEAT)
+    outputs = [auto_compress_repeats(title['text'], rx, TRIM_KEEP_REPEAT, False) for title in ctx['titles']]
+    for title, output in zip(ctx['titles'], outputs):
+        if NON_LETTER_RE.findall(title['text']) != NON_LETTER_RE.findall(output):
+            raise ValueError(f"auto_compress_repeats가 숫자/문장부호를 바꿨습니다: {title['base']}")
+    return _digest(outputs), ctx['cues'], ctx['bytes'], len(outputs)
+
+def bench_separate(ctx):
+    separated_dir = ctx['srt_home'] / 'origin_separate'
+    for title in ctx['titles']:
+        separate_srt_file(title['origin'], separated_dir, content=title['text'])
+    # chunk만 비교 (manifest/map은 원래 코드에 없던 출력)
+    return _dir_digest(separated_dir, '*.srt'), ctx['cues'], ctx['bytes'], len(ctx['titles'])
+
+def setup_restore(ctx):
+    """mock 번역(대사 앞 '번역: ', 코드 블록 표시 포함)으로 trans_separate 생성."""
+    origin_separate_dir = ctx['srt_home'] / 'origin_separate'
+    trans_separate_dir = ctx['srt_home'] / 'trans_separate'
+    shutil.rmtree(trans_separate_dir, ignore_errors=True)
+    trans_separate_dir.mkdir()
+    for file, _ in _list_chunks(origin_separate_dir):
+        (trans_separate_dir / file.name).write_text(mock_translate(file.read_text(encoding='utf-8'), fence=True), encoding='utf-8')
+
+def bench_restore(ctx):
+    origin_separate_dir = ctx['srt_home'] / 'origin_separate'
+    trans_separate_dir = ctx['srt_home'] / 'trans_separate'
+    docs = {}
+    chunks = _list_chunks(origin_separate_dir)
+    for file, expected_blocks in chunks:
+        restore_srt_file(file, origin_separate_dir, trans_separate_dir, docs=docs, write=False, expected_blocks=expected_blocks)
+    ctx['docs'] = docs
+    nbytes = sum((trans_separate_dir / file.name).stat().st_size for file, _ in chunks)
+    return _digest(part for key in sorted(docs) for part in (key.name, docs[key])), ctx['cues'], nbytes, len(chunks)
+
+def bench_merge(ctx):
+    trans_dir = ctx['srt_home'] / 'trans'
+    for title in ctx['titles']:
+        merge_srt_file(title['base'], None, ctx['srt_home'] / 'origin_separate', ctx['srt_home'] / 'trans_separate', trans_dir, docs=ctx['docs'])
+    nbytes = sum(path.stat().st_size for path in trans_dir.iterdir())
+    return _dir_digest(trans_dir), ctx['cues'], nbytes, len(ctx['titles'])
+
+def bench_compare(ctx):
+    srt_home = ctx['srt_home']
+    results = [compare_srt_file(title['base'], srt_home / 'origin', srt_home / 'trans', None, srt_home / 'origin_separate')
+               for title in ctx['titles']]
+    nbytes = ctx['bytes'] + sum(path.stat().st_size for path in (srt_home / 'trans').iterdir())
+    return _digest(f"{title['base']}:{ok}" for title, ok in zip(ctx['titles'], results)), ctx['cues'], nbytes, len(results)
+
+def _bench_walk(ctx, workers):
+    vol_dir = ctx['corpus'] / 'vol'
+    index = build_volume_index(vol_dir, workers=workers)
+    root = str(vol_dir)
+    files = sum(len(info['files']) for info in index['dirs'].values())
+    listing = (f"{Path(dir_path).relative_to(root).as_posix()}:{','.join(sorted(info['files']))}" for dir_path, info in index['dirs'].items())
+    return _digest(listing), 0, 0, files
+
+def bench_walk(ctx):
+    return _bench_walk(ctx, 1)
+
+def bench_walk_threads(ctx):
+    return _bench_walk(ctx, DEFAULT_WALK_WORKERS)
+
+STAGES = (
+    Stage('parse_srt_blocks', bench_parse, prepares=True),
+    Stage('compress_repeats', bench_compress),
+    Stage('auto_compress_repeats', bench_auto_compress),
+    Stage('separate_srt_file', bench_separate, prepares=True),
+    Stage('restore_srt_file', bench_restore, setup_restore, prepares=True),
+    Stage('merge_srt_file', bench_merge, prepares=True),
+    Stage('compare_srt_file', bench_compare),
+    Stage('walk_volume', bench_walk),
+    Stage(f'walk_volume_x{DEFAULT_WALK_WORKERS}', bench_walk_threads),
+)
+
+def run_stage(stage, ctx, repeat=3, memory=True):
+    """stage를 repeat번 실행해 최소 시간, 그 뒤 tracemalloc으로 한 번 더 실행해 최대 메모리 측정 (stage 출력은 숨김)."""
+    if stage.setup is not None:
+        with redirect_stdout(io.StringIO()):
+            stage.setup(ctx)
+    best = None
+    digests = set()
+    for _ in range(max(1, repeat)):
+        with redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            digest, cues, nbytes, files = stage.run(ctx)
+            elapsed = time.perf_counter() - started
+        digests.add(digest)
+        best = elapsed if best is None else min(best, elapsed)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            with redirect_stdout(io.StringIO()):
+                digests.add(stage.run(ctx)[0])
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        'stage': stage.name,
+        'seconds': best,
+        'cues_per_sec': cues / best if cues and best else None,
+        'mb_per_sec': nbytes / 1e6 / best if nbytes and best else None,
+        'files_per_sec': files / best if best else None,
+        'peak_mb': peak / 1e6 if peak is not None else None,
+        'digest': digest,
+        'stable': len(digests) == 1,  # 반복 실행마다 같은 결과인지
+    }
+
+def _fmt(value, width, spec):
+    return format(value, f">{width}{spec}") if value is not None else f"{'-':>{width}}"
+
+def print_results(results):
+    print(f"{'stage':<24}{'초':>9}{'cues/s':>12}{'MB/s':>9}{'files/s':>10}{'peak MB':>9}")
+    for r in results:
+        print(f"{r['stage']:<24}{r['seconds']:>9.3f}{_fmt(r['cues_per_sec'], 12, ',.0f')}{_fmt(r['mb_per_sec'], 9, '.1f')}"
+              f"{_fmt(r['files_per_sec'], 10, ',.0f')}{_fmt(r['peak_mb'], 9, '.1f')}")
+
+def check_baseline(results, baseline, corpus_params):
+    """기준 파일의 stage별 해시와 비교. 불일치 stage 이름 목록 반환."""
+    if baseline.get('corpus') != corpus_params:
+        print(f"경고: 기준값의 코퍼스 설정이 다릅니다. (기준: {baseline.get('corpus')}, 현재: {corpus_params})")
+    mismatched = []
+    for r in results:
+        expected = baseline['digests'].get(r['stage'])
+        if expected is None:
+            print(f"기준 없음: {r['stage']}")
+        elif expected != r['digest']:
+            print(f"불일치: {r['stage']} - 출력이 기준값과 다릅니다.")
+            mismatched.append(r['stage'])
+        else:
+            print(f"일치: {r['stage']}")
+    return mismatched
+
+def main():
+    parser = argparse.ArgumentParser(description="SRT 처리 stage별 벤치마크: 처리량(cues/s, MB/s, files/s), 최대 메모리, 결과 해시 기준값 비교.")
+    parser.add_argument('--corpus', help="gen_srt_corpus.py로 만든 코퍼스 디렉토리 (기본: 작업 디렉토리에 생성)")
+    parser.add_argument('--work', help="작업 디렉토리 (기본: 임시 디렉토리, 종료 시 삭제)")
+    parser.add_argument('--titles', type=int, default=20, help="코퍼스 생성 시 title 수 (기본: 20)")
+    parser.add_argument('--cues', type=int, default=1500, help="코퍼스 생성 시 title당 평균 블록 수 (기본: 1500)")
+    parser.add_argument('--seed', type=int, default=1, help="코퍼스 생성 seed (기본: 1)")
+    parser.add_argument('--repeat', type=int, default=3, help="stage별 반복 횟수 (최소 시간 사용, 기본: 3)")
+    parser.add_argument('--stages', help="실행할 stage (쉼표 구분, 기본: 전체). e.g., parse_srt_blocks,separate_srt_file")
+    parser.add_argument('--no-memory', action="store_true", help="tracemalloc 최대 메모리 측정 생략")
+    parser.add_argument('--baseline', help=f"기준 결과 해시 파일 (JSON): 출력이 같은지 확인 (기본: {DEFAULT_BASELINE.name}, 기본 코퍼스에서만)")
+    parser.add_argument('--no-baseline', action="store_true", help="기준값 비교 생략")
+    parser.add_argument('--save-baseline', help="현재 결과 해시를 기준 파일로 저장")
+    parser.add_argument('--json', help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    work_dir = Path(args.work) if args.work else Path(tempfile.mkdtemp(prefix='srt_bench_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        if args.corpus:
+            corpus_dir = Path(args.corpus)
+            corpus_params = {'path': str(corpus_dir)}
+        else:
+            corpus_dir = work_dir / 'corpus'
+            corpus_params = {'titles': args.titles, 'cues': args.cues, 'seed': args.seed}
+            summary = generate_corpus(corpus_dir, args.titles, args.cues, seed=args.seed)
+            print(f"코퍼스 생성: title {summary['titles']}개, 블록 {summary['cues']}개, {summary['bytes'] / 1e6:.1f}MB")
+        ctx = prepare(corpus_dir, work_dir)
+
+        selected = set(args.stages.split(',')) if args.stages else None
+        results = []
+        for stage in STAGES:
+            if selected is not None and stage.name not in selected:
+                if stage.prepares:
+                    run_stage(stage, ctx, repeat=1, memory=False)
+                continue
+            result = run_stage(stage, ctx, args.repeat, not args.no_memory)
+            results.append(result)
+            if not result['stable']:
+                print(f"경고: {stage.name} 결과가 반복 실행마다 다릅니다.")
+
+        print()
+        print_results(results)
+        mismatched = []
+        baseline_path = Path(args.baseline) if args.baseline else DEFAULT_BASELINE
+        if not args.no_baseline and baseline_path.exists():
+            with open(baseline_path, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            print()
+            if args.baseline or baseline.get('corpus') == corpus_params:
+                mismatched = check_baseline(results, baseline, corpus_params)
+            else:
+                print(f"기준값 비교 생략: 코퍼스 설정이 {baseline_path.name}과 다릅니다. (기준: {baseline.get('corpus')}, 현재: {corpus_params})")
+        if args.save_baseline:
+            with open(args.save_baseline, 'w', encoding='utf-8') as f:
+                json.dump({'corpus': corpus_params, 'digests': {r['stage']: r['digest'] for r in results}}, f, ensure_ascii=False, indent=1)
+            print(f"기준값 저장됨: {args.save_baseline}")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({'corpus': corpus_params, 'results': results}, f, ensure_ascii=False, indent=1)
+    finally:
+        if not args.work:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    if mismatched:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,26 @@
 import argparse
 from pathlib import Path
 import os
-from utils import find_mp4_srt_status  # utils.py 함수 import
+from utils import find_mp4_srt_status, get_srt_home  # utils.py 함수 import
+from volume_index import get_volume_index, DEFAULT_WALK_WORKERS
 
 def main():
     parser = argparse.ArgumentParser(description="현재 볼륨에서 모든 MP4 파일을 검색하고, 같은 경로에 SRT 파일이 있는지 확인합니다. 하위 경로 포함, 휴지통 자동 스킵.")
     parser.add_argument('-t', '--target', help="검색할 대상 경로 (기본: Windows V:/, Linux /home)")
+    parser.add_argument('-s', '--srt_home', help="볼륨 인덱스를 저장할 SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--full-rescan', action="store_true", help="저장된 볼륨 인덱스를 무시하고 전체 경로를 다시 탐색")
+    parser.add_argument('--walk-workers', type=int, default=DEFAULT_WALK_WORKERS, help=f"디렉토리 병렬 탐색 스레드 수 (기본: {DEFAULT_WALK_WORKERS}, 1이면 순차)")
     args = parser.parse_args()
     
     # target 경로 설정
     target_path = Path(args.target) if args.target else (Path('V:/') if os.name == 'nt' else Path('/home'))
     
+    srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
+    
     print(f"검색 경로: {target_path}")
     
-    find_mp4_srt_status(target_path)
+    index = get_volume_index(target_path, srt_home_path, rescan=args.full_rescan, workers=args.walk_workers)
+    find_mp4_srt_status(target_path, index)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
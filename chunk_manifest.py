@@ -0,0 +1,143 @@
+# chunk_manifest.py (separate가 origin 파일별로 남기는 chunk 목록: origin_separate/{origin stem}.manifest.json, e.g., HMN-520.ja.manifest.json)
+import hashlib
+import json
+import os
+from pathlib import Path
+from utils import get_base_filename
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = '.manifest.json'
+MAP_SUFFIX = '.map.json'
+
+def get_manifest_path(separated_dir, stem):
+    """stem: origin 파일 stem (e.g., HMN-520.ja). 같은 base의 다른 언어 파일(HMN-520.en)은 manifest가 따로 있음."""
+    return Path(separated_dir) / f"{stem}{MANIFEST_SUFFIX}"
+
+def _manifest_stem(name):
+    return name[:-len(MANIFEST_SUFFIX)] if name.endswith(MANIFEST_SUFFIX) else None
+
+def _chunk_origin_stem(chunk_name):
+    """chunk 이름의 origin stem (e.g., HMN-520.ja_003.srt → HMN-520.ja)."""
+    return Path(chunk_name).stem.rpartition('_')[0]
+
+def chunk_entry(name, data, first, last, context, blocks, cost):
+    """manifest의 chunk 항목. data는 chunk 파일에 기록한 bytes (크기/해시로 검증)."""
+    return {
+        'name': name,
+        'first': first,
+        'last': last,
+        'context': context,
+        'blocks': blocks,
+        'cost': cost,
+        'size': len(data),
+        'sha1': hashlib.sha1(data).hexdigest(),
+    }
+
+def write_manifest(separated_dir, stem, source_name, total_blocks, options, chunks):
+    """chunks: chunk_entry 목록 (first/last는 1부터 시작하는 블록 위치, context 제외)."""
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'source': source_name,
+        'stem': stem,
+        'blocks': total_blocks,
+        'chunk_count': len(chunks),
+        'options': options,
+        'chunks': chunks,
+    }
+    manifest_path = get_manifest_path(separated_dir, stem)
+    tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+def load_manifest(separated_dir, stem):
+    """manifest가 없거나 읽을 수 없으면 None (이전 방식으로 분할된 chunk).
+    (base_filename별로 하나였던 이전 manifest는 stem이 달라 무시되고, 그 chunk는 manifest 없는 chunk로 처리)"""
+    try:
+        with open(get_manifest_path(separated_dir, stem), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('stem') != stem:
+        return None
+    return manifest
+
+def manifest_paths_for_base(separated_dir, base_filename):
+    """base_filename의 manifest 파일 목록 (stem 순서, 이전 방식 manifest 포함)."""
+    paths = Path(separated_dir).glob(f"{base_filename}*{MANIFEST_SUFFIX}")
+    return sorted(path for path in paths if get_base_filename(_manifest_stem(path.name)) == base_filename)
+
+def find_manifest(separated_dir, base_filename, lang=None):
+    """lang 지정 시 {base_filename}.{lang}의 manifest, 아니면 base_filename의 manifest 중 stem 순서로 첫 번째."""
+    if lang:
+        return load_manifest(separated_dir, f"{base_filename}.{lang}")
+    for path in manifest_paths_for_base(separated_dir, base_filename):
+        manifest = load_manifest(separated_dir, _manifest_stem(path.name))
+        if manifest is not None:
+            return manifest
+    return None
+
+def check_chunks(manifest, separated_dir, verify_hash=False):
+    """separated_dir의 chunk 파일이 manifest와 맞는지 확인. 문제 목록 반환 (비어 있으면 정상).
+    기본은 stat 크기만 비교하고, verify_hash 시 내용 해시까지 비교합니다."""
+    problems = []
+    for chunk in manifest['chunks']:
+        path = Path(separated_dir) / chunk['name']
+        try:
+            if path.stat().st_size != chunk['size']:
+                problems.append(f"{chunk['name']} 크기 불일치 (manifest: {chunk['size']})")
+            elif verify_hash and hashlib.sha1(path.read_bytes()).hexdigest() != chunk['sha1']:
+                problems.append(f"{chunk['name']} 해시 불일치")
+        except OSError:
+            problems.append(f"{chunk['name']} 없음")
+    return problems
+
+def scan_separated_dir(separated_dir):
+    """separated_dir를 한 번 읽어 ({origin stem: manifest}, manifest가 없는 origin 파일의 chunk 파일 목록) 반환.
+    manifest가 있는 origin 파일의 chunk는 manifest에서 바로 찾으므로 목록에 넣지 않습니다."""
+    manifests = {}
+    chunk_names = []
+    with os.scandir(separated_dir) as it:
+        for entry in it:
+            stem = _manifest_stem(entry.name)
+            if stem is not None:
+                manifest = load_manifest(separated_dir, stem)
+                if manifest is not None:
+                    manifests[stem] = manifest
+            elif entry.name.endswith('.srt'):
+                chunk_names.append(entry.name)
+    loose = [Path(separated_dir) / name for name in chunk_names if _chunk_origin_stem(name) not in manifests]
+    return manifests, loose
+
+def get_chunk_map_path(separated_dir, chunk_name):
+    return Path(separated_dir) / f"{Path(chunk_name).stem}{MAP_SUFFIX}"
+
+def write_chunk_map(separated_dir, chunk_name, headers, slots, prefill):
+    """chunk 파일에 일부 블록만 쓴 경우 (TM으로 채운 블록 제외) 전체 블록 복원 정보.
+    headers: 전체 블록의 [번호, 타임스탬프], slots: 블록별 chunk 파일 내 블록 위치 (채운 블록은 None),
+    prefill: 블록별 채운 번역 (slot 블록은 None)."""
+    chunk_map = {'version': MANIFEST_VERSION, 'chunk': chunk_name, 'headers': headers, 'slots': slots, 'prefill': prefill}
+    map_path = get_chunk_map_path(separated_dir, chunk_name)
+    tmp_path = map_path.with_name(map_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(chunk_map, f, ensure_ascii=False)
+    os.replace(tmp_path, map_path)
+    return map_path
+
+def remove_chunk_map(separated_dir, chunk_name):
+    """chunk를 map 없이 다시 쓸 때 이전 map 제거."""
+    try:
+        get_chunk_map_path(separated_dir, chunk_name).unlink()
+    except FileNotFoundError:
+        pass
+
+def load_chunk_map(separated_dir, chunk_name):
+    try:
+        with open(get_chunk_map_path(separated_dir, chunk_name), 'r', encoding='utf-8') as f:
+            chunk_map = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if chunk_map.get('version') != MANIFEST_VERSION or chunk_map.get('chunk') != chunk_name:
+        return None
+    return chunk_map
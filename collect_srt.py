@@ -2,44 +2,45 @@ import argparse
 import shutil
 import os
 from pathlib import Path
-from utils import has_korean, is_trash_path, is_srt_home_path, get_srt_home  # 공통 utils import
+from utils import has_korean_file, get_srt_home, log, progress  # 공통 utils import
+from volume_index import get_volume_index, save_volume_index, iter_index_files, remove_index_file, DEFAULT_WALK_WORKERS
+from metrics import count
 
-def collect_srt_files(target_path, srt_home):
+def collect_srt_files(target_path, srt_home, index=None, rescan=False, walk_workers=DEFAULT_WALK_WORKERS, sample_chars=None):
     origin_dir = srt_home / 'origin'
     origin_dir.mkdir(parents=True, exist_ok=True)
     
+    # 볼륨 인덱스 (SRT_HOME, 휴지통 스킵): 저장된 인덱스를 증분 갱신 (rescan=True 시 전체 탐색)
+    if index is None:
+        index = get_volume_index(target_path, srt_home, rescan=rescan, workers=walk_workers)
+    
     moved_count = 0
-    for root, dirs, files in os.walk(target_path, topdown=True):
-        # SRT_HOME 디렉토리 스킵: dirs 리스트에서 제거하여 하위 탐색 방지
-        dirs[:] = [d for d in dirs if not is_srt_home_path(Path(root) / d, srt_home)]
-        # 휴지통 디렉토리 스킵
-        dirs[:] = [d for d in dirs if not is_trash_path(Path(root) / d)]
-        
-        # 현재 디렉토리가 SRT_HOME 또는 휴지통 관련이면 스킵
-        if is_srt_home_path(Path(root), srt_home) or is_trash_path(Path(root)):
-            continue
-        
-        for file in files:
-            if file.lower().endswith('.srt'):
-                file_path = Path(root) / file
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    if not has_korean(content):
-                        # 외국어 자막으로 분류하여 이동
-                        dest_path = origin_dir / file
-                        shutil.move(str(file_path), str(dest_path))
-                        print(f"이동됨: {file_path} -> {dest_path}")
-                        moved_count += 1
-                except Exception as e:
-                    print(f"오류 발생: {file_path} - {e}")
+    for file_path, _, _ in list(iter_index_files(index, '.srt')):
+        try:
+            # 한글 기준 도달 시 즉시 중단하는 스트리밍 판별 (sample_chars 지정 시 앞부분만)
+            if not has_korean_file(file_path, max_chars=sample_chars):
+                # 외국어 자막으로 분류하여 이동
+                dest_path = origin_dir / file_path.name
+                shutil.move(str(file_path), str(dest_path))
+                remove_index_file(index, file_path)
+                print(f"이동됨: {file_path} -> {dest_path}")
+                moved_count += 1
+                count('files')
+        except Exception as e:
+            count('failed')
+            log('error', f"오류 발생: {file_path} - {e}")
+        progress()
     
-    print(f"총 {moved_count}개의 외국어 SRT 파일이 이동되었습니다.")
+    save_volume_index(index, srt_home)
+    log('summary', f"총 {moved_count}개의 외국어 SRT 파일이 이동되었습니다.")
 
 def main():
     parser = argparse.ArgumentParser(description="현재 볼륨에서 SRT 파일을 검색하고 외국어 자막을 SRT_HOME/origin으로 이동합니다. SRT_HOME 내 파일은 스킵되며, 휴지통은 자동 스킵됩니다.")
     parser.add_argument('-t', '--target', help="검색할 대상 경로 (기본: Windows V:/, Linux /home)")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--full-rescan', action="store_true", help="저장된 볼륨 인덱스를 무시하고 전체 경로를 다시 탐색")
+    parser.add_argument('--walk-workers', type=int, default=DEFAULT_WALK_WORKERS, help=f"디렉토리 병렬 탐색 스레드 수 (기본: {DEFAULT_WALK_WORKERS}, 1이면 순차)")
+    parser.add_argument('--sample-chars', type=int, help="한글 판별 시 파일 앞부분 N글자만 검사 (기본: 전체)")
     args = parser.parse_args()
     
     # SRT_HOME 설정
@@ -51,7 +52,7 @@ def main():
     print(f"검색 경로: {target_path}")
     print(f"SRT_HOME: {srt_home_path}")
     
-    collect_srt_files(target_path, srt_home_path)
+    collect_srt_files(target_path, srt_home_path, rescan=args.full_rescan, walk_workers=args.walk_workers, sample_chars=args.sample_chars)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,75 +1,151 @@
 import argparse
+import bisect
 import shutil
 import os
 from pathlib import Path
-from utils import get_srt_home, get_base_filename, is_trash_path, find_mp4_path  # 공통 utils import
+from functools import partial
+from utils import get_srt_home, get_base_filename, run_jobs, list_srt_names, names_with_prefix, log, progress  # 공통 utils import
+from volume_index import get_volume_index, find_mp4_in_index, add_index_file, save_volume_index, DEFAULT_WALK_WORKERS
 from compare_srt import compare_srt_file  # compare_srt.py의 함수 import (직접 호출)
+from srt_cache import get_parse_cache_dir, prune_parse_cache
+from chunk_manifest import manifest_paths_for_base, remove_chunk_map
+from state_store import load_state, save_state, forget
+from metrics import count
 
-def delete_related_files(base_filename, srt_home_path):
-    dirs_to_clean = [
-        srt_home_path / 'origin',
-        srt_home_path / 'origin_separate',
-        srt_home_path / 'trans_separate',
-        srt_home_path / 'trans'
-    ]
+SEPARATE_DIRS = ('origin', 'origin_separate', 'trans_separate', 'trans')
+
+def list_related_dirs(srt_home_path):
+    """관련 디렉토리 4개를 한 번씩 읽어 {디렉토리: 정렬된 .srt 이름 목록} 반환."""
+    return {srt_home_path / name: list_srt_names(srt_home_path / name) for name in SEPARATE_DIRS}
+
+def delete_related_files(base_filename, srt_home_path, listings=None, state=None):
+    """listings(list_related_dirs 결과) 지정 시 디렉토리를 다시 읽지 않고 목록에서 찾아 삭제하고, 목록에서도 제거합니다.
+    state 지정 시 삭제한 파일의 처리 상태 기록도 지웁니다."""
+    dirs_to_clean = [srt_home_path / name for name in SEPARATE_DIRS]
     deleted_count = 0
+    for manifest_path in manifest_paths_for_base(srt_home_path / 'origin_separate', base_filename):
+        manifest_path.unlink(missing_ok=True)
     for dir_path in dirs_to_clean:
-        for file in dir_path.glob(f"{base_filename}*.srt"):
+        if listings is None:
+            files = list(dir_path.glob(f"{base_filename}*.srt"))
+        else:
+            names = listings[dir_path]
+            files = [dir_path / name for name in names_with_prefix(names, base_filename)]
+            start = bisect.bisect_left(names, base_filename)
+            del names[start:start + len(files)]
+        for file in files:
             try:
+                if state is not None:
+                    forget(state, 'trim', file.resolve())
+                    forget(state, 'separate', file.resolve())
+                    forget(state, 'restore', file.name)
                 file.unlink()
+                if dir_path.name == 'origin_separate':
+                    remove_chunk_map(dir_path, file.name)  # TM으로 채운 블록 정보 (separate --tm)
                 print(f"삭제됨: {file}")
                 deleted_count += 1
+            except FileNotFoundError:
+                pass  # listings 작성 후 이미 옮겨진 파일 (e.g., mp4 경로로 이동한 번역 srt)
             except Exception as e:
-                print(f"삭제 실패: {file} - {e}")
+                log('error', f"삭제 실패: {file} - {e}")
+    forget(state, 'merge', base_filename)
     return deleted_count
 
-def compare_all_files(target_path, origin_dir, trans_dir, srt_home_path):
+def find_mp4_path_indexed(base, index):
+    """인덱스에서 mp4 경로 조회. 인덱스는 호출 전에 get_volume_index로 증분 갱신되어 있어야 합니다.
+    (디렉토리 mtime으로 추가/삭제가 반영되므로 없으면 없는 것, 다시 탐색하지 않음)"""
+    mp4_path = find_mp4_in_index(index, base)
+    if mp4_path is not None and mp4_path.exists():
+        return mp4_path
+    return None
+
+def place_translation(base, srt_files, srt_home_path, index, listings=None, state=None):
+    """비교 OK인 base의 번역 srt(srt_files 첫 파일)를 mp4 경로로 이동/이름 변경 후 관련 파일 삭제. 이동했으면 True.
+    (볼륨 인덱스에는 이동한 srt를 추가)"""
+    # OK 시 mp4 원래 경로 찾기
+    mp4_path = find_mp4_path_indexed(base, index)
+    if mp4_path:
+        # srt 파일 (trans/base_filename*.srt, 첫 매치)
+        if srt_files:
+            srt_file = srt_files[0]
+            # 새 srt 이름: mp4와 동일 (확장자 .srt)
+            new_srt_name = mp4_path.stem + '.srt'
+            dest_srt_path = mp4_path.parent / new_srt_name
+            try:
+                shutil.move(str(srt_file), str(dest_srt_path))
+                add_index_file(index, dest_srt_path)
+                print(f"srt 이동 및 이름 변경: {srt_file} -> {dest_srt_path}")
+                # 이동 성공 시 관련 파일 삭제
+                delete_related_files(base, srt_home_path, listings, state)
+                return True
+            except Exception as e:
+                log('error', f"srt 이동 실패: {srt_file} - {e}")
+        else:
+            log('warning', f"경고: {base} srt 파일 없음")
+    else:
+        log('warning', f"경고: {base} mp4 파일 없음")
+    return False
+
+def _compare_one(item, origin_dir, trans_dir, cache_dir, separated_dir):
+    base, origin_files, trans_files = item
+    return compare_srt_file(base, origin_dir, trans_dir, cache_dir, separated_dir, origin_files=origin_files, trans_files=trans_files)
+
+def compare_all_files(target_path, origin_dir, trans_dir, srt_home_path, cache_dir=None, rescan=False, walk_workers=DEFAULT_WALK_WORKERS, jobs=1):
+    # 디렉토리마다 한 번만 읽고, base별 파일은 정렬된 목록에서 이진 탐색으로 찾음 (base마다 glob 하지 않음)
+    listings = list_related_dirs(srt_home_path)
+    if origin_dir not in listings:
+        listings[origin_dir] = list_srt_names(origin_dir)
+    if trans_dir not in listings:
+        listings[trans_dir] = list_srt_names(trans_dir)
+    origin_names = listings[origin_dir]
+    trans_names = listings[trans_dir]
+    
     # unique base_filename 추출
     base_filenames = set()
-    for file in origin_dir.glob('*.srt'):
-        base = get_base_filename(file.stem)  # e.g., HMN-520.ja → HMN-520
+    for name in origin_names:
+        base = get_base_filename(Path(name).stem)  # e.g., HMN-520.ja → HMN-520
         base_filenames.add(base)
     
+    index = get_volume_index(target_path, srt_home_path, rescan=rescan, workers=walk_workers)
+    state = load_state(srt_home_path) if cache_dir is not None else None
+    
     ok_count = 0
     failed_bases = []
-    for base in sorted(base_filenames):
-        if compare_srt_file(base, origin_dir, trans_dir):
-            # OK 시 mp4 원래 경로 찾기
-            mp4_path = find_mp4_path(base, target_path)
-            if mp4_path:
-                # srt 파일 찾기 (trans/base_filename*.srt, 첫 매치)
-                srt_files = list(trans_dir.glob(f"{base}*.srt"))
-                if srt_files:
-                    srt_file = srt_files[0]
-                    # 새 srt 이름: mp4와 동일 (확장자 .srt)
-                    new_srt_name = mp4_path.stem + '.srt'
-                    dest_srt_path = mp4_path.parent / new_srt_name
-                    try:
-                        shutil.move(str(srt_file), str(dest_srt_path))
-                        print(f"srt 이동 및 이름 변경: {srt_file} -> {dest_srt_path}")
-                        # 이동 성공 시 관련 파일 삭제
-                        delete_related_files(base, srt_home_path)
-                    except Exception as e:
-                        print(f"srt 이동 실패: {srt_file} - {e}")
-                else:
-                    print(f"경고: {base} srt 파일 없음")
-            else:
-                print(f"경고: {base} mp4 파일 없음")
+    items = [(base,
+              [origin_dir / name for name in names_with_prefix(origin_names, base)],
+              [trans_dir / name for name in names_with_prefix(trans_names, base)])
+             for base in sorted(base_filenames)]
+    # 비교는 병렬 (jobs > 1), 이동/삭제는 결과 순서대로 현재 프로세스에서 처리
+    worker = partial(_compare_one, origin_dir=origin_dir, trans_dir=trans_dir, cache_dir=cache_dir,
+                     separated_dir=srt_home_path / 'origin_separate')
+    for (base, _, srt_files), ok in run_jobs(worker, items, jobs, default=False):
+        if ok:
+            place_translation(base, srt_files, srt_home_path, index, listings, state)
             ok_count += 1
+            count('files')
         else:
             failed_bases.append(base)
-            print(f"비교 실패: {base}")
+            count('failed')
+            log('error', f"비교 실패: {base}")
+        progress()
     
-    print(f"총 {ok_count}개의 base_filename이 OK되었습니다.")
+    prune_parse_cache(cache_dir)
+    save_volume_index(index, srt_home_path)
+    save_state(state)
+    log('summary', f"총 {ok_count}개의 base_filename이 OK되었습니다.")
     if failed_bases:
-        print("\n실패한 base_filename 목록:")
+        log('error', "\n실패한 base_filename 목록:")
         for failed in failed_bases:
-            print(f"- {failed}")
+            log('error', f"- {failed}")
 
 def main():
     parser = argparse.ArgumentParser(description="SRT_HOME/origin의 모든 base_filename을 대상으로 compare_srt.py를 실행합니다. OK 시 srt를 mp4 경로로 이동/이름 변경 후 관련 파일 삭제.")
     parser.add_argument('-t', '--target', help="mp4 검색 대상 경로 (기본: Windows V:/, Linux /home)")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--no-cache', action="store_true", help="파싱 캐시(SRT_HOME/cache/parsed) 사용 안 함")
+    parser.add_argument('--full-rescan', action="store_true", help="저장된 볼륨 인덱스를 무시하고 mp4 검색 대상 경로 전체를 다시 탐색")
+    parser.add_argument('--walk-workers', type=int, default=DEFAULT_WALK_WORKERS, help=f"디렉토리 병렬 탐색 스레드 수 (기본: {DEFAULT_WALK_WORKERS}, 1이면 순차)")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="병렬 처리 프로세스 수 (기본: 1)")
     args = parser.parse_args()
     
     srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
@@ -89,7 +165,8 @@ def main():
         print(f"오류: {origin_dir}가 존재하지 않습니다.")
         return
     
-    compare_all_files(target_path, origin_dir, trans_dir, srt_home_path)
+    cache_dir = None if args.no_cache else get_parse_cache_dir(srt_home_path)
+    compare_all_files(target_path, origin_dir, trans_dir, srt_home_path, cache_dir, rescan=args.full_rescan, walk_workers=args.walk_workers, jobs=args.jobs)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
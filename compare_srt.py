@@ -1,75 +1,157 @@
 import argparse
+import difflib
 from pathlib import Path
-from utils import parse_srt_blocks, get_srt_home  # 공통 utils import
+from utils import parse_srt_records, read_text_preserve_encoding, get_srt_home, log  # 공통 utils import
+from srt_cache import load_srt_records, get_parse_cache_dir
+from chunk_manifest import load_manifest
 
-def compare_srt_file(base_filename, origin_dir, trans_dir):
+try:
+    import numpy as np
+except ImportError:  # numpy 없으면 같은 비교를 리스트로 처리
+    np = None
+
+MAX_REPORT = 20  # 불일치 상세 출력 최대 건수
+
+def header_array(blocks):
+    """블록별 (번호, 타임스탬프) 배열 (numpy 있으면 (n, 2) object 배열, 없으면 튜플 리스트).
+    해시가 아닌 실제 문자열을 담아 비교하므로 OK 판정(이후 srt 이동/관련 파일 삭제)이 정확합니다."""
+    headers = [(block.num, block.time) for block in blocks]
+    if np is None:
+        return headers
+    return np.array(headers, dtype=object) if headers else np.empty((0, 2), dtype=object)
+
+def _differs(a, b):
+    """같은 길이의 두 헤더 배열에서 위치별로 번호 또는 타임스탬프가 다른지 (numpy면 bool 배열)."""
+    if np is not None:
+        return (a != b).any(axis=1)
+    return [x != y for x, y in zip(a, b)]
+
+def mismatch_indices(a, b):
+    """같은 길이의 두 헤더 배열에서 값이 다른 인덱스 목록."""
+    if np is not None:
+        return np.flatnonzero(_differs(a, b)).tolist()
+    return [i for i, differs in enumerate(_differs(a, b)) if differs]
+
+def first_divergence(a, b):
+    """처음으로 헤더가 다른 인덱스 (한쪽이 다른 쪽의 앞부분이면 짧은 쪽 길이)."""
+    n = min(len(a), len(b))
+    if np is not None:
+        diff = np.flatnonzero(_differs(a[:n], b[:n]))
+        return int(diff[0]) if len(diff) else n
+    return next((i for i in range(n) if a[i] != b[i]), n)
+
+def align_headers(a, b):
+    """두 헤더 배열을 정렬해 다른 구간 목록 [(tag, i1, i2, j1, j2)] 반환 (difflib opcode, 'equal' 제외).
+    공통 앞/뒤 부분은 배열 비교로 잘라내고 가운데만 시퀀스 정렬합니다."""
+    prefix = first_divergence(a, b)
+    a_rest, b_rest = a[prefix:], b[prefix:]
+    suffix = first_divergence(a_rest[::-1], b_rest[::-1])
+    a_mid = [tuple(header) for header in a_rest[:len(a_rest) - suffix]]  # difflib용 (numpy 행 → 튜플)
+    b_mid = [tuple(header) for header in b_rest[:len(b_rest) - suffix]]
+    matcher = difflib.SequenceMatcher(None, a_mid, b_mid, autojunk=False)
+    return [(tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+def _block_range(blocks, start, end):
+    return f"{start+1}~{end} (번호 {blocks[start].num}~{blocks[end-1].num})"
+
+def report_alignment(origin_blocks, trans_blocks, origin_headers, trans_headers):
+    """블록 수가 다를 때 첫 불일치 위치와 추가/누락/변경 구간을 출력합니다."""
+    first = first_divergence(origin_headers, trans_headers)
+    if first < min(len(origin_blocks), len(trans_blocks)):
+        log('error', f"첫 불일치: 블록 {first+1} - 원본 '{origin_blocks[first].num} {origin_blocks[first].time}', "
+              f"번역 '{trans_blocks[first].num} {trans_blocks[first].time}'")
+    else:
+        log('error', f"첫 불일치: 블록 {first+1} - 블록 {first}까지 일치, 이후 {'원본' if len(origin_blocks) > first else '번역'}에만 있음")
+    ops = align_headers(origin_headers, trans_headers)
+    for tag, i1, i2, j1, j2 in ops[:MAX_REPORT]:
+        if tag == 'delete':
+            log('error', f"누락: 원본 블록 {_block_range(origin_blocks, i1, i2)}이 번역에 없음")
+        elif tag == 'insert':
+            log('error', f"추가: 번역 블록 {_block_range(trans_blocks, j1, j2)}이 원본에 없음")
+        else:
+            log('error', f"변경: 원본 블록 {_block_range(origin_blocks, i1, i2)} ↔ 번역 블록 {_block_range(trans_blocks, j1, j2)}")
+    if len(ops) > MAX_REPORT:
+        log('error', f"... 외 {len(ops) - MAX_REPORT}개 구간")
+
+def compare_srt_file(base_filename, origin_dir, trans_dir, cache_dir=None, separated_dir=None, origin_files=None, trans_files=None):
+    """separated_dir 지정 시 separate가 남긴 manifest의 총 블록 수와도 대조합니다.
+    origin_files/trans_files: 호출 측에서 미리 찾은 파일 목록 (compare_all이 디렉토리를 한 번만 읽어 전달, None이면 glob)."""
     # 원본 파일 자동 검색: f"{base_filename}*.srt" 패턴 (e.g., HMN-520.ja.srt 매치)
-    origin_files = sorted(origin_dir.glob(f"{base_filename}*.srt"))
+    if origin_files is None:
+        origin_files = sorted(origin_dir.glob(f"{base_filename}*.srt"))
     if not origin_files:
-        print(f"오류: {base_filename}으로 시작하는 원본 파일이 없습니다. 중단합니다.")
+        log('error', f"오류: {base_filename}으로 시작하는 원본 파일이 없습니다. 중단합니다.")
         return False
     origin_file = origin_files[0]  # 첫 매치 사용 (여러 개 시 경고)
     if len(origin_files) > 1:
-        print(f"경고: 여러 원본 파일 매치 ({len(origin_files)}개). 첫 파일 {origin_file} 사용.")
+        log('warning', f"경고: 여러 원본 파일 매치 ({len(origin_files)}개). 첫 파일 {origin_file} 사용.")
     
     # 번역 파일 자동 검색: 동일 패턴
-    trans_files = sorted(trans_dir.glob(f"{base_filename}*.srt"))
+    if trans_files is None:
+        trans_files = sorted(trans_dir.glob(f"{base_filename}*.srt"))
     if not trans_files:
-        print(f"오류: {base_filename}으로 시작하는 번역 파일이 없습니다. 중단합니다.")
+        log('error', f"오류: {base_filename}으로 시작하는 번역 파일이 없습니다. 중단합니다.")
         return False
     trans_file = trans_files[0]  # 첫 매치 사용
     if len(trans_files) > 1:
-        print(f"경고: 여러 번역 파일 매치 ({len(trans_files)}개). 첫 파일 {trans_file} 사용.")
+        log('warning', f"경고: 여러 번역 파일 매치 ({len(trans_files)}개). 첫 파일 {trans_file} 사용.")
     
     try:
-        with open(origin_file, 'r', encoding='utf-8') as f:
-            origin_content = f.read()
-        origin_blocks = parse_srt_blocks(origin_content)
+        origin_blocks = load_srt_records(origin_file, cache_dir)
         
-        with open(trans_file, 'r', encoding='utf-8') as f:
-            trans_content = f.read()
-        trans_blocks = parse_srt_blocks(trans_content)
+        trans_content, _ = read_text_preserve_encoding(trans_file)
+        trans_blocks = parse_srt_records(trans_content)
         
-        # 총 자막 갯수 비교
+        origin_headers = header_array(origin_blocks)
+        trans_headers = header_array(trans_blocks)
+        
+        # 총 자막 갯수 비교: 다르면 어디서 어긋났는지 (첫 불일치 위치, 추가/누락 구간) 보고
         if len(origin_blocks) != len(trans_blocks):
-            print(f"총 자막 갯수 불일치: 원본 {len(origin_blocks)}, 번역 {len(trans_blocks)}. 중단합니다.")
+            log('error', f"총 자막 갯수 불일치: 원본 {len(origin_blocks)}, 번역 {len(trans_blocks)}. 중단합니다.")
+            report_alignment(origin_blocks, trans_blocks, origin_headers, trans_headers)
+            return False
+        
+        # 분할 시점의 블록 수와 비교 (분할 이후 원본이 바뀌었거나 병합이 잘못된 경우)
+        manifest = load_manifest(separated_dir, origin_file.stem) if separated_dir is not None else None
+        if manifest is not None and manifest['blocks'] != len(trans_blocks):
+            log('error', f"총 자막 갯수 불일치: 분할 manifest {manifest['blocks']}, 원본/번역 {len(trans_blocks)}. 중단합니다.")
             return False
         
-        # 각 블록 비교: 번호/타임스탬프 + 빈 대사 확인 (번역 파일에서)
-        mismatch_found = False
-        for i in range(len(origin_blocks)):
-            origin_lines = origin_blocks[i].splitlines()
-            trans_lines = trans_blocks[i].splitlines()
-            if len(origin_lines) < 2 or len(trans_lines) < 2:
-                continue
-            # 번호 비교
-            if origin_lines[0].strip() != trans_lines[0].strip():
-                print(f"불일치: 블록 {i+1} 자막 번호 - 원본 '{origin_lines[0].strip()}', 번역 '{trans_lines[0].strip()}'")
-                mismatch_found = True
-            # 타임스탬프 비교
-            if origin_lines[1].strip() != trans_lines[1].strip():
-                print(f"불일치: 블록 {i+1} 타임스탬프 - 원본 '{origin_lines[1].strip()}', 번역 '{trans_lines[1].strip()}'")
-                mismatch_found = True
-            # 빈 대사 확인 (번역 파일에서, 라인 2부터 모두 빈 문자열인지)
-            trans_text = '\n'.join(trans_lines[2:]).strip()
-            if not trans_text:
-                print(f"경고: 블록 {i+1} 대사가 비어 있습니다. (자막 번호와 타임스탬프만 있음)")
-                mismatch_found = True
+        # 번호/타임스탬프: 헤더 배열을 한 번에 비교한 뒤 다른 위치만 자세히 출력
+        messages = []
+        for i in mismatch_indices(origin_headers, trans_headers):
+            origin_block = origin_blocks[i]
+            trans_block = trans_blocks[i]
+            if origin_block.num != trans_block.num:
+                messages.append((i, f"불일치: 블록 {i+1} 자막 번호 - 원본 '{origin_block.num}', 번역 '{trans_block.num}'"))
+            if origin_block.time != trans_block.time:
+                messages.append((i, f"불일치: 블록 {i+1} 타임스탬프 - 원본 '{origin_block.time}', 번역 '{trans_block.time}'"))
+        # 빈 대사 확인 (번역 파일에서, 라인 2부터 모두 빈 문자열인지)
+        for i, trans_block in enumerate(trans_blocks):
+            if not trans_block.text:
+                messages.append((i, f"경고: 블록 {i+1} 대사가 비어 있습니다. (자막 번호와 타임스탬프만 있음)"))
         
-        if mismatch_found:
-            print("불일치 또는 빈 대사 부분이 있습니다. 중단합니다.")
+        if messages:
+            messages.sort(key=lambda item: item[0])  # 블록 순서로 출력 (같은 블록은 번호 → 타임스탬프 → 빈 대사 순)
+            for _, message in messages[:MAX_REPORT]:
+                log('error', message)
+            if len(messages) > MAX_REPORT:
+                log('error', f"... 외 {len(messages) - MAX_REPORT}건")
+            log('error', "불일치 또는 빈 대사 부분이 있습니다. 중단합니다.")
             return False
         else:
             print("모두 일치합니다. (빈 대사 없음) OK")
             return True
     except Exception as e:
-        print(f"오류 발생: {base_filename} - {e}")
+        log('error', f"오류 발생: {base_filename} - {e}")
         return False
 
 def main():
     parser = argparse.ArgumentParser(description="SRT_HOME/origin과 SRT_HOME/trans의 base_filename으로 시작하는 파일을 자동 찾아 비교합니다. 총 자막 갯수, 번호, 타임스탬프, 빈 대사 확인.")
     parser.add_argument('-f', '--file', required=True, help="base_filename (e.g., HMN-520, 언어 코드 자동 감지)")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--no-cache', action="store_true", help="파싱 캐시(SRT_HOME/cache/parsed) 사용 안 함")
     args = parser.parse_args()
     
     srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
@@ -84,7 +166,8 @@ def main():
     print(f"번역 디렉토리: {trans_dir}")
     print(f"base_filename: {base_filename}")
     
-    compare_srt_file(base_filename, origin_dir, trans_dir)
+    cache_dir = None if args.no_cache else get_parse_cache_dir(srt_home_path)
+    compare_srt_file(base_filename, origin_dir, trans_dir, cache_dir, separated_dir=srt_home_path / 'origin_separate')
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
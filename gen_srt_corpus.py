@@ -0,0 +1,127 @@
+# gen_srt_corpus.py (벤치마크/테스트용 SRT 코퍼스 생성: seed가 같으면 같은 파일 트리)
+import argparse
+import random
+import shutil
+from pathlib import Path
+
+PHRASES = ('はい', 'いいえ', 'ありがとう', 'ちょっと待って', 'どうしたの？', '大丈夫だよ', 'こんにちは世界', 'もう一回',
+           'そうですね', '気持ちいい', '本当に？', 'ここはどこ', 'また明日', 'お疲れ様でした', 'よろしくお願いします',
+           '賞金は10000000円だ！', '1111号室です', 'えっと.........', 'www!!!!!!!!')  # 숫자/문장부호 반복: 트리밍 대상 아님
+REPEAT_TOKENS = ('あっ', 'ん', 'はぁ', 'いや')
+KOREAN_PHRASES = ('안녕하세요', '고마워요', '잠깐만요', '괜찮아요', '내일 봐요')
+DEFAULT_ENCODINGS = ('utf-8', 'utf-8-sig', 'cp932', 'utf-16')
+SERIES = ('ABC', 'HMN', 'XYZ', 'PRD')
+
+def format_ms(ms):
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+def generate_cue_text(rng, multiline=0.25, repeat=0.05, cue_index=0):
+    """대사 하나: 일반 대사, 다중 라인 대사 또는 반복 토큰 루프 (trim_repeats 대상)."""
+    if rng.random() < repeat:
+        token = rng.choice(REPEAT_TOKENS)
+        return ' '.join([token] * rng.randint(8, 40))
+    text = rng.choice(PHRASES)
+    if rng.random() < 0.3:
+        text += f"{cue_index}"  # 같은 대사만 반복되지 않도록 일부는 고유 대사
+    if rng.random() < multiline:
+        text += '\n' + rng.choice(PHRASES)
+    return text
+
+def generate_srt(rng, cues, multiline=0.25, repeat=0.05, phrases=None):
+    """cues개 블록의 SRT 텍스트 (LF, 끝에 빈 라인). phrases 지정 시 그 대사만 사용 (e.g., 한글 자막)."""
+    out = []
+    t = rng.randint(0, 5000)
+    for i in range(1, cues + 1):
+        start = t
+        end = start + rng.randint(400, 4000)
+        t = end + rng.randint(0, 800)
+        text = rng.choice(phrases) * 3 if phrases else generate_cue_text(rng, multiline, repeat, i)
+        out.append(f"{i}\n{format_ms(start)} --> {format_ms(end)}\n{text}\n")
+    return '\n'.join(out) + '\n'
+
+def _title_dir(rng, vol_dir, depth):
+    parts = [f"d{rng.randint(0, 3)}" for _ in range(rng.randint(1, max(1, depth)))]
+    return vol_dir.joinpath(*parts)
+
+def generate_corpus(output_dir, titles=20, cues=1500, spread=0.5, multiline=0.25, repeat=0.05, depth=3, decoys=50,
+                    korean=2, encodings=DEFAULT_ENCODINGS, seed=1):
+    """output_dir/vol (mp4 + 외국어 srt, 한글 srt, 미끼 파일, 휴지통 디렉토리)와 output_dir/srt_home/patterns.txt 생성.
+    인코딩은 title마다 encodings를 돌아가며 사용하고, 3번째 title마다 CRLF. 요약 dict 반환."""
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    vol_dir = output_dir / 'vol'
+    srt_home = output_dir / 'srt_home'
+    shutil.rmtree(vol_dir, ignore_errors=True)
+    vol_dir.mkdir(parents=True)
+    srt_home.mkdir(parents=True, exist_ok=True)
+    (srt_home / 'patterns.txt').write_text('\n'.join(REPEAT_TOKENS) + '\n', encoding='utf-8')
+
+    summary = {'titles': 0, 'cues': 0, 'bytes': 0, 'srt_files': 0, 'mp4_files': 0, 'decoys': 0}
+    low = max(1, int(cues * (1 - spread)))
+    high = max(low, int(cues * (1 + spread)))
+    for k in range(titles):
+        base = f"{SERIES[k % len(SERIES)]}-{k:03d}"
+        title_dir = _title_dir(rng, vol_dir, depth)
+        title_dir.mkdir(parents=True, exist_ok=True)
+        count = rng.randint(low, high)
+        text = generate_srt(rng, count, multiline, repeat)
+        if k % 3 == 2:
+            text = text.replace('\n', '\r\n')
+        data = text.encode(encodings[k % len(encodings)])
+        (title_dir / f"{base}.srt").write_bytes(data)
+        (title_dir / f"{base}.mp4").write_bytes(b'\x00' * 16)
+        summary['titles'] += 1
+        summary['cues'] += count
+        summary['bytes'] += len(data)
+        summary['srt_files'] += 1
+        summary['mp4_files'] += 1
+
+    for k in range(korean):  # 이미 번역된 (한글) 자막: collect 대상 아님
+        title_dir = _title_dir(rng, vol_dir, depth)
+        title_dir.mkdir(parents=True, exist_ok=True)
+        (title_dir / f"KR-{k:03d}.srt").write_text(generate_srt(rng, 50, phrases=KOREAN_PHRASES), encoding='utf-8')
+        (title_dir / f"KR-{k:03d}.mp4").write_bytes(b'\x00' * 16)
+        summary['srt_files'] += 1
+        summary['mp4_files'] += 1
+
+    for k in range(decoys):  # srt 없는 mp4, 관련 없는 파일, 휴지통 안의 mp4/srt
+        kind = k % 3
+        if kind == 0:
+            decoy_dir = _title_dir(rng, vol_dir, depth)
+            decoy_dir.mkdir(parents=True, exist_ok=True)
+            (decoy_dir / f"DCY-{k:03d}.mp4").write_bytes(b'\x00' * 16)
+            summary['mp4_files'] += 1
+        elif kind == 1:
+            decoy_dir = _title_dir(rng, vol_dir, depth)
+            decoy_dir.mkdir(parents=True, exist_ok=True)
+            (decoy_dir / f"note-{k:03d}.txt").write_text('memo\n', encoding='utf-8')
+        else:
+            decoy_dir = vol_dir / '$RECYCLE.BIN' / f"t{k:03d}"
+            decoy_dir.mkdir(parents=True, exist_ok=True)
+            (decoy_dir / f"TRS-{k:03d}.mp4").write_bytes(b'\x00' * 16)
+            (decoy_dir / f"TRS-{k:03d}.srt").write_text(generate_srt(rng, 5), encoding='utf-8')
+        summary['decoys'] += 1
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크/테스트용 SRT 코퍼스를 생성합니다. (OUTPUT/vol: mp4/srt 트리, OUTPUT/srt_home/patterns.txt)")
+    parser.add_argument('-o', '--output', required=True, help="출력 디렉토리 (vol은 지우고 다시 생성)")
+    parser.add_argument('--titles', type=int, default=20, help="외국어 자막 title 수 (기본: 20)")
+    parser.add_argument('--cues', type=int, default=1500, help="title당 평균 블록 수 (기본: 1500)")
+    parser.add_argument('--spread', type=float, default=0.5, help="블록 수 변동 비율 (기본: 0.5 → 평균의 50%%~150%%)")
+    parser.add_argument('--multiline', type=float, default=0.25, help="다중 라인 대사 비율 (기본: 0.25)")
+    parser.add_argument('--repeat', type=float, default=0.05, help="반복 토큰 루프 대사 비율 (기본: 0.05)")
+    parser.add_argument('--depth', type=int, default=3, help="최대 디렉토리 깊이 (기본: 3)")
+    parser.add_argument('--decoys', type=int, default=50, help="미끼 파일 수 (srt 없는 mp4, txt, 휴지통, 기본: 50)")
+    parser.add_argument('--korean', type=int, default=2, help="한글 자막 title 수 (기본: 2)")
+    parser.add_argument('--encodings', default=','.join(DEFAULT_ENCODINGS), help=f"title별로 돌아가며 쓸 인코딩 (기본: {','.join(DEFAULT_ENCODINGS)})")
+    parser.add_argument('--seed', type=int, default=1, help="난수 seed (기본: 1)")
+    args = parser.parse_args()
+
+    summary = generate_corpus(args.output, args.titles, args.cues, args.spread, args.multiline, args.repeat, args.depth,
+                              args.decoys, args.korean, tuple(args.encodings.split(',')), args.seed)
+    print(f"생성됨: {args.output} - title {summary['titles']}개, 블록 {summary['cues']}개, {summary['bytes'] / 1e6:.1f}MB, "
+          f"srt {summary['srt_files']}개, mp4 {summary['mp4_files']}개, 미끼 {summary['decoys']}개")
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,95 @@
 import argparse
 from pathlib import Path
 import os
-from utils import get_srt_home, get_base_filename  # 공통 utils import
+from functools import partial
+from utils import get_srt_home, get_base_filename, run_jobs, log, progress  # 공통 utils import
 from merge_srt import merge_srt_file  # merge_srt.py의 함수 import (직접 호출)
+from chunk_manifest import scan_separated_dir
+from state_store import load_state, save_state, lookup, record, stat_outputs, sha1_bytes, sha1_text
+from metrics import count
 
-def merge_all_files(origin_separate_dir, trans_separate_dir, trans_dir):
-    # unique base_filename 추출 (중복 피함, .ja 등 포함)
-    base_filenames = set()
-    for file in origin_separate_dir.glob('*.srt'):
+def _merge_one(item, origin_separate_dir, trans_separate_dir, trans_dir):
+    base, base_docs = item
+    # lang=None으로 자동 감지 호출
+    return merge_srt_file(base, None, origin_separate_dir, trans_separate_dir, trans_dir, docs=base_docs)
+
+def _merge_input_hash(manifest, trans_separate_dir, base_docs):
+    """manifest 순서대로 병합할 trans chunk 내용(메모리 docs 또는 파일)의 해시. chunk가 없으면 None."""
+    hashes = []
+    for chunk in manifest['chunks']:
+        trans_chunk = trans_separate_dir / chunk['name']
+        if base_docs and trans_chunk in base_docs:
+            hashes.append(sha1_text(base_docs[trans_chunk]))
+            continue
+        try:
+            hashes.append(sha1_bytes(trans_chunk.read_bytes()))
+        except OSError:
+            return None
+    return sha1_text(''.join(hashes))
+
+def merge_all_files(origin_separate_dir, trans_separate_dir, trans_dir, docs=None, jobs=1, state=None):
+    """state(state_store) 지정 시 병합할 chunk 내용과 manifest가 같고 이전 병합 결과가 그대로인 base는 다시 쓰지 않습니다."""
+    # unique base_filename 추출 (중복 피함, .ja 등 포함): manifest 있는 base + manifest 없는 chunk의 base
+    manifests, loose_chunks = scan_separated_dir(origin_separate_dir)
+    base_manifests = {}  # base → merge_srt_file(lang=None)이 사용하는 manifest (stem 순서로 첫 번째)
+    for stem in sorted(manifests):
+        base_manifests.setdefault(get_base_filename(stem), manifests[stem])
+    base_filenames = set(base_manifests)
+    for file in loose_chunks:
         base = get_base_filename(file.stem)  # e.g., HMN-520.ja_000 → HMN-520
         base_filenames.add(base)
     
+    # 메모리 docs는 base별로 나눠서 해당 작업에만 전달
+    docs_by_base = {}
+    for path, text in (docs or {}).items():
+        docs_by_base.setdefault(get_base_filename(path.stem), {})[path] = text
+    
     processed_count = 0
+    unchanged = 0
     failed_bases = []
+    items = []
+    input_hashes = {}
     for base in sorted(base_filenames):
-        # lang=None으로 자동 감지 호출
-        if merge_srt_file(base, None, origin_separate_dir, trans_separate_dir, trans_dir):
+        manifest = base_manifests.get(base)
+        if state is not None and manifest is not None:
+            input_hash = _merge_input_hash(manifest, trans_separate_dir, docs_by_base.get(base))
+            params = [(chunk['name'], chunk['context']) for chunk in manifest['chunks']]
+            if input_hash is not None:
+                input_hashes[base] = (input_hash, params, trans_dir / f"{manifest['stem']}.srt")
+                if lookup(state, 'merge', base, input_hash, params) is not None:
+                    print(f"변경 없음: {base} - 이전 병합 결과 사용")
+                    unchanged += 1
+                    processed_count += 1
+                    count('unchanged')
+                    progress()
+                    continue
+        items.append((base, docs_by_base.get(base)))
+    worker = partial(_merge_one, origin_separate_dir=origin_separate_dir, trans_separate_dir=trans_separate_dir, trans_dir=trans_dir)
+    for (base, _), ok in run_jobs(worker, items, jobs, default=False):
+        if ok:
             processed_count += 1
+            count('files')
+            if base in input_hashes:
+                input_hash, params, output_path = input_hashes[base]
+                record(state, 'merge', base, input_hash, params, stat_outputs([output_path]))
         else:
             failed_bases.append(base)
-            print(f"병합 실패: {base}")
+            count('failed')
+            log('error', f"병합 실패: {base}")
+        progress()
     
-    print(f"총 {processed_count}개의 base_filename이 병합되었습니다.")
+    save_state(state)
+    log('summary', f"총 {processed_count}개의 base_filename이 병합되었습니다." + (f" (변경 없음: {unchanged}개)" if unchanged else ""))
     if failed_bases:
-        print("\n실패한 base_filename 목록:")
+        log('error', "\n실패한 base_filename 목록:")
         for failed in failed_bases:
-            print(f"- {failed}")
+            log('error', f"- {failed}")
 
 def main():
     parser = argparse.ArgumentParser(description="SRT_HOME/origin_separate의 모든 base_filename을 대상으로 merge_srt.py를 실행합니다. base_filename 자동 추출 후 병합 (lang 자동 감지).")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="병렬 처리 프로세스 수 (기본: 1)")
+    parser.add_argument('--no-cache', action="store_true", help="처리 상태(SRT_HOME/cache/state.json)를 무시하고 모두 병합")
     args = parser.parse_args()
     
     srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
@@ -45,7 +105,8 @@ def main():
         print(f"오류: {origin_separate_dir}가 존재하지 않습니다.")
         return
     
-    merge_all_files(origin_separate_dir, trans_separate_dir, trans_dir)
+    state = None if args.no_cache else load_state(srt_home_path)
+    merge_all_files(origin_separate_dir, trans_separate_dir, trans_dir, jobs=args.jobs, state=state)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,31 @@
 import argparse
 from pathlib import Path
 import os
-from utils import get_srt_home  # 공통 utils import
+from utils import read_text_preserve_encoding, parse_srt_records, get_srt_home, log  # 공통 utils import
+from chunk_manifest import find_manifest, check_chunks
+from metrics import count
 
-def merge_srt_file(base_filename, lang, origin_separate_dir, trans_separate_dir, trans_dir):
+def _manifest_chunks(manifest, origin_separate_dir, trans_separate_dir, verify_hash=False):
+    """manifest 기준 chunk 확인: (search_base, trans chunk 경로 목록, {chunk 이름: context 수}) 또는 실패 시 None."""
+    problems = check_chunks(manifest, origin_separate_dir, verify_hash)
+    if problems:
+        log('error', f"오류: origin_separate chunk가 manifest와 다릅니다. 다시 분할하세요. ({', '.join(problems[:5])})")
+        return None
+    trans_chunks = [trans_separate_dir / chunk['name'] for chunk in manifest['chunks']]
+    missing = [path.name for path in trans_chunks if not path.exists()]
+    if missing:
+        log('error', f"오류: trans_separate chunk 없음 ({len(missing)}/{len(trans_chunks)}개: {', '.join(missing[:5])})")
+        return None
+    # manifest보다 번호가 큰 chunk가 남아 있으면 이전 분할의 잔여 파일
+    stale = trans_separate_dir / f"{manifest['stem']}_{manifest['chunk_count']:03d}.srt"
+    if stale.exists():
+        log('error', f"오류: chunk 파일 갯수 불일치 (manifest: {manifest['chunk_count']}, trans에 {stale.name} 존재)")
+        return None
+    contexts = {chunk['name']: chunk['context'] for chunk in manifest['chunks'] if chunk['context']}
+    return manifest['stem'], trans_chunks, contexts
+
+def _glob_chunks(base_filename, lang, origin_separate_dir, trans_separate_dir):
+    """manifest가 없는 (이전 방식으로 분할된) chunk: glob + 정렬 + 번호 확인."""
     # lang 지정 시: search_pattern = f"{base_filename}.{lang}_*.srt"
     # lang None 시: search_pattern = f"{base_filename}*_*srt" (자동 *로 언어 코드 매치)
     search_pattern = f"{base_filename}.{lang}_*.srt" if lang else f"{base_filename}*_*.srt"
@@ -12,12 +34,12 @@ def merge_srt_file(base_filename, lang, origin_separate_dir, trans_separate_dir,
     trans_chunks = sorted(trans_separate_dir.glob(search_pattern))
     
     if len(origin_chunks) == 0:
-        print(f"오류: {base_filename}에 해당하는 origin_separate chunk 파일이 없습니다. (패턴: {search_pattern})")
-        return False
+        log('error', f"오류: {base_filename}에 해당하는 origin_separate chunk 파일이 없습니다. (패턴: {search_pattern})")
+        return None
     
     if len(origin_chunks) != len(trans_chunks):
-        print(f"오류: chunk 파일 갯수 불일치 (origin: {len(origin_chunks)}, trans: {len(trans_chunks)})")
-        return False
+        log('error', f"오류: chunk 파일 갯수 불일치 (origin: {len(origin_chunks)}, trans: {len(trans_chunks)})")
+        return None
     
     # search_base 추출: 첫 파일 stem.split('_')[0]
     search_base = origin_chunks[0].stem.split('_')[0]
@@ -27,27 +49,52 @@ def merge_srt_file(base_filename, lang, origin_separate_dir, trans_separate_dir,
         expected_suffix = f"_{i:03d}.srt"
         if origin_chunk.name.endswith(expected_suffix) and trans_chunk.name.endswith(expected_suffix):
             continue
-        print(f"오류: chunk 번호 불일치 (예상: {search_base}{expected_suffix}, origin: {origin_chunk.name}, trans: {trans_chunk.name})")
+        log('error', f"오류: chunk 번호 불일치 (예상: {search_base}{expected_suffix}, origin: {origin_chunk.name}, trans: {trans_chunk.name})")
+        return None
+    return search_base, trans_chunks, {}
+
+def merge_srt_file(base_filename, lang, origin_separate_dir, trans_separate_dir, trans_dir, docs=None, verify_hash=False):
+    # separate가 남긴 manifest가 있으면 chunk 목록/순서를 그대로 사용 (999개 초과 chunk도 순서 유지)
+    manifest = find_manifest(origin_separate_dir, base_filename, lang)
+    if manifest is not None:
+        resolved = _manifest_chunks(manifest, origin_separate_dir, trans_separate_dir, verify_hash)
+    else:
+        resolved = _glob_chunks(base_filename, lang, origin_separate_dir, trans_separate_dir)
+    if resolved is None:
         return False
+    search_base, trans_chunks, contexts = resolved
     
+    output_path = trans_dir / f"{search_base}.srt"
+    tmp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
     try:
-        output_path = trans_dir / f"{search_base}.srt"
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        merged_content = []
-        for trans_chunk in trans_chunks:
-            with open(trans_chunk, 'r', encoding='utf-8') as f:
-                content = f.read().rstrip()  # 끝 빈 라인 제거 후 병합
-                merged_content.append(content)
-        
-        final_output = '\n\n'.join(merged_content) + '\n\n'  # chunk 사이 빈 라인 유지
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(final_output)
+        # chunk를 읽는 대로 임시 파일에 기록 (전체 결과를 메모리에 모으지 않음), 완료 후 교체
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for i, trans_chunk in enumerate(trans_chunks):
+                if docs and trans_chunk in docs:  # restore 결과가 메모리에 있으면 그대로 사용
+                    content = docs[trans_chunk]
+                else:
+                    content, _ = read_text_preserve_encoding(trans_chunk)
+                # context(overlap) 블록은 앞 chunk와 중복되므로 제거
+                context = contexts.get(trans_chunk.name, 0)
+                if context:
+                    content = ''.join(block.raw for block in parse_srt_records(content)[context:])
+                if i:
+                    f.write('\n\n')  # chunk 사이 빈 라인 유지
+                f.write(content.rstrip())  # 끝 빈 라인 제거 후 병합
+            f.write('\n\n')
+        os.replace(tmp_path, output_path)
+        count('bytes_written', output_path.stat().st_size)
         
         print(f"병합 완료: {output_path} (총 chunk: {len(trans_chunks)}, lang: {lang or 'auto'})")
         return True
     except Exception as e:
-        print(f"오류 발생: {base_filename} - {e}")
+        log('error', f"오류 발생: {base_filename} - {e}")
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
         return False
 
 def main():
@@ -55,6 +102,7 @@ def main():
     parser.add_argument('-f', '--file', required=True, help="base_filename (e.g., HMN-520)")
     parser.add_argument('-l', '--lang', help="언어 코드 (e.g., ja. 기본: 자동)")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--verify-hash', action="store_true", help="origin_separate chunk 내용을 manifest 해시와 비교 (기본: 크기만 비교)")
     args = parser.parse_args()
     
     srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
@@ -72,7 +120,7 @@ def main():
     print(f"base_filename: {base_filename}")
     print(f"lang: {args.lang or 'auto'}")
     
-    merge_srt_file(base_filename, args.lang, origin_separate_dir, trans_separate_dir, trans_dir)
+    merge_srt_file(base_filename, args.lang, origin_separate_dir, trans_separate_dir, trans_dir, verify_hash=args.verify_hash)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
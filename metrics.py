@@ -0,0 +1,116 @@
+# metrics.py (stage별 wall/CPU 시간과 카운터 기록: SRT_HOME/metrics/{시각}_{run}.json, profile 시 stage별 cProfile 통계)
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+PROFILE_TOP = 25  # metrics JSON에 남길 stage별 hot 함수 수
+
+# 현재 프로세스의 카운터: 'files', 'failed', 'cues', 'bytes_read', 'bytes_written', 'cache_hits' 등.
+# process pool 작업은 자식 프로세스에서 센 값을 결과와 함께 돌려주고 부모에서 합칩니다 (utils.run_jobs).
+_counters = Counter()
+
+def count(name, n=1):
+    _counters[name] += n
+
+def take_counters():
+    """지금까지 센 값을 dict로 반환하고 초기화."""
+    counts = dict(_counters)
+    _counters.clear()
+    return counts
+
+def merge_counters(counts):
+    if counts:
+        _counters.update(counts)
+
+def get_metrics_dir(srt_home):
+    return Path(srt_home) / 'metrics'
+
+def _cpu_seconds():
+    """(현재 프로세스 CPU, 종료된 자식 프로세스 CPU) 초 (user + system)."""
+    t = os.times()
+    return t.user + t.system, t.children_user + t.children_system
+
+def hot_functions(profiler, top=PROFILE_TOP):
+    """cProfile 결과에서 누적 시간 상위 함수 목록."""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (cc, nc, tottime, cumtime, _) in stats.stats.items():
+        rows.append({'function': f"{Path(filename).name}:{line}({func})", 'calls': nc, 'tottime': round(tottime, 6), 'cumtime': round(cumtime, 6)})
+    rows.sort(key=lambda row: row['cumtime'], reverse=True)
+    return rows[:top]
+
+class MetricsRun:
+    """실행 하나(e.g., before_trans)의 stage별 기록. stage()로 감싼 구간의 시간과 그동안 센 카운터를 모읍니다."""
+    def __init__(self, name, profile=False):
+        self.name = name
+        self.profile = profile
+        self.started = time.time()
+        self.stages = []
+        self.profiles = {}
+
+    @contextmanager
+    def stage(self, name):
+        take_counters()  # 이전 구간 카운터 버림
+        wall = time.perf_counter()
+        cpu, children = _cpu_seconds()
+        profiler = cProfile.Profile() if self.profile else None
+        if profiler is not None:
+            profiler.enable()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            end_cpu, end_children = _cpu_seconds()
+            entry = {
+                'stage': name,
+                'wall': round(time.perf_counter() - wall, 6),
+                'cpu': round(end_cpu - cpu, 6),
+                'cpu_children': round(end_children - children, 6),  # process pool / subprocess
+                'counters': take_counters(),
+            }
+            if error is not None:
+                entry['error'] = error
+            if profiler is not None:
+                entry['hot'] = hot_functions(profiler)
+                self.profiles[name] = profiler
+            self.stages.append(entry)
+            from utils import log  # utils가 metrics를 import하므로 지연 import
+            log('summary', f"[{name}] {entry['wall']:.2f}초 (CPU {entry['cpu'] + entry['cpu_children']:.2f}초)"
+                + ''.join(f", {key} {value}" for key, value in sorted(entry['counters'].items())))
+
+    def save(self, srt_home):
+        """metrics JSON 저장 (tmp 후 교체). profile 시 stage별 .prof 파일도 같은 이름으로 저장. 경로 반환."""
+        metrics_dir = get_metrics_dir(srt_home)
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))}_{self.name}"
+        data = {
+            'run': self.name,
+            'started': self.started,
+            'wall': round(sum(entry['wall'] for entry in self.stages), 6),
+            'stages': self.stages,
+        }
+        for name, profiler in self.profiles.items():
+            prof_path = metrics_dir / f"{stem}.{name}.prof"
+            profiler.dump_stats(str(prof_path))
+            data.setdefault('profiles', {})[name] = prof_path.name
+        metrics_path = metrics_dir / f"{stem}.json"
+        tmp_path = metrics_path.with_name(metrics_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, metrics_path)
+        return metrics_path
+
+def stage(run, name):
+    """run이 None이면 아무것도 기록하지 않는 context."""
+    return run.stage(name) if run is not None else nullcontext()
@@ -0,0 +1,96 @@
+# mock_translate_server.py (translate_srt.py 테스트용 로컬 번역 backend: 대사 라인 앞에 '번역: '을 붙여 돌려줌)
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils import parse_srt_records
+
+def mock_translate(text, fence=False):
+    """번호/타임스탬프는 그대로, 대사 라인마다 '번역: ' 추가. fence=True이면 LLM처럼 ```srt 코드 블록으로 감쌈."""
+    out = []
+    for block in parse_srt_records(text):
+        lines = [f"번역: {line}" if line.strip() else line for line in block.text.split('\n')]
+        out.append(f"{block.num}\n{block.time}\n" + '\n'.join(lines) + '\n')
+    result = '\n'.join(out) + '\n'
+    return f"```srt\n{result}```\n" if fence else result
+
+def make_server(host='127.0.0.1', port=8765, latency=0.0, jitter=0.0, fail_rate=0.0, max_concurrent=None, fence=False):
+    """POST /translate {text, ...} → {text}. latency(+jitter)초 지연, fail_rate 확률로 503,
+    동시 요청이 max_concurrent를 넘으면 429 (Retry-After: 1)."""
+    state = {'active': 0, 'requests': 0, 'rejected': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, payload, headers=None):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                request = json.loads(self.rfile.read(length).decode('utf-8'))
+                text = request['text']
+            except (ValueError, KeyError, TypeError):
+                self._reply(400, {'error': 'text가 없습니다.'})
+                return
+            with lock:
+                state['requests'] += 1
+                if max_concurrent and state['active'] >= max_concurrent:
+                    state['rejected'] += 1
+                    rejected = True
+                else:
+                    state['active'] += 1
+                    rejected = False
+            if rejected:
+                self._reply(429, {'error': '동시 요청 초과'}, {'Retry-After': '1'})
+                return
+            try:
+                time.sleep(latency + random.uniform(0, jitter))
+                if fail_rate and random.random() < fail_rate:
+                    with lock:
+                        state['failed'] += 1
+                    self._reply(503, {'error': '임시 오류'})
+                    return
+                self._reply(200, {'text': mock_translate(text, fence)})
+            finally:
+                with lock:
+                    state['active'] -= 1
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.stats = state
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="translate_srt.py 테스트용 로컬 번역 서버 (POST {text} → {text}, 대사 앞에 '번역: ' 추가).")
+    parser.add_argument('--host', default='127.0.0.1', help="바인드 주소 (기본: 127.0.0.1)")
+    parser.add_argument('-p', '--port', type=int, default=8765, help="포트 (기본: 8765)")
+    parser.add_argument('--latency', type=float, default=0.0, help="요청당 지연 (초)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="추가 무작위 지연 최대값 (초)")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="503 응답 확률 (0~1)")
+    parser.add_argument('--max-concurrent', type=int, help="동시 처리 요청 수 상한 (넘으면 429)")
+    parser.add_argument('--fence', action="store_true", help="응답을 ```srt 코드 블록으로 감쌈")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.jitter, args.fail_rate, args.max_concurrent, args.fence)
+    print(f"mock 번역 서버: http://{args.host}:{args.port}/translate")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"요약: 요청 {server.stats['requests']}회, 429 {server.stats['rejected']}회, 503 {server.stats['failed']}회")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# pipeline.py (in-process pipeline: 1.before_trans.py / 2.after_trans.py의 stage들을 한 프로세스에서 실행)
+from collect_srt import collect_srt_files
+from rename_all import rename_all_files
+from trim_repeats_srt import trim_repeats_all
+from separate_all import separate_all_files
+from restore_all import restore_all_files
+from merge_all import merge_all_files
+from compare_all import compare_all_files
+from srt_cache import get_parse_cache_dir
+from state_store import load_state
+from translation_memory import get_tm_path
+from utils import log
+from metrics import stage
+from run_log import log_stage
+
+# trim_repeats_srt.py 기본값과 동일
+TRIM_MIN_REPEAT = 7
+TRIM_KEEP_REPEAT = 3
+
+def run_before_trans(target_path, srt_home_path, lang, materialize=False, use_cache=True, rescan=False, jobs=1, chunk_options=None, metrics=None, run_log=None):
+    """collect → rename → trim → separate.
+    trim 결과는 docs(경로 → 텍스트)로 separate에 직접 전달되며, materialize=True일 때만 origin 파일에 기록합니다.
+    use_cache=True이면 파싱 캐시와 함께 처리 상태(state_store)를 사용해 내용이 바뀌지 않은 파일은 건너뜁니다.
+    metrics(metrics.MetricsRun) 지정 시 stage별 시간/카운터를, run_log(run_log.RunLog) 지정 시 stage별 출력을 JSONL로 기록합니다."""
+    origin_dir = srt_home_path / 'origin'
+    separated_dir = srt_home_path / 'origin_separate'
+    cache_dir = get_parse_cache_dir(srt_home_path) if use_cache else None
+    state = load_state(srt_home_path) if use_cache else None
+    docs = {}
+
+    print("\n--- collect_srt ---")
+    with log_stage(run_log, 'collect'), stage(metrics, 'collect'):
+        collect_srt_files(target_path, srt_home_path, rescan=rescan)
+
+    print("\n--- rename_all ---")
+    if origin_dir.exists():
+        with log_stage(run_log, 'rename'), stage(metrics, 'rename'):
+            rename_all_files(origin_dir, lang)
+    else:
+        log('error', f"오류: {origin_dir}가 존재하지 않습니다.")
+        return
+
+    print("\n--- trim_repeats ---")
+    with log_stage(run_log, 'trim'), stage(metrics, 'trim'):
+        trim_repeats_all(origin_dir, srt_home_path / 'patterns.txt', TRIM_MIN_REPEAT, TRIM_KEEP_REPEAT, False,
+                         dry_run=not materialize, docs=docs, state=state)
+
+    print("\n--- separate_all ---")
+    with log_stage(run_log, 'separate'), stage(metrics, 'separate'):
+        separate_all_files(origin_dir, separated_dir, cache_dir, docs=docs, jobs=jobs, options=chunk_options, state=state)
+
+def run_after_trans(target_path, srt_home_path, materialize=False, use_cache=True, rescan=False, jobs=1, use_tm=True, metrics=None, run_log=None):
+    """restore → merge → compare.
+    restore 결과는 docs로 merge에 직접 전달되며, materialize=True일 때만 trans_separate chunk를 덮어씁니다."""
+    origin_dir = srt_home_path / 'origin'
+    origin_separate_dir = srt_home_path / 'origin_separate'
+    trans_separate_dir = srt_home_path / 'trans_separate'
+    trans_dir = srt_home_path / 'trans'
+    cache_dir = get_parse_cache_dir(srt_home_path) if use_cache else None
+    state = load_state(srt_home_path) if use_cache else None
+    docs = {}
+
+    if not origin_separate_dir.exists():
+        log('error', f"오류: {origin_separate_dir}가 존재하지 않습니다.")
+        return
+
+    print("\n--- restore_all ---")
+    with log_stage(run_log, 'restore'), stage(metrics, 'restore'):
+        restore_all_files(origin_separate_dir, trans_separate_dir, cache_dir, docs=docs, write=materialize, jobs=jobs, state=state,
+                          tm_path=get_tm_path(srt_home_path) if use_tm else None)
+
+    print("\n--- merge_all ---")
+    with log_stage(run_log, 'merge'), stage(metrics, 'merge'):
+        merge_all_files(origin_separate_dir, trans_separate_dir, trans_dir, docs=docs, jobs=jobs, state=state)
+
+    print("\n--- compare_all ---")
+    if not origin_dir.exists():
+        log('error', f"오류: {origin_dir}가 존재하지 않습니다.")
+        return
+    with log_stage(run_log, 'compare'), stage(metrics, 'compare'):
+        compare_all_files(target_path, origin_dir, trans_dir, srt_home_path, cache_dir, rescan=rescan, jobs=jobs)
@@ -1,8 +1,9 @@
 # rename_all.py (새 파일: origin 전체 파일 이름 변경)
 import argparse
 from pathlib import Path
-from utils import get_srt_home
+from utils import get_srt_home, log, progress
 from rename_srt import rename_srt_file  # rename_srt.py 함수 import
+from metrics import count
 
 def rename_all_files(origin_dir, lang):
     renamed_count = 0
@@ -10,15 +11,18 @@ def rename_all_files(origin_dir, lang):
     for file in origin_dir.glob('*.srt'):
         if rename_srt_file(file, lang, origin_dir):
             renamed_count += 1
+            count('files')
         else:
             failed_files.append(file.name)
-            print(f"이름 변경 실패: {file.name}")
+            count('failed')
+            log('error', f"이름 변경 실패: {file.name}")
+        progress()
     
-    print(f"총 {renamed_count}개의 SRT 파일 이름이 변경되었습니다.")
+    log('summary', f"총 {renamed_count}개의 SRT 파일 이름이 변경되었습니다.")
     if failed_files:
-        print("\n실패한 파일 목록:")
+        log('error', "\n실패한 파일 목록:")
         for failed in failed_files:
-            print(f"- {failed}")
+            log('error', f"- {failed}")
 
 def main():
     parser = argparse.ArgumentParser(description="SRT_HOME/origin의 모든 SRT 파일 이름을 base_filename.lang.srt로 변경합니다.")
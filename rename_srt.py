@@ -1,11 +1,11 @@
 # rename_srt.py (새 파일: 단일 파일 이름 변경)
 import argparse
 from pathlib import Path
-from utils import get_base_filename, get_srt_home
+from utils import get_base_filename, get_srt_home, log
 
 def rename_srt_file(file_path, lang, origin_dir):
     if not file_path.exists():
-        print(f"오류: {file_path}가 존재하지 않습니다.")
+        log('error', f"오류: {file_path}가 존재하지 않습니다.")
         return False
     
     base = get_base_filename(file_path.stem)
@@ -13,14 +13,14 @@ def rename_srt_file(file_path, lang, origin_dir):
     new_path = origin_dir / new_filename
     
     if new_path.exists():
-        print(f"경고: {new_path}가 이미 존재합니다. 덮어쓰기.")
+        log('warning', f"경고: {new_path}가 이미 존재합니다. 덮어쓰기.")
     
     try:
         file_path.rename(new_path)
         print(f"이름 변경: {file_path} -> {new_path}")
         return True
     except Exception as e:
-        print(f"오류: 이름 변경 실패 - {e}")
+        log('error', f"오류: 이름 변경 실패 - {e}")
         return False
 
 def main():
@@ -1,33 +1,101 @@
 import argparse
 from pathlib import Path
 import os
-from utils import get_srt_home  # 공통 utils import
+from functools import partial
+from utils import get_srt_home, run_jobs, log, progress  # 공통 utils import
 from restore_srt import restore_srt_file  # restore_srt.py의 함수 import (직접 호출)
+from srt_cache import get_parse_cache_dir, prune_parse_cache
+from chunk_manifest import scan_separated_dir
+from state_store import load_state, save_state, lookup, record, sha1_bytes
+from translation_memory import get_tm_path, open_tm, add_pairs
+from metrics import count
 
-def restore_all_files(origin_separate_dir, trans_separate_dir):
+def _restore_input_hash(origin_file, trans_file):
+    return sha1_bytes(origin_file.read_bytes()) + sha1_bytes(trans_file.read_bytes())
+
+def _restore_one(target, origin_separate_dir, trans_separate_dir, cache_dir, collect_docs, write, collect_tm):
+    """process pool 작업 단위: docs, TM 쌍은 자식 프로세스에서 공유되지 않으므로 결과와 함께 돌려줌."""
+    file, expected_blocks = target
+    docs = {} if collect_docs else None
+    tm_pairs = [] if collect_tm else None
+    ok = restore_srt_file(file, origin_separate_dir, trans_separate_dir, cache_dir, docs=docs, write=write,
+                          expected_blocks=expected_blocks, tm_pairs=tm_pairs)
+    return ok, docs, tm_pairs
+
+def _list_chunks(origin_separate_dir):
+    """복원 대상 chunk 목록 [(경로, manifest의 블록 수 또는 None)]: manifest 순서 + manifest 없는 chunk."""
+    manifests, loose_chunks = scan_separated_dir(origin_separate_dir)
+    chunks = []
+    for stem in sorted(manifests):
+        chunks.extend((origin_separate_dir / chunk['name'], chunk['blocks']) for chunk in manifests[stem]['chunks'])
+    chunks.extend((file, None) for file in sorted(loose_chunks))
+    return chunks
+
+def restore_all_files(origin_separate_dir, trans_separate_dir, cache_dir=None, docs=None, write=True, jobs=1, state=None, tm_path=None):
+    """state(state_store) 지정 시 이미 복원된 chunk(원본 chunk와 복원 결과 해시가 기록과 같음)는 건너뜁니다.
+    (write=False이면 복원 결과가 파일에 없고 merge가 메모리의 복원 결과(docs)를 쓰므로 항상 복원: 2.after_trans.py --materialize에서만 건너뜀)
+    tm_path 지정 시 복원한 원문/번역 대사 쌍을 번역 메모리에 추가합니다 (현재 프로세스에서 한 번에 기록)."""
     processed_count = 0
+    unchanged = 0
+    use_state = state is not None and write
     skipped_files = []
-    for file in origin_separate_dir.glob('*.srt'):
-        trans_file = trans_separate_dir / file.name
-        if not trans_file.exists():
+    targets = []
+    # trans_separate는 한 번만 읽어 존재 여부 확인 (chunk마다 stat 하지 않음)
+    trans_names = set(os.listdir(trans_separate_dir)) if trans_separate_dir.is_dir() else set()
+    for file, expected_blocks in _list_chunks(origin_separate_dir):
+        if file.name not in trans_names:
             skipped_files.append(file.name)
-            print(f"스킵됨: {file.name} - SRT_HOME/trans_separate에 해당 파일 없음")
+            count('skipped')
+            log('warning', f"스킵됨: {file.name} - SRT_HOME/trans_separate에 해당 파일 없음")
+            progress()
             continue
-        
-        if restore_srt_file(file, origin_separate_dir, trans_separate_dir):
+        if use_state and lookup(state, 'restore', file.name, _restore_input_hash(file, trans_separate_dir / file.name), {}) is not None:
+            print(f"변경 없음: {file.name} - 이미 복원됨")
+            unchanged += 1
+            processed_count += 1
+            count('unchanged')
+            progress()
+            continue
+        targets.append((file, expected_blocks))
+    
+    worker = partial(_restore_one, origin_separate_dir=origin_separate_dir, trans_separate_dir=trans_separate_dir,
+                     cache_dir=cache_dir, collect_docs=docs is not None, write=write, collect_tm=tm_path is not None)
+    tm_pairs = []
+    for (file, _), (ok, restored, pairs) in run_jobs(worker, targets, jobs, default=(False, None, None)):
+        if restored and docs is not None:
+            docs.update(restored)
+        if ok and pairs:
+            tm_pairs.extend(pairs)
+        if ok:
             processed_count += 1
+            count('files')
+            if use_state:
+                record(state, 'restore', file.name, _restore_input_hash(file, trans_separate_dir / file.name), {}, {})
         else:
-            print(f"처리 실패: {file.name}")
+            count('failed')
+            log('error', f"처리 실패: {file.name}")
+        progress()
     
-    print(f"총 {processed_count}개의 SRT 파일이 복원되었습니다.")
+    save_state(state if use_state else None)
+    if tm_pairs:
+        conn = open_tm(tm_path)
+        try:
+            log('summary', f"번역 메모리 추가: {add_pairs(conn, tm_pairs)}개")
+        finally:
+            conn.close()
+    prune_parse_cache(cache_dir)
+    log('summary', f"총 {processed_count}개의 SRT 파일이 복원되었습니다." + (f" (이미 복원됨: {unchanged}개)" if unchanged else ""))
     if skipped_files:
-        print("\n스킵된 파일 목록:")
+        log('warning', "\n스킵된 파일 목록:")
         for skipped in skipped_files:
-            print(f"- {skipped}")
+            log('warning', f"- {skipped}")
 
 def main():
     parser = argparse.ArgumentParser(description="SRT_HOME/origin_separate의 모든 SRT 파일을 대상으로 restore_srt.py를 실행합니다. trans_separate에 없는 파일은 스킵하고 목록 출력.")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--no-cache', action="store_true", help="파싱 캐시(SRT_HOME/cache/parsed)와 처리 상태(SRT_HOME/cache/state.json) 사용 안 함")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="병렬 처리 프로세스 수 (기본: 1)")
+    parser.add_argument('--no-tm', action="store_true", help="복원한 원문/번역 대사를 번역 메모리(SRT_HOME/cache/tm.sqlite)에 추가하지 않음")
     args = parser.parse_args()
     
     srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
@@ -43,7 +111,10 @@ def main():
         print(f"오류: {origin_separate_dir}가 존재하지 않습니다.")
         return
     
-    restore_all_files(origin_separate_dir, trans_separate_dir)
+    cache_dir = None if args.no_cache else get_parse_cache_dir(srt_home_path)
+    state = None if args.no_cache else load_state(srt_home_path)
+    tm_path = None if args.no_tm else get_tm_path(srt_home_path)
+    restore_all_files(origin_separate_dir, trans_separate_dir, cache_dir, jobs=args.jobs, state=state, tm_path=tm_path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
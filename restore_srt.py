@@ -1,74 +1,112 @@
 # restore_srt.py
 import argparse
 from pathlib import Path
-from utils import parse_srt_blocks, clean_trans_text, get_srt_home  # 공통 utils import
+from utils import parse_srt_records, clean_trans_text, read_text_preserve_encoding, get_srt_home, log  # 공통 utils import
+from srt_cache import load_srt_records, get_parse_cache_dir
+from chunk_manifest import load_chunk_map
+from translation_memory import get_tm_path, open_tm, add_pairs, cue_pairs
+from metrics import count
 
-def restore_srt_file(file_path, origin_separate_dir, trans_separate_dir):
+def expand_chunk_map(chunk_map, slot_texts, trans_blocks):
+    """map(TM으로 채운 블록 정보)으로 전체 블록의 (headers, 대사 목록) 생성.
+    번역 chunk가 이미 전체 블록으로 복원된 상태(헤더가 map과 같음)이면 그 대사를 그대로 사용합니다."""
+    headers = [tuple(header) for header in chunk_map['headers']]
+    if [(block.num, block.time) for block in trans_blocks] == headers:
+        return headers, [block.text for block in trans_blocks]
+    texts = []
+    for slot, prefill in zip(chunk_map['slots'], chunk_map['prefill']):
+        if slot is None:
+            texts.append(prefill)
+        else:
+            texts.append(slot_texts[slot] if slot < len(slot_texts) else '')
+    return headers, texts
+
+def restore_srt_file(file_path, origin_separate_dir, trans_separate_dir, cache_dir=None, docs=None, write=True, expected_blocks=None, tm_pairs=None):
+    """expected_blocks: manifest에 기록된 원본 chunk 블록 수 (다르면 분할 이후 chunk가 바뀐 것이므로 중단).
+    tm_pairs 지정 시 (리스트) 번역 메모리에 넣을 (정규화 원문, 번역) 쌍을 추가합니다."""
     trans_file = trans_separate_dir / file_path.name
     if not trans_file.exists():
-        print(f"오류: {trans_file}가 존재하지 않습니다. 중단합니다.")
+        log('error', f"오류: {trans_file}가 존재하지 않습니다. 중단합니다.")
         return False
     
     origin_file = origin_separate_dir / file_path.name
     if not origin_file.exists():
-        print(f"오류: 원본 chunk {origin_file}가 없어 중단합니다.")
+        log('error', f"오류: 원본 chunk {origin_file}가 없어 중단합니다.")
         return False
     
     try:
-        with open(origin_file, 'r', encoding='utf-8') as f:
-            origin_content = f.read()
-        
-        with open(trans_file, 'r', encoding='utf-8') as f:
-            trans_content = f.read()
+        trans_content, _ = read_text_preserve_encoding(trans_file)
         
         # 불필요 문구만 제거 (빈 라인 유지)
         cleaned_trans = clean_trans_text(trans_content)
         
         # 원본 블록 파싱
-        origin_blocks = parse_srt_blocks(origin_content)
+        origin_blocks = load_srt_records(origin_file, cache_dir)
+        if expected_blocks is not None and len(origin_blocks) != expected_blocks:
+            log('error', f"오류: {origin_file} 블록 수가 manifest와 다릅니다 (manifest: {expected_blocks}, 파일: {len(origin_blocks)}). 다시 분할하세요.")
+            return False
         
         # 원본 headers 배열: (num, time) tuples
-        origin_headers = []
-        for block in origin_blocks:
-            lines = block.splitlines()
-            if len(lines) >= 2:
-                origin_headers.append((lines[0].strip(), lines[1].strip()))
+        origin_headers = [(block.num, block.time) for block in origin_blocks]
         
         # 번역 블록 파싱 (cleaned, 빈 라인 유지)
-        trans_blocks = parse_srt_blocks(cleaned_trans)
+        trans_blocks = parse_srt_records(cleaned_trans)
+        
+        # 번역 대사 배열: 빈 포함, 중간 빈 라인 유지 (다중 라인 유지, 앞뒤 공백만 제거)
+        trans_texts = [block.text for block in trans_blocks]
         
-        # 번역 대사 배열: 빈 포함, 중간 빈 라인 유지
-        trans_texts = []
-        for block in trans_blocks:
-            lines = block.splitlines()
-            if len(lines) > 2:
-                text = '\n'.join(lines[2:]).strip()  # 다중 라인 유지, 끝 공백만 제거
+        # 번역 대사 배열을 원본 chunk 블록 위치에 맞춤 (부족하면 빈 대사)
+        slot_texts = [trans_texts[i] if i < len(trans_texts) else '' for i in range(len(origin_headers))]
+        texts = slot_texts
+
+        # 번역 블록의 번호/타임스탬프가 원본 chunk(또는 map의 전체 블록)와 모두 같을 때만 대사 위치가 맞는 것으로 봄
+        trans_headers = [(block.num, block.time) for block in trans_blocks]
+        chunk_map = load_chunk_map(origin_separate_dir, file_path.name)
+        aligned = trans_headers == origin_headers or (chunk_map is not None and trans_headers == [tuple(header) for header in chunk_map['headers']])
+
+        # TM으로 채운 블록이 있는 chunk: map으로 전체 블록 복원
+        if chunk_map is not None:
+            origin_headers, texts = expand_chunk_map(chunk_map, slot_texts, trans_blocks)
+            first_index = {}
+            for i, slot in enumerate(chunk_map['slots']):
+                if slot is not None:
+                    first_index.setdefault(slot, i)
+            slot_texts = [texts[first_index[k]] if k in first_index else '' for k in range(len(origin_blocks))]
+        if tm_pairs is not None:
+            if aligned:
+                tm_pairs.extend(cue_pairs([block.text for block in origin_blocks], slot_texts))
             else:
-                text = ''
-            trans_texts.append(text)
+                # 블록이 빠지거나 합쳐진 번역은 이후 대사가 밀려 있으므로 TM에 넣지 않음 (기존 번역을 잘못된 번역으로 덮어쓰지 않도록)
+                log('warning', f"경고: {trans_file} 번역 블록의 번호/타임스탬프가 원본과 달라 번역 메모리에 추가하지 않습니다.")
         
         # 병합: 원본 길이 기준
         merged_blocks = []
         for i in range(len(origin_headers)):
             header_num, header_time = origin_headers[i]
-            text = trans_texts[i] if i < len(trans_texts) else ''
+            text = texts[i]
             block = f"{header_num}\n{header_time}\n{text}\n"
             merged_blocks.append(block)
         
         # 저장: 마지막 빈 라인 유지
         output = '\n'.join(merged_blocks).rstrip() + '\n\n'
-        with open(trans_file, 'w', encoding='utf-8') as f:
-            f.write(output)
+        if docs is not None:
+            docs[trans_file] = output  # 다음 stage(merge)에 메모리로 전달
+        if write:
+            with open(trans_file, 'w', encoding='utf-8') as f:
+                f.write(output)
+            count('bytes_written', trans_file.stat().st_size)
         print(f"복원 완료: {trans_file} (원본 블록: {len(origin_blocks)}, 번역 블록: {len(trans_blocks)}, 병합 블록: {len(merged_blocks)})")
         return True
     except Exception as e:
-        print(f"오류 발생: {trans_file} - {e}")
+        log('error', f"오류 발생: {trans_file} - {e}")
         return False
 
 def main():
     parser = argparse.ArgumentParser(description="SRT_HOME/trans_separate의 파일을 복원합니다. 불필요 문구 제거 후 원본 번호/타임스탬프와 번역 대사(빈 포함) 병합.")
     parser.add_argument('-f', '--file', required=True, help="복원할 파일 경로 (이름만으로도 가능, e.g., HMN-520.ja_000.srt)")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--no-cache', action="store_true", help="파싱 캐시(SRT_HOME/cache/parsed) 사용 안 함")
+    parser.add_argument('--no-tm', action="store_true", help="복원한 원문/번역 대사를 번역 메모리(SRT_HOME/cache/tm.sqlite)에 추가하지 않음")
     args = parser.parse_args()
     
     srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
@@ -83,7 +121,14 @@ def main():
     print(f"번역 분할 디렉토리: {trans_separate_dir}")
     print(f"입력 파일: {file_path}")
     
-    restore_srt_file(file_path, origin_separate_dir, trans_separate_dir)
+    cache_dir = None if args.no_cache else get_parse_cache_dir(srt_home_path)
+    tm_pairs = None if args.no_tm else []
+    if restore_srt_file(file_path, origin_separate_dir, trans_separate_dir, cache_dir, tm_pairs=tm_pairs) and tm_pairs:
+        conn = open_tm(get_tm_path(srt_home_path))
+        try:
+            print(f"번역 메모리 추가: {add_pairs(conn, tm_pairs)}개")
+        finally:
+            conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
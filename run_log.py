@@ -0,0 +1,240 @@
+# run_log.py (stage 출력 라인 단위 처리: 레벨별 JSONL 기록(SRT_HOME/logs), 진행률/ETA 표시, quiet 모드)
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from pathlib import Path
+from utils import list_srt_names, get_base_filename, log
+
+PROGRESS_REDRAW = 0.2    # 진행률 라인 갱신 최소 간격 (초, 터미널)
+PROGRESS_RECORD = 5.0    # JSONL progress 기록 간격 (초)
+
+# --subprocess 자식 프로세스 출력용 (in-process 실행은 utils.log()/progress()로 레벨과 진행률을 직접 전달)
+# 메시지 앞부분으로 레벨 추정, '... 목록:' 다음의 '- ' 라인은 목록 제목의 레벨
+ERROR_PREFIXES = ('오류', 'Traceback', '처리 실패', '병합 실패', '비교 실패', '삭제 실패', 'srt 이동 실패', '이름 변경 실패',
+                  '첫 불일치', '누락:', '추가:', '변경:', '총 자막 갯수 불일치', '불일치', '실패한')
+WARNING_PREFIXES = ('경고', '스킵됨', '스킵된')
+SUMMARY_PREFIXES = ('총 ', '요약', '번역 메모리 추가', '자동 감지된', 'patterns.txt에')
+
+# stage별 파일(항목) 하나가 끝났음을 나타내는 자식 출력 (진행률 계산용): (시작 문자열, 끝 문자열)
+PROGRESS_MARKERS = {
+    'collect': (('이동됨:',), ()),
+    'rename': (('이름 변경:', '이름 변경 실패:'), ()),
+    'trim': (('[UPDATED]', '[MEMORY', '[DRY-RUN]', '[SKIP'), ()),
+    'separate': (('처리 중:', '변경 없음:'), ()),
+    'restore': (('복원 완료:', '스킵됨:', '변경 없음:', '처리 실패:'), ()),
+    'merge': (('병합 완료:', '변경 없음:', '병합 실패:'), ()),
+    'compare': (('모두 일치합니다', '오류 발생:'), ('중단합니다.',)),
+}
+
+def get_log_dir(srt_home):
+    return Path(srt_home) / 'logs'
+
+def stage_total(srt_home, stage):
+    """stage 시작 시점의 처리 대상 수 (진행률 분모). 알 수 없으면 None."""
+    srt_home = Path(srt_home)
+    if stage in ('rename', 'trim', 'separate'):
+        return len(list_srt_names(srt_home / 'origin'))
+    if stage == 'restore':
+        return len(list_srt_names(srt_home / 'origin_separate'))
+    if stage == 'merge':
+        return len({get_base_filename(Path(name).stem) for name in list_srt_names(srt_home / 'origin_separate')})
+    if stage == 'compare':
+        return len({get_base_filename(Path(name).stem) for name in list_srt_names(srt_home / 'origin')})
+    return None
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}시간 {seconds // 60 % 60}분"
+    if seconds >= 60:
+        return f"{seconds // 60}분 {seconds % 60}초"
+    return f"{seconds}초"
+
+class _LineWriter:
+    """redirect_stdout 대상: print 출력은 info, utils.log()는 지정한 레벨, run_command의 자식 출력은 추정한 레벨로
+    라인 단위로 RunLog.emit에 전달합니다. utils.progress()는 진행률에 반영."""
+    def __init__(self, log):
+        self.log = log
+        self.pending = ''
+
+    def write(self, text):
+        self.pending += text
+        if '\n' in self.pending:
+            *lines, self.pending = self.pending.split('\n')
+            for line in lines:
+                self.log.emit(line, 'info')
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def close_pending(self):
+        if self.pending:
+            self.log.emit(self.pending, 'info')
+            self.pending = ''
+
+    def write_log(self, level, msg):
+        self.close_pending()
+        for line in msg.split('\n'):
+            self.log.emit(line, level)
+
+    def write_child(self, text):
+        self.close_pending()
+        for line in text.rstrip('\n').split('\n'):
+            self.log.emit(line, None)
+
+    def progress(self, n=1):
+        self.log.advance(n)
+
+class RunLog:
+    """실행 하나의 로그. stage() 안에서 print된 라인은 레벨을 분류해 JSONL에 기록하고,
+    quiet=True이면 info(파일별) 라인은 화면에 출력하지 않습니다. 터미널이면 stderr에 진행률/ETA 라인을 갱신합니다."""
+    def __init__(self, name, srt_home, quiet=False):
+        self.name = name
+        self.srt_home = Path(srt_home)
+        self.quiet = quiet
+        log_dir = get_log_dir(srt_home)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        self.path = log_dir / f"{time.strftime('%Y%m%d-%H%M%S')}_{name}.jsonl"
+        self.file = open(self.path, 'a', encoding='utf-8', buffering=1)  # 라인 단위 flush (tail -f로 확인 가능)
+        self.console = sys.stdout
+        self.live = sys.stderr.isatty()
+        self.stage_name = None
+        self._reset_stage(None, None)
+
+    def _reset_stage(self, name, total):
+        self.stage_name = name
+        self.total = total
+        self.done = 0
+        self.levels = {}
+        self.started = time.perf_counter()
+        self.in_traceback = False
+        self.list_level = None
+        self.last_draw = 0.0
+        self.last_record = self.started
+        self.drawn = 0
+
+    def _record(self, entry):
+        entry = {'ts': round(time.time(), 3), 'run': self.name, 'stage': self.stage_name, **entry}
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def classify(self, line):
+        """자식 프로세스 출력 라인의 레벨 추정 (--subprocess 실행에서만 사용)."""
+        stripped = line.strip()
+        if self.in_traceback:
+            if line[:1] not in (' ', '\t'):
+                self.in_traceback = False  # 예외 메시지 라인까지 error
+            return 'error'
+        if stripped.startswith('Traceback'):
+            self.in_traceback = True
+        if self.list_level is not None and stripped.startswith('- '):
+            return self.list_level
+        if stripped.startswith(ERROR_PREFIXES):
+            level = 'error'
+        elif stripped.startswith(WARNING_PREFIXES):
+            level = 'warning'
+        elif stripped.startswith(SUMMARY_PREFIXES):
+            level = 'summary'
+        else:
+            level = 'info'
+        self.list_level = level if stripped.endswith('목록:') else None
+        return level
+
+    def _is_item(self, line):
+        prefixes, suffixes = PROGRESS_MARKERS.get(self.stage_name, ((), ()))
+        stripped = line.strip()
+        return stripped.startswith(prefixes) or (bool(suffixes) and stripped.endswith(suffixes))
+
+    def emit(self, line, level=None):
+        """라인 하나 기록/출력. level=None이면 자식 프로세스 출력: 레벨과 항목 완료 여부를 내용으로 추정."""
+        child = level is None
+        if child:
+            level = self.classify(line)
+        self.levels[level] = self.levels.get(level, 0) + 1
+        if line.strip():
+            self._record({'level': level, 'msg': line})
+        if not (self.quiet and level == 'info'):
+            self._clear_progress()
+            self.console.write(line + '\n')
+            self.console.flush()
+        if child and self._is_item(line):
+            self.advance()
+
+    def advance(self, n=1):
+        self.done += n
+        self._progress()
+
+    def _progress_text(self):
+        elapsed = time.perf_counter() - self.started
+        if self.total:
+            remaining = elapsed / self.done * max(self.total - self.done, 0) if self.done else 0
+            return (f"[{self.stage_name}] {self.done}/{self.total} ({self.done * 100 // self.total}%) "
+                    f"경과 {format_duration(elapsed)}, 남은 시간 약 {format_duration(remaining)}")
+        return f"[{self.stage_name}] {self.done}개 처리, 경과 {format_duration(elapsed)}"
+
+    def _progress(self, force=False):
+        now = time.perf_counter()
+        if force or now - self.last_record >= PROGRESS_RECORD:
+            self.last_record = now
+            self._record({'event': 'progress', 'done': self.done, 'total': self.total, 'elapsed': round(now - self.started, 3)})
+        if self.live and (force or now - self.last_draw >= PROGRESS_REDRAW):
+            self.last_draw = now
+            text = self._progress_text()
+            sys.stderr.write('\r' + text.ljust(self.drawn))
+            sys.stderr.flush()
+            self.drawn = len(text)
+
+    def _clear_progress(self):
+        if self.drawn:
+            sys.stderr.write('\r' + ' ' * self.drawn + '\r')
+            sys.stderr.flush()
+            self.drawn = 0
+
+    @contextmanager
+    def stage(self, name):
+        """stage 구간의 stdout을 라인 단위로 처리합니다. 끝나면 처리 수/레벨별 라인 수/시간을 stage_end로 기록."""
+        self._reset_stage(name, stage_total(self.srt_home, name))
+        self._record({'event': 'stage_start', 'total': self.total})
+        writer = _LineWriter(self)
+        error = None
+        try:
+            with redirect_stdout(writer):
+                yield
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            writer.close_pending()
+            self._clear_progress()
+            entry = {'event': 'stage_end', 'done': self.done, 'total': self.total, 'levels': self.levels,
+                     'elapsed': round(time.perf_counter() - self.started, 3)}
+            if error is not None:
+                entry['error'] = error
+            self._record(entry)
+            self.stage_name = None
+
+    def close(self):
+        self.file.close()
+
+def log_stage(log, name):
+    """log가 None이면 아무것도 하지 않는 context."""
+    return log.stage(name) if log is not None else nullcontext()
+
+def run_command(cmd):
+    """subprocess로 명령어 실행, 출력은 라인 단위로 바로 출력 (메모리에 모으지 않음). 실패 시 예외 발생.
+    RunLog stage 안이면 자식 출력의 레벨/진행률은 내용으로 추정합니다."""
+    # 자식 python의 stdout이 pipe여도 라인마다 내보내도록 unbuffered, 한글 출력은 UTF-8로 고정
+    env = dict(os.environ, PYTHONUNBUFFERED='1', PYTHONIOENCODING='utf-8')
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace', env=env) as proc:
+        for line in proc.stdout:
+            write_child = getattr(sys.stdout, 'write_child', None)
+            if write_child is not None:
+                write_child(line)
+            else:
+                print(line, end='')
+    if proc.returncode:
+        log('error', f"오류: 명령어 실행 실패 - {' '.join(cmd)} (종료 코드 {proc.returncode})")
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
@@ -1,25 +1,82 @@
 import argparse
 from pathlib import Path
 import os
-from utils import get_srt_home  # 공통 utils import
-from separate_srt import separate_srt_file  # separate_srt.py의 함수 import (직접 호출)
+from functools import partial
+from utils import get_srt_home, read_text_preserve_encoding, run_jobs, log, progress  # 공통 utils import
+from separate_srt import separate_srt_file, add_chunk_arguments, chunk_options  # separate_srt.py의 함수 import (직접 호출)
+from srt_cache import get_parse_cache_dir, prune_parse_cache
+from state_store import load_state, save_state, lookup, record, stat_outputs, sha1_text
+from chunk_manifest import get_manifest_path, load_manifest, get_chunk_map_path
+from translation_memory import tm_version
+from metrics import count
 
-def separate_all_files(origin_dir, separated_dir):
+def _separate_one(item, separated_dir, cache_dir, options):
+    file, content = item
+    return separate_srt_file(file, separated_dir, cache_dir=cache_dir, content=content, **options)
+
+def _chunk_outputs(separated_dir, file):
+    """분할 결과 파일 (manifest + chunk + 있으면 chunk별 map) 목록."""
+    manifest = load_manifest(separated_dir, file.stem)
+    outputs = [get_manifest_path(separated_dir, file.stem)]
+    for chunk in manifest['chunks']:
+        outputs.append(separated_dir / chunk['name'])
+        map_path = get_chunk_map_path(separated_dir, chunk['name'])  # --tm/--dedup
+        if map_path.exists():
+            outputs.append(map_path)
+    return outputs
+
+def separate_all_files(origin_dir, separated_dir, cache_dir=None, docs=None, jobs=1, options=None, state=None):
+    """options: separate_srt_file의 분할 옵션 (chunk_size, budget, tokenizer, overlap, max_blocks).
+    state(state_store) 지정 시 내용/옵션이 같고 이전 chunk가 그대로인 파일은 다시 분할하지 않습니다 (chunk 파일을 다시 쓰지 않음)."""
     processed_count = 0
     chunk_total = 0
+    unchanged = 0
+    options = options or {}
+    # 처리 상태 키: 분할 옵션 + (--tm) TM 내용 버전 (restore로 TM에 번역이 추가되면 미리 채울 블록이 바뀜)
+    state_params = dict(options, tm_version=tm_version(options['tm'])) if options.get('tm') else options
+    items = []
+    input_hashes = {}
     for file in origin_dir.glob('*.srt'):
-        chunks = separate_srt_file(file, separated_dir)
+        content = docs.get(file) if docs else None
+        if state is not None:
+            text = content if content is not None else read_text_preserve_encoding(file)[0]
+            input_hashes[file] = sha1_text(text)
+            entry = lookup(state, 'separate', file.resolve(), input_hashes[file], state_params)
+            if entry is not None:
+                print(f"변경 없음: {file} - 이전 분할 결과 사용 ({entry['chunks']}개 chunk)")
+                unchanged += 1
+                processed_count += 1
+                chunk_total += entry['chunks']
+                count('unchanged')
+                progress()
+                continue
+        items.append((file, content))
+    
+    worker = partial(_separate_one, separated_dir=separated_dir, cache_dir=cache_dir, options=options)
+    for (file, _), chunks in run_jobs(worker, items, jobs, default=0):
         if chunks > 0:
             processed_count += 1
             chunk_total += chunks
+            count('files')
+            count('chunks', chunks)
+            if state is not None:
+                record(state, 'separate', file.resolve(), input_hashes[file], state_params,
+                       stat_outputs(_chunk_outputs(separated_dir, file)), chunks=chunks)
         else:
-            print(f"스킵됨: {file} - 처리 실패")
+            count('failed')
+            log('error', f"스킵됨: {file} - 처리 실패")
+        progress()
     
-    print(f"총 {processed_count}개의 SRT 파일이 처리되었습니다. (총 {chunk_total}개의 chunk 생성)")
+    save_state(state)
+    prune_parse_cache(cache_dir)
+    log('summary', f"총 {processed_count}개의 SRT 파일이 처리되었습니다. (총 {chunk_total}개의 chunk 생성)" + (f" (변경 없음: {unchanged}개)" if unchanged else ""))
 
 def main():
     parser = argparse.ArgumentParser(description="SRT_HOME/origin의 모든 SRT 파일을 800개 자막 블록 chunk로 나누어 SRT_HOME/origin_separate에 저장합니다.")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--no-cache', action="store_true", help="파싱 캐시(SRT_HOME/cache/parsed)와 처리 상태(SRT_HOME/cache/state.json) 사용 안 함")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="병렬 처리 프로세스 수 (기본: 1)")
+    add_chunk_arguments(parser)
     args = parser.parse_args()
     
     # SRT_HOME 설정
@@ -36,7 +93,9 @@ def main():
         print(f"오류: {origin_dir}가 존재하지 않습니다.")
         return
     
-    separate_all_files(origin_dir, separated_dir)
+    cache_dir = None if args.no_cache else get_parse_cache_dir(srt_home_path)
+    state = None if args.no_cache else load_state(srt_home_path)
+    separate_all_files(origin_dir, separated_dir, cache_dir, jobs=args.jobs, options=chunk_options(args, srt_home_path), state=state)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
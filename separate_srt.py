@@ -1,49 +1,176 @@
 import argparse
+import importlib
+import re
 from pathlib import Path
 import os
-from utils import parse_srt_blocks, get_srt_home  # 공통 utils import
+from utils import parse_srt_records, get_srt_home, log  # 공통 utils import
+from srt_cache import load_srt_records, get_parse_cache_dir
+from chunk_manifest import chunk_entry, write_manifest, write_chunk_map, remove_chunk_map
+from translation_memory import get_tm_path, open_tm, lookup_cues, normalize_cue
+from metrics import count
 
-def separate_srt_file(file_path, separated_dir, chunk_size=800):
+WIDE_CHAR_RE = re.compile(r'[\u1100-\u11FF\u3040-\u30FF\u3130-\u318F\u3400-\u9FFF\uAC00-\uD7A3\uF900-\uFAFF\uFF00-\uFFEF]')
+
+def estimate_tokens(text):
+    """대략적인 토큰 수: 한글/가나/한자 1글자 ≈ 1토큰, 그 외 4글자 ≈ 1토큰."""
+    wide = len(WIDE_CHAR_RE.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+TOKENIZERS = {'chars': len, 'approx': estimate_tokens}
+
+def resolve_tokenizer(name):
+    """'chars', 'approx' 또는 'module:function' (텍스트 → 토큰 수 함수)."""
+    if callable(name):
+        return name
+    if name in TOKENIZERS:
+        return TOKENIZERS[name]
+    module_name, _, func_name = name.partition(':')
+    if not func_name:
+        raise ValueError(f"알 수 없는 tokenizer: {name} (chars, approx 또는 module:function)")
+    return getattr(importlib.import_module(module_name), func_name)
+
+def plan_chunks(blocks, chunk_size=800, budget=None, tokenizer='chars', overlap=0, max_blocks=None):
+    """chunk별 (start, end, context) 목록 반환 (블록 인덱스, end 미포함, context는 앞에 붙일 이전 블록 수).
+    budget 미지정 시 chunk_size개씩 고정 분할, 지정 시 context 포함 비용이 budget 이하가 되도록 블록을 채웁니다.
+    (블록 하나가 budget보다 커도 chunk당 최소 1블록)"""
+    total = len(blocks)
+    if budget is None:
+        return [(i, min(i + chunk_size, total), min(overlap, i)) for i in range(0, total, chunk_size)]
+    count = resolve_tokenizer(tokenizer)
+    costs = [count(block.raw) for block in blocks]
+    plan = []
+    start = 0
+    while start < total:
+        context = min(overlap, start)
+        used = sum(costs[start - context:start])
+        end = start
+        while end < total and (end == start or used + costs[end] <= budget):
+            if max_blocks is not None and end - start >= max_blocks:
+                break
+            used += costs[end]
+            end += 1
+        plan.append((start, end, context))
+        start = end
+    return plan
+
+def separate_srt_file(file_path, separated_dir, chunk_size=800, cache_dir=None, content=None,
+                      budget=None, tokenizer='chars', overlap=0, max_blocks=None, tm=None, dedup=False):
+    """tm: 번역 메모리(translation_memory) 경로. 지정 시 TM에 있는 대사는 chunk 파일에서 빼고 {chunk}.map.json에 번역을 채워 둡니다.
+    dedup: chunk 안에서 같은 대사는 한 번만 chunk 파일에 쓰고 map으로 복원합니다."""
     separated_dir.mkdir(parents=True, exist_ok=True)
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        blocks = parse_srt_blocks(content)
+        # content 지정 시 (in-process pipeline) 파일을 다시 읽지 않고 메모리 내용을 파싱
+        blocks = parse_srt_records(content) if content is not None else load_srt_records(file_path, cache_dir)
         total_blocks = len(blocks)
         print(f"처리 중: {file_path} - 총 {total_blocks}개의 자막 블록")
         
         if total_blocks == 0:
-            print(f"경고: {file_path}에 자막 블록이 없습니다.")
+            log('warning', f"경고: {file_path}에 자막 블록이 없습니다.")
             return 0
         
+        measure = resolve_tokenizer(tokenizer)
+        known = _lookup_tm(tm, blocks) if tm else {}
+        manifest_chunks = []
         chunk_count = 0
-        for i in range(0, total_blocks, chunk_size):
-            chunk_blocks = blocks[i:i + chunk_size]
-            # 새로운 SRT 내용: 자막 번호를 원본 그대로 유지 (재시작 안 함)
+        for start, end, context in plan_chunks(blocks, chunk_size, budget, tokenizer, overlap, max_blocks):
+            # 새로운 SRT 내용: 자막 번호를 원본 그대로 유지 (재시작 안 함), 앞에 context 블록 (overlap)
+            chunk_blocks = blocks[start - context:end]
+            chunk_filename = f"{file_path.stem}_{chunk_count:03d}{file_path.suffix}"
+            slots, prefill, written = _plan_slots(chunk_blocks, context, known, dedup)
+            if slots is None:
+                remove_chunk_map(separated_dir, chunk_filename)
+                written_blocks = chunk_blocks
+            else:
+                write_chunk_map(separated_dir, chunk_filename, [[block.num, block.time] for block in chunk_blocks], slots, prefill)
+                written_blocks = [chunk_blocks[i] for i in written]
             new_content = []
-            for block in chunk_blocks:
-                new_content.append(block)  # 원본 블록 그대로 추가 (번호 변경 없음)
+            for block in written_blocks:
+                new_content.append(block.raw)  # 원본 블록 그대로 추가 (번호 변경 없음)
             
-            chunk_filename = f"{file_path.stem}_{chunk_count:03d}{file_path.suffix}"
             dest_path = separated_dir / chunk_filename
             # write: ''.join 후 rstrip()으로 불필요 공백 제거, 끝에 '\n\n'으로 빈 라인 추가
             output = ''.join(new_content).rstrip() + '\n\n'
-            with open(dest_path, 'w', encoding='utf-8') as f:
-                f.write(output)
-            print(f"생성됨: {dest_path} - {len(chunk_blocks)}개 블록, 번호 범위: {i+1} ~ {i+len(chunk_blocks)}")
+            data = output.replace('\n', os.linesep).encode('utf-8')  # 텍스트 모드 쓰기와 같은 bytes (manifest 크기/해시용)
+            with open(dest_path, 'wb') as f:
+                f.write(data)
+            count('bytes_written', len(data))
+            context_note = f" (앞 context {context}개 포함)" if context else ""
+            if slots is not None:
+                filled = sum(1 for text in prefill if text is not None)
+                context_note += f" (TM 채움 {filled}개, 중복 제외 {len(chunk_blocks) - len(written_blocks) - filled}개)"
+            print(f"생성됨: {dest_path} - {end - start}개 블록, 번호 범위: {start+1} ~ {end}{context_note}")
+            cost = measure(output) if budget is not None else len(output)
+            manifest_chunks.append(chunk_entry(chunk_filename, data, start + 1, end, context, len(written_blocks), cost))
             chunk_count += 1
         
+        options = {'chunk_size': chunk_size, 'budget': budget, 'tokenizer': tokenizer if isinstance(tokenizer, str) else repr(tokenizer),
+                   'overlap': overlap, 'max_blocks': max_blocks, 'tm': bool(tm), 'dedup': dedup}
+        write_manifest(separated_dir, file_path.stem, file_path.name, total_blocks, options, manifest_chunks)
         return chunk_count
     except Exception as e:
-        print(f"오류 발생: {file_path} - {e}")
+        log('error', f"오류 발생: {file_path} - {e}")
         return 0
 
+def _lookup_tm(tm_path, blocks):
+    """블록 대사 중 TM에 번역이 있는 것 {정규화 원문: 번역} (TM이 없으면 빈 dict)."""
+    conn = open_tm(tm_path, readonly=True)
+    if conn is None:
+        return {}
+    try:
+        return lookup_cues(conn, [key for key in (normalize_cue(block.text) for block in blocks) if key])
+    finally:
+        conn.close()
+
+def _plan_slots(chunk_blocks, context, known, dedup=False):
+    """chunk 블록별 (slots, prefill, chunk 파일에 쓸 블록 인덱스). 모든 블록을 그대로 쓰면 (None, None, None).
+    known(TM)에 있는 대사는 prefill로 채우고, dedup 시 같은 대사(정규화 기준)는 처음 블록 하나만 쓰고 같은 slot을 가리킵니다.
+    context 블록은 번역 문맥이므로 채우지 않으며, 모두 채워지는 chunk도 첫 블록은 번역 대상으로 남깁니다 (빈 chunk 방지).
+    chunk 마지막 블록은 중복이어도 따로 씁니다 (번역 결과 끝에 붙는 코드 블록 표시가 다른 블록으로 펼쳐지지 않도록)."""
+    keys = [normalize_cue(block.text) for block in chunk_blocks] if known or dedup else None
+    prefill = [None] * len(chunk_blocks)
+    if known:
+        for i in range(context, len(chunk_blocks)):
+            prefill[i] = known.get(keys[i])
+        if all(text is not None for text in prefill):
+            prefill[0] = None
+    slots = []
+    written = []
+    first_slot = {}
+    for i, text in enumerate(prefill):
+        if text is not None:
+            slots.append(None)
+        elif dedup and keys[i] and keys[i] in first_slot and i < len(chunk_blocks) - 1:
+            slots.append(first_slot[keys[i]])
+        else:
+            if dedup and keys[i]:
+                first_slot[keys[i]] = len(written)
+            slots.append(len(written))
+            written.append(i)
+    if len(written) == len(chunk_blocks):
+        return None, None, None
+    return slots, prefill, written
+
+def add_chunk_arguments(parser):
+    parser.add_argument('--chunk-size', type=int, default=800, help="고정 분할 시 chunk당 블록 수 (기본: 800)")
+    parser.add_argument('--budget', type=int, help="chunk당 최대 비용 (글자/토큰 수). 지정 시 블록 수 대신 비용 기준으로 채움")
+    parser.add_argument('--tokenizer', default='chars', help="비용 계산: chars(글자 수), approx(추정 토큰 수) 또는 module:function (기본: chars)")
+    parser.add_argument('--overlap', type=int, default=0, help="각 chunk 앞에 붙일 이전 블록 수 (번역 문맥용, 병합 시 제거, 기본: 0)")
+    parser.add_argument('--max-blocks', type=int, help="--budget 사용 시 chunk당 최대 블록 수")
+    parser.add_argument('--tm', action="store_true", help="번역 메모리(SRT_HOME/cache/tm.sqlite)에 있는 대사는 미리 채우고 chunk에서 제외")
+    parser.add_argument('--dedup', action="store_true", help="chunk 안에서 반복되는 대사는 한 번만 번역 대상으로 쓰고 복원 시 펼침")
+
+def chunk_options(args, srt_home_path):
+    return {'chunk_size': args.chunk_size, 'budget': args.budget, 'tokenizer': args.tokenizer,
+            'overlap': args.overlap, 'max_blocks': args.max_blocks,
+            'tm': str(get_tm_path(srt_home_path)) if args.tm else None, 'dedup': args.dedup}
+
 def main():
     parser = argparse.ArgumentParser(description="지정된 SRT 파일을 800개 자막 블록 chunk로 나누어 SRT_HOME/origin_separate에 저장합니다. 자막 번호 원본 유지, 빈 라인 유지.")
     parser.add_argument('-f', '--file', required=True, help="처리할 SRT 파일 경로 (필수)")
     parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--no-cache', action="store_true", help="파싱 캐시(SRT_HOME/cache/parsed) 사용 안 함")
+    add_chunk_arguments(parser)
     args = parser.parse_args()
     
     srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
@@ -59,7 +186,8 @@ def main():
     print(f"분할 디렉토리: {separated_dir}")
     print(f"입력 파일: {file_path}")
     
-    chunks = separate_srt_file(file_path, separated_dir)
+    cache_dir = None if args.no_cache else get_parse_cache_dir(srt_home_path)
+    chunks = separate_srt_file(file_path, separated_dir, cache_dir=cache_dir, **chunk_options(args, srt_home_path))
     print(f"총 {chunks}개의 chunk가 생성되었습니다.")
 
 if __name__ == "__main__":
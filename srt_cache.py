@@ -0,0 +1,99 @@
+# srt_cache.py (파싱 결과 디스크 캐시: SRT_HOME/cache/parsed)
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from utils import parse_srt_records, decode_bytes, read_text_preserve_encoding, log
+from metrics import count
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+def get_parse_cache_dir(srt_home):
+    return Path(srt_home) / 'cache' / 'parsed'
+
+def _entry_path(cache_dir, path):
+    key = hashlib.sha1(str(Path(path).resolve()).encode('utf-8')).hexdigest()
+    return cache_dir / f"{key}.pkl"
+
+def _read_entry(entry_path, path, st, verify_hash):
+    """캐시 항목의 메타(경로/크기/mtime, 옵션: 내용 해시)가 맞으면 레코드를, 아니면 None 반환."""
+    try:
+        with open(entry_path, 'rb') as f:
+            meta = pickle.load(f)
+            if (meta.get('version') != CACHE_VERSION or meta.get('path') != str(path)
+                    or meta.get('size') != st.st_size or meta.get('mtime_ns') != st.st_mtime_ns):
+                return None
+            if verify_hash and meta.get('sha1') != hashlib.sha1(Path(path).read_bytes()).hexdigest():
+                return None
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, TypeError):
+        return None
+
+def _write_entry(entry_path, meta, records):
+    entry_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, entry_path)
+
+def load_srt_records(path, cache_dir=None, verify_hash=False):
+    """path의 SRT를 파싱한 SrtBlock 리스트를 반환합니다.
+    cache_dir 지정 시 경로+크기+mtime(verify_hash 시 내용 해시까지)이 같으면 캐시에서 읽고 파싱을 생략합니다."""
+    path = Path(path)
+    if cache_dir is None:
+        text, _ = read_text_preserve_encoding(path)
+        return parse_srt_records(text)
+
+    st = path.stat()
+    entry_path = _entry_path(cache_dir, path)
+    records = _read_entry(entry_path, path, st, verify_hash)
+    if records is not None:
+        try:
+            os.utime(entry_path)  # LRU: 최근 사용 시각 갱신
+        except OSError:
+            pass
+        count('cache_hits')
+        return records
+
+    data = path.read_bytes()
+    count('bytes_read', len(data))
+    text, _ = decode_bytes(data)
+    records = parse_srt_records(text)
+    meta = {
+        'version': CACHE_VERSION,
+        'path': str(path),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sha1': hashlib.sha1(data).hexdigest(),
+    }
+    try:
+        _write_entry(entry_path, meta, records)
+    except OSError as e:
+        log('warning', f"경고: 파싱 캐시 저장 실패: {path} - {e}")
+    return records
+
+def prune_parse_cache(cache_dir, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+    """캐시 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다. 삭제 갯수 반환."""
+    if cache_dir is None or not cache_dir.exists():
+        return 0
+    entries = []
+    total = 0
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith('.pkl'):
+                st = entry.stat()
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+    removed = 0
+    for _, size, entry_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(entry_path)
+            total -= size
+            removed += 1
+        except OSError:
+            continue
+    return removed
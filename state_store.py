@@ -0,0 +1,85 @@
+# state_store.py (stage별 입력 해시 → 결과 기록: SRT_HOME/cache/state.json. 입력/옵션/결과 파일이 그대로면 다시 처리하지 않음)
+import hashlib
+import json
+import os
+from pathlib import Path
+
+STATE_VERSION = 1
+
+def get_state_path(srt_home):
+    return Path(srt_home) / 'cache' / 'state.json'
+
+def load_state(srt_home):
+    """저장된 상태를 읽습니다. 없거나 읽을 수 없으면 빈 상태."""
+    state_path = get_state_path(srt_home)
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(state.get('version'))
+    except (OSError, ValueError):
+        state = {'version': STATE_VERSION, 'stages': {}}
+    state['_path'] = str(state_path)
+    return state
+
+def save_state(state):
+    if state is None:
+        return
+    state_path = Path(state['_path'])
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    data = {k: v for k, v in state.items() if not k.startswith('_')}
+    tmp_path = state_path.with_name(state_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+def sha1_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+def sha1_text(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def params_hash(params):
+    """옵션 dict → 해시 (키 순서 무관)."""
+    return sha1_text(json.dumps(params, sort_keys=True, ensure_ascii=False, default=str))
+
+def stat_outputs(paths):
+    """결과 파일 → {경로: [size, mtime_ns]} (결과가 그대로인지 stat만으로 확인하기 위함)."""
+    outputs = {}
+    for path in paths:
+        st = os.stat(path)
+        outputs[str(path)] = [st.st_size, st.st_mtime_ns]
+    return outputs
+
+def _outputs_intact(outputs):
+    for path, (size, mtime_ns) in outputs.items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != size or st.st_mtime_ns != mtime_ns:
+            return False
+    return True
+
+def lookup(state, stage, key, input_hash, params):
+    """입력 해시/옵션이 같고 기록된 결과 파일이 그대로이면 해당 기록(dict)을, 아니면 None 반환."""
+    if state is None:
+        return None
+    entry = state['stages'].get(stage, {}).get(str(key))
+    if entry is None or entry['input'] != input_hash or entry['params'] != params_hash(params):
+        return None
+    if not _outputs_intact(entry['outputs']):
+        return None
+    return entry
+
+def record(state, stage, key, input_hash, params, outputs, **extra):
+    """처리 결과 기록. outputs는 stat_outputs 결과, extra는 stage별 추가 정보 (e.g., 결과 해시, chunk 수)."""
+    if state is None:
+        return
+    entry = {'input': input_hash, 'params': params_hash(params), 'outputs': outputs}
+    entry.update(extra)
+    state['stages'].setdefault(stage, {})[str(key)] = entry
+
+def forget(state, stage, key):
+    if state is not None:
+        state['stages'].get(stage, {}).pop(str(key), None)
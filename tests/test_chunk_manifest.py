@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chunk_manifest import load_manifest, find_manifest, scan_separated_dir, get_manifest_path
+from compare_srt import compare_srt_file
+from merge_srt import merge_srt_file
+from mock_translate_server import mock_translate
+from separate_all import separate_all_files
+
+def _srt(count):
+    return ''.join(f"{i}\n00:00:{i:02d},000 --> 00:00:{i:02d},500\n대사 {i}\n\n" for i in range(1, count + 1))
+
+def test_languages_of_one_base_keep_separate_manifests(tmp_path):
+    origin_dir = tmp_path / 'origin'
+    separated_dir = tmp_path / 'origin_separate'
+    trans_separate_dir = tmp_path / 'trans_separate'
+    trans_dir = tmp_path / 'trans'
+    origin_dir.mkdir()
+    trans_separate_dir.mkdir()
+    (origin_dir / 'X.ja.srt').write_text(_srt(5), encoding='utf-8')
+    (origin_dir / 'X.en.srt').write_text(_srt(3), encoding='utf-8')
+    separate_all_files(origin_dir, separated_dir, options={'chunk_size': 2})
+
+    assert load_manifest(separated_dir, 'X.ja')['blocks'] == 5
+    assert load_manifest(separated_dir, 'X.en')['blocks'] == 3
+    assert find_manifest(separated_dir, 'X')['stem'] == 'X.en'
+    manifests, loose = scan_separated_dir(separated_dir)
+    assert sorted(manifests) == ['X.en', 'X.ja'] and loose == []
+
+    for chunk in separated_dir.glob('*.srt'):
+        (trans_separate_dir / chunk.name).write_text(mock_translate(chunk.read_text(encoding='utf-8')), encoding='utf-8')
+    for lang in ('ja', 'en'):
+        assert merge_srt_file('X', lang, separated_dir, trans_separate_dir, trans_dir)
+        assert compare_srt_file('X', origin_dir, trans_dir, separated_dir=separated_dir,
+                                origin_files=[origin_dir / f"X.{lang}.srt"], trans_files=[trans_dir / f"X.{lang}.srt"])
+
+def test_old_base_manifest_is_ignored(tmp_path):
+    # base_filename별 이전 manifest (X.manifest.json, stem X.ja): 무시하고 chunk는 manifest 없는 chunk로 처리
+    get_manifest_path(tmp_path, 'X').write_text('{"version": 1, "stem": "X.ja", "blocks": 1, "chunks": []}', encoding='utf-8')
+    (tmp_path / 'X.ja_000.srt').write_text(_srt(1), encoding='utf-8')
+    assert load_manifest(tmp_path, 'X') is None
+    assert find_manifest(tmp_path, 'X') is None
+    assert scan_separated_dir(tmp_path) == ({}, [tmp_path / 'X.ja_000.srt'])
@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import compare_srt
+from utils import parse_srt_records
+
+def _srt(headers):
+    return ''.join(f"{num}\n{time}\n대사 {num}\n\n" for num, time in headers)
+
+HEADERS = [(str(i), f"00:00:{i:02d},000 --> 00:00:{i:02d},500") for i in range(1, 8)]
+
+@pytest.fixture(params=['numpy', 'list'])
+def np_mode(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(compare_srt, 'np', None)
+    return request.param
+
+def _compare(tmp_path, origin_headers, trans_headers):
+    (tmp_path / 'origin').mkdir()
+    (tmp_path / 'trans').mkdir()
+    (tmp_path / 'origin' / 'X.ja.srt').write_text(_srt(origin_headers), encoding='utf-8')
+    (tmp_path / 'trans' / 'X.srt').write_text(_srt(trans_headers), encoding='utf-8')
+    return compare_srt.compare_srt_file('X', tmp_path / 'origin', tmp_path / 'trans')
+
+def test_identical_headers_ok(tmp_path, np_mode):
+    assert _compare(tmp_path, HEADERS, HEADERS)
+
+def test_changed_timestamp_fails(tmp_path, np_mode, capsys):
+    trans = list(HEADERS)
+    trans[4] = ('5', '00:00:05,000 --> 00:00:05,501')
+    assert not _compare(tmp_path, HEADERS, trans)
+    assert "불일치: 블록 5 타임스탬프" in capsys.readouterr().out
+
+def test_mismatch_indices_compares_values(np_mode):
+    origin = parse_srt_records(_srt(HEADERS))
+    trans = parse_srt_records(_srt(HEADERS[:2] + [('3', HEADERS[3][1])] + HEADERS[3:]))
+    a, b = compare_srt.header_array(origin), compare_srt.header_array(trans)
+    assert compare_srt.mismatch_indices(a, b) == [2]
+    assert compare_srt.first_divergence(a, b) == 2
+
+def test_dropped_block_reported(tmp_path, np_mode, capsys):
+    assert not _compare(tmp_path, HEADERS, HEADERS[:3] + HEADERS[4:])
+    out = capsys.readouterr().out
+    assert "첫 불일치: 블록 4" in out
+    assert "누락: 원본 블록 4~4 (번호 4~4)이 번역에 없음" in out
@@ -0,0 +1,26 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pipeline import run_after_trans
+from run_log import RunLog
+
+def test_run_after_trans_empty_srt_home(tmp_path, capsys):
+    srt_home = tmp_path / 'srt_home'
+    srt_home.mkdir()
+    run_after_trans(tmp_path / 'target', srt_home)
+    assert f"오류: {srt_home / 'origin_separate'}가 존재하지 않습니다." in capsys.readouterr().out
+
+def test_run_after_trans_empty_srt_home_with_run_log(tmp_path):
+    srt_home = tmp_path / 'srt_home'
+    srt_home.mkdir()
+    log = RunLog('after_trans', srt_home, quiet=True)
+    try:
+        with log.stage('restore'):
+            run_after_trans(tmp_path / 'target', srt_home, run_log=log)
+    finally:
+        log.close()
+    entries = [json.loads(line) for line in log.path.read_text(encoding='utf-8').splitlines()]
+    assert any(e.get('level') == 'error' and 'origin_separate' in e['msg'] for e in entries)
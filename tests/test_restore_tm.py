@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_translate_server import mock_translate
+from restore_srt import restore_srt_file
+
+ORIGIN = ''.join(f"{i}\n00:00:{i:02d},000 --> 00:00:{i:02d},500\n대사{i}です\n\n" for i in range(1, 6))
+
+def _restore(tmp_path, trans_text):
+    origin_dir = tmp_path / 'origin_separate'
+    trans_dir = tmp_path / 'trans_separate'
+    origin_dir.mkdir()
+    trans_dir.mkdir()
+    (origin_dir / 'X.ja_000.srt').write_text(ORIGIN, encoding='utf-8')
+    (trans_dir / 'X.ja_000.srt').write_text(trans_text, encoding='utf-8')
+    tm_pairs = []
+    assert restore_srt_file(origin_dir / 'X.ja_000.srt', origin_dir, trans_dir, write=False, tm_pairs=tm_pairs)
+    return tm_pairs
+
+def test_aligned_chunk_adds_tm_pairs(tmp_path):
+    pairs = _restore(tmp_path, mock_translate(ORIGIN, fence=True))
+    assert len(pairs) == 5
+    assert pairs[2][1] == '번역: 대사3です'
+
+def test_dropped_cue_adds_no_tm_pairs(tmp_path):
+    # 번역기가 블록 2를 빠뜨리면 이후 대사가 모두 한 칸씩 밀림
+    translated = mock_translate(ORIGIN).split('\n\n')
+    pairs = _restore(tmp_path, '\n\n'.join(translated[:1] + translated[2:]))
+    assert pairs == []
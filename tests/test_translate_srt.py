@@ -0,0 +1,27 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_translate_server import mock_translate
+from translate_srt import translate_chunks, summarize_timings
+
+CHUNK = "1\n00:00:01,000 --> 00:00:02,000\nはい\n\n"
+
+def test_unreadable_chunk_counts_as_one_failure(tmp_path):
+    origin_dir = tmp_path / 'origin_separate'
+    trans_dir = tmp_path / 'trans_separate'
+    origin_dir.mkdir()
+    trans_dir.mkdir()
+    for name in ('X.ja_000.srt', 'X.ja_002.srt'):
+        (origin_dir / name).write_text(CHUNK, encoding='utf-8')
+    (origin_dir / 'X.ja_003.srt').write_bytes(b'\xff\xfe\x00\xd8')  # UTF-8로 읽을 수 없음
+    names = ['X.ja_000.srt', 'X.ja_001.srt', 'X.ja_002.srt', 'X.ja_003.srt']  # X.ja_001.srt는 목록 작성 후 사라짐
+
+    timings = asyncio.run(translate_chunks(names, origin_dir, trans_dir, lambda request: mock_translate(request['text']), concurrency=2))
+    assert [t['ok'] for t in timings] == [True, False, True, False]
+    assert 'chunk 읽기 실패' in timings[1]['error']
+    assert sorted(path.name for path in trans_dir.iterdir()) == ['X.ja_000.srt', 'X.ja_002.srt']
+    summary = summarize_timings(timings, 1.0)
+    assert (summary['done'], summary['failed'], summary['retries']) == (2, 2, 0)
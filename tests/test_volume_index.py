@@ -0,0 +1,35 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import find_mp4_path, find_mp4_srt_status
+from volume_index import build_volume_index, find_mp4_in_index
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'')
+
+def test_find_mp4_in_index_uses_walk_order(tmp_path, capsys):
+    _touch(tmp_path / 'HMN-520-C.mp4')
+    _touch(tmp_path / 'sub' / 'HMN-520.mp4')
+    _touch(tmp_path / 'sub' / 'HMN-5201.mp4')
+    index = build_volume_index(tmp_path, workers=1)
+    assert find_mp4_in_index(index, 'HMN-520') == find_mp4_path('HMN-520', tmp_path) == tmp_path / 'HMN-520-C.mp4'
+    assert "경고: HMN-520으로 시작하는 mp4 base가 여러 개입니다" in capsys.readouterr().out
+    assert find_mp4_in_index(index, 'HMN-5201') == tmp_path / 'sub' / 'HMN-5201.mp4'
+    assert find_mp4_in_index(index, 'ABC-001') is None
+
+@pytest.mark.skipif(os.name == 'nt', reason="Windows는 대소문자 무시")
+def test_find_mp4_srt_status_case_sensitive(tmp_path, capsys):
+    _touch(tmp_path / 'Movie.mp4')
+    _touch(tmp_path / 'movie.srt')
+    _touch(tmp_path / 'Show.mp4')
+    _touch(tmp_path / 'Show.srt')
+    find_mp4_srt_status(tmp_path)
+    out = capsys.readouterr().out
+    assert f"경고: {tmp_path / 'Movie.mp4'} - SRT 없음" in out
+    assert f"OK: {tmp_path / 'Show.mp4'} - SRT 존재" in out
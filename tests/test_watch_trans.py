@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import watch_trans
+
+def test_missing_mp4_backs_off_index_refresh(tmp_path, monkeypatch):
+    for name in ('origin_separate', 'trans_separate'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'X.ja_000.srt').write_text("1\n00:00:01,000 --> 00:00:02,000\nはい\n\n", encoding='utf-8')
+    refreshes = []
+    sleeps = []
+    monkeypatch.setattr(watch_trans, 'process_base', lambda *args: True)
+    monkeypatch.setattr(watch_trans, 'place_base', lambda *args: False)  # mp4가 끝내 없음
+    monkeypatch.setattr(watch_trans, 'get_volume_index', lambda *args, **kwargs: refreshes.append(1) or {})
+    monkeypatch.setattr(watch_trans, 'save_volume_index', lambda *args: None)
+
+    def sleep(_):
+        sleeps.append(1)
+        if len(sleeps) == 40:
+            raise KeyboardInterrupt
+    monkeypatch.setattr(watch_trans.time, 'sleep', sleep)
+
+    ok_count, failed = watch_trans.watch_trans(tmp_path, tmp_path / 'target', interval=0, settle=0)
+    assert (ok_count, failed) == (0, 0)
+    # 첫 이동 시도 + 확인 1, 3, 7, 15, 31번째의 재시도 (40번 확인 중)
+    assert len(refreshes) == 6
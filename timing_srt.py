@@ -0,0 +1,143 @@
+# timing_srt.py (타임스탬프 일괄 처리: 시작/끝 ms 배열로 shift, fps 변환, 겹침 검사, 최소 길이 보정)
+import argparse
+from pathlib import Path
+from typing import NamedTuple
+from utils import SRT_TIME_RE, parse_srt_records, read_text_preserve_encoding, write_text_with_encoding
+
+try:
+    import numpy as np
+except ImportError:  # numpy는 이 모듈에서만 사용 (선택 의존성)
+    np = None
+
+class TimingTable(NamedTuple):
+    """자막 블록별 시작/끝 ms (int64 배열). valid가 False인 블록은 타임스탬프 라인이 표준 형식이 아니어서 수정하지 않음."""
+    start: object
+    end: object
+    valid: object
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("timing_srt는 numpy가 필요합니다. (pip install numpy)")
+
+def timing_table(blocks):
+    """parse_srt_records 결과(SrtBlock 리스트)의 start_ms/end_ms를 배열로 모읍니다."""
+    _require_numpy()
+    start = np.fromiter((block.start_ms for block in blocks), dtype=np.int64, count=len(blocks))
+    end = np.fromiter((block.end_ms for block in blocks), dtype=np.int64, count=len(blocks))
+    valid = np.fromiter((SRT_TIME_RE.match(block.time) is not None for block in blocks), dtype=bool, count=len(blocks))
+    return TimingTable(start, end, valid)
+
+def shift_times(table, offset_ms):
+    """전체 자막을 offset_ms만큼 이동 (음수 가능, 0 미만은 0으로)."""
+    start = np.where(table.valid, np.maximum(table.start + offset_ms, 0), table.start)
+    end = np.where(table.valid, np.maximum(table.end + offset_ms, 0), table.end)
+    return TimingTable(start, end, table.valid)
+
+def rescale_fps(table, from_fps, to_fps):
+    """from_fps 기준 타임스탬프를 to_fps 영상에 맞게 변환 (e.g., 23.976 → 25: 시간이 from/to 비율로 줄어듦)."""
+    ratio = from_fps / to_fps
+    start = np.where(table.valid, np.rint(table.start * ratio).astype(np.int64), table.start)
+    end = np.where(table.valid, np.rint(table.end * ratio).astype(np.int64), table.end)
+    return TimingTable(start, end, table.valid)
+
+def find_overlaps(table):
+    """다음 자막 시작 전에 끝나지 않는 블록의 인덱스 배열 (0부터, 둘 다 valid인 인접 쌍만)."""
+    both_valid = table.valid[:-1] & table.valid[1:]
+    return np.flatnonzero(both_valid & (table.end[:-1] > table.start[1:]))
+
+def find_invalid_durations(table):
+    """끝이 시작보다 빠르거나 같은 블록의 인덱스 배열."""
+    return np.flatnonzero(table.valid & (table.end <= table.start))
+
+def enforce_min_duration(table, min_ms):
+    """표시 시간이 min_ms보다 짧은 자막의 끝을 늘립니다. 다음 자막 시작을 넘지 않으며, 원래 끝보다 줄이지 않습니다."""
+    next_start = np.empty_like(table.start)
+    next_start[:-1] = np.where(table.valid[1:], table.start[1:], np.iinfo(np.int64).max)
+    next_start[-1:] = np.iinfo(np.int64).max
+    next_start = np.maximum(next_start, table.start)  # 순서가 뒤바뀐 다음 자막은 제한으로 쓰지 않음
+    target = np.minimum(table.start + min_ms, next_start)
+    end = np.where(table.valid, np.maximum(table.end, target), table.end)
+    return TimingTable(table.start, end, table.valid)
+
+def format_times(start, end):
+    """ms 배열 → 'HH:MM:SS,mmm --> HH:MM:SS,mmm' 문자열 리스트 (시/분/초 분해는 배열 연산)."""
+    parts = []
+    for ms in (start, end):
+        s, msec = np.divmod(ms, 1000)
+        m, sec = np.divmod(s, 60)
+        h, mi = np.divmod(m, 60)
+        parts.append((h.tolist(), mi.tolist(), sec.tolist(), msec.tolist()))
+    (h1, m1, s1, ms1), (h2, m2, s2, ms2) = parts
+    return [f"{a:02d}:{b:02d}:{c:02d},{d:03d} --> {e:02d}:{f:02d}:{g:02d},{k:03d}"
+            for a, b, c, d, e, f, g, k in zip(h1, m1, s1, ms1, h2, m2, s2, ms2)]
+
+def apply_timing(blocks, table, original=None):
+    """table의 시간으로 타임스탬프 라인(블록 두 번째 라인)만 바꾼 SRT 텍스트 반환. 시간이 같은 블록은 원본 그대로.
+    (블록 사이 빈 라인 등은 parse_srt_blocks 결과를 이어 붙인 것과 동일)"""
+    original = original if original is not None else timing_table(blocks)
+    indices = np.flatnonzero(table.valid & ((table.start != original.start) | (table.end != original.end)))
+    new_times = dict(zip(indices.tolist(), format_times(table.start[indices], table.end[indices])))
+    out = []
+    for i, block in enumerate(blocks):
+        if i not in new_times:
+            out.append(block.raw)
+            continue
+        lines = list(block.lines)
+        indent = lines[1][:len(lines[1]) - len(lines[1].lstrip())]
+        lines[1] = indent + new_times[i]
+        out.append('\n'.join(lines) + '\n')
+    return ''.join(out)
+
+def retime_srt_file(input_path, output_path=None, shift_ms=0, fps=None, min_duration=None):
+    """파일 하나에 shift → fps 변환 → 최소 길이 보정을 순서대로 적용하고 겹침을 보고합니다. 바뀐 블록 수 반환."""
+    content, enc = read_text_preserve_encoding(input_path)
+    blocks = parse_srt_records(content)
+    if not blocks:
+        print(f"경고: {input_path}에 자막 블록이 없습니다.")
+        return 0
+    original = timing_table(blocks)
+    table = original
+    if shift_ms:
+        table = shift_times(table, shift_ms)
+    if fps:
+        table = rescale_fps(table, *fps)
+    if min_duration:
+        table = enforce_min_duration(table, min_duration)
+
+    overlaps = find_overlaps(table)
+    invalid = find_invalid_durations(table)
+    changed = int(np.count_nonzero((table.start != original.start) | (table.end != original.end)))
+    print(f"처리 중: {input_path} - 총 {len(blocks)}개 블록, 시간 변경 {changed}개, 겹침 {len(overlaps)}개, 길이 오류 {len(invalid)}개")
+    for i in overlaps[:20].tolist():
+        print(f"겹침: 블록 {blocks[i].num} ({blocks[i].time}) / 다음 블록 {blocks[i + 1].num}")
+    for i in invalid[:20].tolist():
+        print(f"경고: 블록 {blocks[i].num} 끝 시간이 시작보다 빠르거나 같음 ({blocks[i].time})")
+
+    if changed and output_path is not None:
+        write_text_with_encoding(Path(output_path), apply_timing(blocks, table, original), enc)
+        print(f"저장됨: {output_path} ({enc})")
+    return changed
+
+def main():
+    parser = argparse.ArgumentParser(description="SRT 타임스탬프 일괄 처리: 시간 이동, fps 변환, 최소 표시 시간 보정, 겹침 검사. (numpy 필요)")
+    parser.add_argument('-i', '--input', required=True, help="입력 SRT 파일")
+    parser.add_argument('-o', '--output', help="출력 파일 (기본: 입력 파일 덮어쓰기)")
+    parser.add_argument('--shift', type=int, default=0, help="시간 이동 (ms, 음수 가능)")
+    parser.add_argument('--fps', type=float, nargs=2, metavar=('FROM', 'TO'), help="fps 변환 (e.g., --fps 23.976 25)")
+    parser.add_argument('--min-duration', type=int, help="최소 표시 시간 (ms)")
+    parser.add_argument('--check', action="store_true", help="검사만 하고 파일을 쓰지 않음")
+    args = parser.parse_args()
+
+    if np is None:
+        print("오류: timing_srt는 numpy가 필요합니다. (pip install numpy)")
+        return
+
+    input_path = Path(args.input)
+    if not input_path.exists():
+        print(f"오류: {input_path}가 존재하지 않습니다.")
+        return
+    output_path = None if args.check else Path(args.output) if args.output else input_path
+    retime_srt_file(input_path, output_path, args.shift, args.fps, args.min_duration)
+
+if __name__ == "__main__":
+    main()
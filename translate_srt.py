@@ -0,0 +1,257 @@
+# translate_srt.py (origin_separate chunk → 번역 backend → trans_separate: asyncio로 동시 요청 수/초당 요청 수 제한, 재시도, 요청별 시간 기록)
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import socket
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from utils import get_srt_home, list_srt_names
+from chunk_manifest import scan_separated_dir
+
+RETRY_STATUS = (408, 425, 429, 500, 502, 503, 504)
+MAX_BACKOFF = 60.0
+
+class RetryableError(Exception):
+    """다시 시도할 수 있는 backend 오류 (timeout, 연결 실패, 429/5xx). retry_after: 서버가 알려준 대기 시간(초)."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def chunk_lang(chunk_name):
+    """chunk 이름의 언어 코드 (e.g., ABC-001.ja_000.srt → ja, 없으면 None)."""
+    stem = Path(chunk_name).stem.rsplit('_', 1)[0]
+    _, _, lang = stem.partition('.')
+    return lang or None
+
+def http_backend(url, timeout=120.0, headers=None):
+    """JSON POST backend. 요청 {chunk, source_lang, target_lang, text} → 응답 {text}.
+    반환 함수는 blocking이며 dispatcher가 thread에서 실행합니다."""
+    base_headers = {'Content-Type': 'application/json; charset=utf-8'}
+    base_headers.update(headers or {})
+
+    def send(request):
+        body = json.dumps(request, ensure_ascii=False).encode('utf-8')
+        req = urllib.request.Request(url, data=body, headers=base_headers, method='POST')
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                data = json.loads(resp.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            if e.code in RETRY_STATUS:
+                retry_after = e.headers.get('Retry-After')
+                raise RetryableError(f"HTTP {e.code}", float(retry_after) if retry_after and retry_after.isdigit() else None)
+            raise RuntimeError(f"HTTP {e.code}: {e.read()[:200].decode('utf-8', 'replace')}")
+        except (urllib.error.URLError, socket.timeout, ConnectionError) as e:
+            raise RetryableError(f"연결 실패: {getattr(e, 'reason', e)}")
+        if not isinstance(data, dict) or not isinstance(data.get('text'), str):
+            raise RuntimeError("응답에 text가 없습니다.")
+        return data['text']
+
+    return send
+
+def resolve_backend(spec, timeout=120.0, headers=None):
+    """http(s):// URL 또는 'module:function' (request dict → 번역 텍스트, blocking 함수)."""
+    if callable(spec):
+        return spec
+    if spec.startswith(('http://', 'https://')):
+        return http_backend(spec, timeout, headers)
+    module_name, _, func_name = spec.partition(':')
+    if not func_name:
+        raise ValueError(f"알 수 없는 backend: {spec} (http(s)://... 또는 module:function)")
+    return getattr(importlib.import_module(module_name), func_name)
+
+class RateLimiter:
+    """요청 시작 간격을 1/rate초 이상으로 유지 (rate가 None/0이면 제한 없음)."""
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = asyncio.get_running_loop().time()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+def backoff_delay(attempt, base, retry_after=None):
+    """attempt번째 재시도 전 대기 시간: 서버 지정 값 우선, 아니면 base * 2^(attempt-1) + jitter (최대 MAX_BACKOFF)."""
+    if retry_after is not None:
+        return min(retry_after, MAX_BACKOFF)
+    delay = min(base * (2 ** (attempt - 1)), MAX_BACKOFF)
+    return delay + random.uniform(0, delay / 2)
+
+def list_pending_chunks(origin_separate_dir, trans_separate_dir, force=False):
+    """번역할 chunk 이름 목록 (manifest 순서, manifest가 없는 chunk는 이름 순). force가 아니면 trans_separate에 있는 chunk 제외."""
+    manifests, loose = scan_separated_dir(origin_separate_dir)
+    names = []
+    for stem in sorted(manifests):
+        names.extend(chunk['name'] for chunk in manifests[stem]['chunks'])
+    names.extend(sorted(path.name for path in loose))
+    if force:
+        return names
+    done = set(list_srt_names(trans_separate_dir))
+    return [name for name in names if name not in done]
+
+def _write_translation(trans_separate_dir, chunk_name, text):
+    """번역 결과를 tmp 파일에 쓴 뒤 교체 (중단되어도 반쯤 쓴 chunk가 restore 대상이 되지 않도록)."""
+    dest_path = trans_separate_dir / chunk_name
+    tmp_path = dest_path.with_name(dest_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text.replace('\r\n', '\n'))
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+async def _translate_chunk(name, origin_separate_dir, trans_separate_dir, send, limiter, target_lang, retries, backoff):
+    timing = {'chunk': name, 'chars': 0, 'attempts': 0, 'seconds': 0.0, 'wait': 0.0, 'ok': False, 'error': None}
+    try:
+        text = (origin_separate_dir / name).read_text(encoding='utf-8')
+    except (OSError, UnicodeDecodeError) as e:
+        # 읽을 수 없거나 사라진 chunk는 그 chunk만 실패로 기록 (다른 chunk 번역은 계속)
+        timing['error'] = f"chunk 읽기 실패 - {e}"
+        print(f"오류: {name} 번역 실패 - {timing['error']}")
+        return timing
+    timing['chars'] = len(text)
+    request = {'chunk': name, 'source_lang': chunk_lang(name), 'target_lang': target_lang, 'text': text}
+    attempt = 0
+    while True:
+        attempt += 1
+        await limiter.wait()
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(send, request)
+        except RetryableError as e:
+            timing['seconds'] += time.perf_counter() - started
+            if attempt > retries:
+                timing['error'] = str(e)
+                break
+            delay = backoff_delay(attempt, backoff, e.retry_after)
+            print(f"경고: {name} - {e}, {delay:.1f}초 후 재시도 ({attempt}/{retries})")
+            timing['wait'] += delay
+            await asyncio.sleep(delay)
+            continue
+        except Exception as e:
+            timing['seconds'] += time.perf_counter() - started
+            timing['error'] = str(e)
+            break
+        timing['seconds'] += time.perf_counter() - started
+        try:
+            _write_translation(trans_separate_dir, name, result)
+        except OSError as e:
+            timing['error'] = f"저장 실패 - {e}"
+            break
+        timing['ok'] = True
+        break
+    timing['attempts'] = attempt
+    if timing['ok']:
+        print(f"번역됨: {trans_separate_dir / name} ({timing['seconds']:.2f}초, 시도 {attempt}회)")
+    else:
+        print(f"오류: {name} 번역 실패 - {timing['error']} (시도 {attempt}회)")
+    return timing
+
+async def translate_chunks(names, origin_separate_dir, trans_separate_dir, send, concurrency=4, rate=None,
+                           target_lang='ko', retries=3, backoff=1.0):
+    """chunk 이름 목록을 동시에 최대 concurrency개, 초당 최대 rate개 요청으로 번역합니다. chunk별 timing dict 목록 반환 (names 순서)."""
+    limiter = RateLimiter(rate)
+    timings = [None] * len(names)
+    pending = iter(enumerate(names))
+
+    async def worker():
+        # concurrency개의 worker가 chunk를 하나씩 가져감: 처리 중인 chunk만 읽어 메모리에 둠 (chunk마다 task를 만들지 않음)
+        for i, name in pending:
+            timings[i] = await _translate_chunk(name, origin_separate_dir, trans_separate_dir, send, limiter, target_lang, retries, backoff)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(names))))))
+    return timings
+
+def summarize_timings(timings, elapsed):
+    """timing 목록 → 요약 dict (완료/실패 수, 요청 시간 평균/p50/p95/최대, 초당 글자 수)."""
+    done = [t for t in timings if t['ok']]
+    seconds = sorted(t['seconds'] for t in done)
+
+    def pick(q):
+        return seconds[min(len(seconds) - 1, int(q * len(seconds)))] if seconds else 0.0
+
+    return {
+        'chunks': len(timings),
+        'done': len(done),
+        'failed': len(timings) - len(done),
+        'retries': sum(max(t['attempts'] - 1, 0) for t in timings),  # 읽기 실패한 chunk는 시도 0회
+        'elapsed': elapsed,
+        'mean': sum(seconds) / len(seconds) if seconds else 0.0,
+        'p50': pick(0.5),
+        'p95': pick(0.95),
+        'max': seconds[-1] if seconds else 0.0,
+        'chars_per_sec': sum(t['chars'] for t in done) / elapsed if elapsed > 0 else 0.0,
+    }
+
+def translate_all_chunks(origin_separate_dir, trans_separate_dir, backend, concurrency=4, rate=None, target_lang='ko',
+                         retries=3, backoff=1.0, force=False):
+    """origin_separate에서 아직 번역되지 않은 chunk를 backend로 번역해 trans_separate에 저장합니다. 요약 dict 반환."""
+    origin_separate_dir = Path(origin_separate_dir)
+    trans_separate_dir = Path(trans_separate_dir)
+    trans_separate_dir.mkdir(parents=True, exist_ok=True)
+    names = list_pending_chunks(origin_separate_dir, trans_separate_dir, force)
+    if not names:
+        print("번역할 chunk가 없습니다.")
+        return summarize_timings([], 0.0)
+    print(f"번역 대상: {len(names)}개 chunk (동시 {concurrency}개, 초당 {rate or '무제한'})")
+    send = resolve_backend(backend)
+    started = time.perf_counter()
+    timings = asyncio.run(translate_chunks(names, origin_separate_dir, trans_separate_dir, send, concurrency, rate,
+                                           target_lang, retries, backoff))
+    summary = summarize_timings(timings, time.perf_counter() - started)
+    print(f"요약: 완료 {summary['done']}개, 실패 {summary['failed']}개, 재시도 {summary['retries']}회, 총 {summary['elapsed']:.2f}초 "
+          f"(요청 평균 {summary['mean']:.2f}초, p50 {summary['p50']:.2f}초, p95 {summary['p95']:.2f}초, 최대 {summary['max']:.2f}초, "
+          f"초당 {summary['chars_per_sec']:.0f}자)")
+    for t in timings:
+        if not t['ok']:
+            print(f"실패: {t['chunk']} - {t['error']}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="SRT_HOME/origin_separate의 chunk를 번역 backend로 보내 trans_separate에 저장합니다. (이미 번역된 chunk는 스킵)")
+    parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('-b', '--backend', required=True, help="번역 backend: JSON POST URL (e.g., http://127.0.0.1:8765/translate) 또는 module:function")
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help="동시 요청 수 (기본: 4)")
+    parser.add_argument('--rate', type=float, help="초당 최대 요청 수 (기본: 제한 없음)")
+    parser.add_argument('--retries', type=int, default=3, help="timeout/연결 실패/429/5xx 재시도 횟수 (기본: 3)")
+    parser.add_argument('--backoff', type=float, default=1.0, help="첫 재시도 대기 시간 (초, 재시도마다 2배, 기본: 1.0)")
+    parser.add_argument('--timeout', type=float, default=120.0, help="요청당 timeout (초, 기본: 120)")
+    parser.add_argument('--header', action='append', default=[], help="HTTP 헤더 'Name: value' (여러 번 지정 가능, e.g., 인증 토큰)")
+    parser.add_argument('--target-lang', default='ko', help="번역 대상 언어 (기본: ko)")
+    parser.add_argument('--force', action="store_true", help="trans_separate에 있는 chunk도 다시 번역")
+    args = parser.parse_args()
+
+    srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
+    origin_separate_dir = srt_home_path / 'origin_separate'
+    trans_separate_dir = srt_home_path / 'trans_separate'
+
+    print(f"SRT_HOME: {srt_home_path}")
+    print(f"원본 분할 디렉토리: {origin_separate_dir}")
+    print(f"번역 분할 디렉토리: {trans_separate_dir}")
+
+    if not origin_separate_dir.exists():
+        print(f"오류: {origin_separate_dir}가 존재하지 않습니다.")
+        return
+
+    headers = {}
+    for header in args.header:
+        name, sep, value = header.partition(':')
+        if not sep:
+            print(f"오류: 헤더 형식이 잘못되었습니다: {header} ('Name: value')")
+            return
+        headers[name.strip()] = value.strip()
+    backend = resolve_backend(args.backend, args.timeout, headers)
+    translate_all_chunks(origin_separate_dir, trans_separate_dir, backend, args.concurrency, args.rate, args.target_lang,
+                         args.retries, args.backoff, args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# translation_memory.py (번역 메모리: 정규화한 원문 대사 → 번역 대사, SRT_HOME/cache/tm.sqlite)
+import re
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+
+TM_BATCH = 500  # SQLite IN (...) 한 번에 조회할 갯수
+WHITESPACE_RE = re.compile(r'\s+')
+FENCE_RE = re.compile(r'^[ \t]*```\w*[ \t]*$', re.MULTILINE)  # chunk 마지막 대사에 붙는 markdown 코드 블록 표시
+
+def get_tm_path(srt_home):
+    return Path(srt_home) / 'cache' / 'tm.sqlite'
+
+def normalize_cue(text):
+    """TM 키: NFKC 정규화, 라인별 공백 정리, 빈 라인 제거 (e.g., '  はい　' → 'はい')."""
+    lines = (WHITESPACE_RE.sub(' ', line).strip() for line in unicodedata.normalize('NFKC', text).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+def open_tm(tm_path, readonly=False):
+    """readonly=True이면 TM이 없을 때 None (separate의 조회용, 여러 프로세스에서 동시에 열어도 됨)."""
+    tm_path = Path(tm_path)
+    if readonly:
+        if not tm_path.exists():
+            return None
+        return sqlite3.connect(f"{tm_path.resolve().as_uri()}?mode=ro", uri=True)
+    tm_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(tm_path))
+    conn.execute('CREATE TABLE IF NOT EXISTS tm (source TEXT PRIMARY KEY, target TEXT NOT NULL, '
+                 'seen INTEGER NOT NULL DEFAULT 1, updated INTEGER NOT NULL)')
+    return conn
+
+def tm_version(tm_path):
+    """TM 내용이 바뀌면 달라지는 값 (행 수, 마지막 갱신 시각, seen 합계). TM이 없으면 None.
+    separate --tm의 처리 상태 키에 포함해 새 번역이 추가되면 다시 분할하도록 합니다."""
+    conn = open_tm(tm_path, readonly=True)
+    if conn is None:
+        return None
+    try:
+        return list(conn.execute('SELECT COUNT(*), MAX(updated), SUM(seen) FROM tm').fetchone())
+    except sqlite3.OperationalError:  # 테이블 없음 (빈 TM 파일)
+        return None
+    finally:
+        conn.close()
+
+def lookup_cues(conn, sources):
+    """정규화된 원문 목록 → {원문: 번역} (TM에 있는 것만)."""
+    found = {}
+    keys = list(set(sources))
+    for i in range(0, len(keys), TM_BATCH):
+        batch = keys[i:i + TM_BATCH]
+        rows = conn.execute(f"SELECT source, target FROM tm WHERE source IN ({','.join('?' * len(batch))})", batch)
+        found.update(rows)
+    return found
+
+def cue_pairs(origin_texts, trans_texts):
+    """원문/번역 대사 쌍에서 TM에 넣을 (정규화 원문, 번역) 목록. 빈 대사, 번역되지 않은(원문과 같은) 대사 제외."""
+    pairs = []
+    for source, target in zip(origin_texts, trans_texts):
+        key = normalize_cue(source)
+        target = FENCE_RE.sub('', target).strip()
+        if key and target and normalize_cue(target) != key:
+            pairs.append((key, target))
+    return pairs
+
+def add_pairs(conn, pairs):
+    """TM에 추가 (같은 원문은 최신 번역으로 교체, seen 증가). 추가/갱신 갯수 반환.
+    pairs는 번호/타임스탬프가 원본과 맞는 chunk에서 나온 쌍이어야 합니다 (restore_srt_file에서 확인)."""
+    if not pairs:
+        return 0
+    now = int(time.time())
+    with conn:
+        conn.executemany('INSERT INTO tm (source, target, seen, updated) VALUES (?, ?, 1, ?) '
+                         'ON CONFLICT(source) DO UPDATE SET target = excluded.target, seen = seen + 1, updated = excluded.updated',
+                         [(source, target, now) for source, target in pairs])
+    return len(pairs)
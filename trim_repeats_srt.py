@@ -1,11 +1,21 @@
 import argparse
 from pathlib import Path
 import sys
-from utils import load_patterns, compress_repeats, read_text_preserve_encoding, write_text_with_encoding, get_srt_home  # 통합 utils import
+import os
+from utils import load_patterns, compress_repeats, compile_repeat_patterns, compress_repeats_compiled, build_auto_repeat_regex, auto_compress_repeats, is_auto_repeat_unit, read_text_preserve_encoding, decode_bytes, write_text_with_encoding, get_srt_home, log, progress  # 통합 utils import
+from state_store import load_state, save_state, lookup, record, sha1_bytes
+from metrics import count
 
-def process_file(path: Path, patterns: list[str], min_repeat: int, keep_repeat: int, keep_space: bool, dry_run: bool=False) -> tuple[bool, str]:
-    original, enc = read_text_preserve_encoding(path)
-    modified = compress_repeats(original, patterns, min_repeat, keep_repeat, keep_space)
+def process_file(path: Path, patterns: list[str], min_repeat: int, keep_repeat: int, keep_space: bool, dry_run: bool=False, docs: dict | None=None, compiled=None, auto_rx=None, found: dict | None=None, data: bytes | None=None) -> tuple[bool, str]:
+    original, enc = decode_bytes(data) if data is not None else read_text_preserve_encoding(path)
+    if compiled is not None:
+        modified = compress_repeats_compiled(original, compiled, keep_repeat, keep_space)
+    else:
+        modified = compress_repeats(original, patterns, min_repeat, keep_repeat, keep_space)
+    if auto_rx is not None:  # 패턴 파일에 없는 반복 자동 감지
+        modified = auto_compress_repeats(modified, auto_rx, keep_repeat, keep_space, found)
+    if docs is not None:
+        docs[path] = modified  # 다음 stage(separate)에 메모리로 전달
     if modified != original:
         if not dry_run:
             # 백업 (옵션: 활성화 시 주석 해제)
@@ -15,29 +25,91 @@ def process_file(path: Path, patterns: list[str], min_repeat: int, keep_repeat:
         return True, enc
     return False, enc
 
-def trim_repeats_all(process_dir, patterns_file, min_repeat, keep_repeat, keep_space, dry_run):
-    if not patterns_file.exists():
-        print(f"오류: 패턴 파일 {patterns_file}가 존재하지 않습니다.")
-        return
+def append_patterns(patterns_file, units, existing):
+    """자동 감지된 반복 단위 중 patterns.txt에 없는 것을 추가합니다. (문자만으로 된 단위만, 숫자/문장부호 제외) 추가된 갯수 반환."""
+    new_units = [u for u in units if u not in existing and is_auto_repeat_unit(u)]
+    if not new_units:
+        return 0
+    patterns_file.parent.mkdir(parents=True, exist_ok=True)
+    prefix = ''
+    if patterns_file.exists() and patterns_file.stat().st_size > 0:
+        raw, enc = read_text_preserve_encoding(patterns_file)
+        prefix = '' if raw.endswith('\n') else '\n'
+    else:
+        enc = 'utf-8'
+    with open(patterns_file, 'a', encoding=enc) as f:
+        f.write(prefix + '# auto-detected\n' + ''.join(f"{u}\n" for u in new_units))
+    return len(new_units)
 
-    patterns = load_patterns(patterns_file)
-    print(f"로드된 패턴 수: {len(patterns)} from {patterns_file}")
+def trim_repeats_all(process_dir, patterns_file, min_repeat, keep_repeat, keep_space, dry_run, docs=None,
+                     auto=False, max_unit=8, append_found=False, state=None):
+    """state(state_store) 지정 시 이미 같은 옵션으로 트리밍된 내용(해시 일치)의 파일은 읽기만 하고 건너뜁니다.
+    (--auto는 전체 파일의 반복 보고가 목적이므로 건너뛰지 않음)"""
+    if patterns_file.exists():
+        patterns = load_patterns(patterns_file)
+        print(f"로드된 패턴 수: {len(patterns)} from {patterns_file}")
+    elif auto:
+        patterns = []
+        log('warning', f"경고: 패턴 파일 {patterns_file}가 없습니다. 자동 감지만 사용합니다.")
+    else:
+        log('error', f"오류: 패턴 파일 {patterns_file}가 존재하지 않습니다.")
+        return
 
-    if not patterns:
-        print("경고: 패턴이 없습니다. 아무 작업도 하지 않습니다.")
+    if not patterns and not auto:
+        log('warning', "경고: 패턴이 없습니다. 아무 작업도 하지 않습니다.")
         return
 
+    compiled = compile_repeat_patterns(patterns, min_repeat)  # 패턴은 한 번만 컴파일
+    auto_rx = build_auto_repeat_regex(min_repeat, max_unit) if auto else None
+    found = {}
     total = 0
     changed = 0
+    unchanged = 0
+    # 같은 해시의 파일을 이 옵션으로 트리밍하면 결과가 그대로인지 기록 (트리밍 결과는 다시 트리밍해도 같음)
+    params = {'patterns': patterns, 'min': min_repeat, 'keep': keep_repeat, 'keep_space': keep_space}
+    use_state = state is not None and not auto
+    # dry-run에서 바뀌는 파일은 디스크에 쓰지 않음: docs 지정 시(before_trans 기본) 트리밍 결과는 메모리로만 separate에 전달
+    pending_tag = "MEMORY " if docs is not None else "DRY-RUN"
     for srt in process_dir.rglob("*.srt"):  # 수정: rglob으로 하위 경로 재귀 검색
         total += 1
-        did_change, enc = process_file(srt, patterns, min_repeat, keep_repeat, keep_space, dry_run=dry_run)
-        tag = "UPDATED" if did_change else "SKIP   "
+        data = srt.read_bytes()
+        count('files')
+        count('bytes_read', len(data))
+        key = srt.resolve()
+        if use_state and lookup(state, 'trim', key, sha1_bytes(data), params) is not None:
+            unchanged += 1
+            count('unchanged')
+            print(f"[SKIP   ] {srt} (이전 결과와 동일)")
+            progress()
+            continue
+        results = docs if docs is not None or not use_state else {}
+        did_change, enc = process_file(srt, patterns, min_repeat, keep_repeat, keep_space, dry_run=dry_run, docs=results,
+                                       compiled=compiled, auto_rx=auto_rx, found=found, data=data)
+        tag = (pending_tag if dry_run else "UPDATED") if did_change else "SKIP   "
         print(f"[{tag}] {srt} (enc={enc})")
         if did_change:
             changed += 1
+            count('changed')
+        if use_state and not (did_change and dry_run):
+            # 파일 내용이 트리밍 결과와 같을 때만 기록: 바뀌지 않았거나 실제로 쓴 경우 (dry-run으로 메모리에만 트리밍한 파일은
+            # 디스크에 원본 그대로이므로 기록하지 않음 → 다음 실행에서도 트리밍)
+            output = results[srt].replace('\n', os.linesep).encode(enc) if did_change else data
+            record(state, 'trim', key, sha1_bytes(output), params, {})
+        progress()
+
+    save_state(state)
+    changed_label = ("메모리 트리밍" if docs is not None else "변경 예정") if dry_run else "업데이트"
+    log('summary', f"\n요약: 검색된 파일={total}, {changed_label}={changed}, 스킵={total-changed}" + (f" (이전 결과와 동일: {unchanged})" if unchanged else ""))
 
-    print(f"\n요약: 검색된 파일={total}, 업데이트={changed}, 스킵={total-changed}")
+    if auto:
+        ranked = sorted(found.items(), key=lambda kv: (-kv[1], kv[0]))
+        log('summary', f"\n자동 감지된 반복 단위: {len(ranked)}개")
+        for unit, hits in ranked:
+            mark = '' if unit in patterns else ' (patterns.txt에 없음)'
+            log('summary', f"- {unit!r}: {hits}회{mark}")
+        if append_found and not dry_run:
+            added = append_patterns(patterns_file, [u for u, _ in ranked], set(patterns))
+            log('summary', f"patterns.txt에 {added}개 패턴 추가: {patterns_file}")
 
 def main():
     parser = argparse.ArgumentParser(description="지정 디렉토리의 SRT 파일에서 반복 패턴을 제거합니다. 기본: SRT_HOME/origin. 패턴은 SRT_HOME/patterns.txt에서 로드. 커스텀 -s 입력 시 입력 경로 직접 사용.")
@@ -47,6 +119,10 @@ def main():
     parser.add_argument('-k', '--keep', type=int, default=3, help="남길 반복 수 (기본: 3)")
     parser.add_argument('--keep-space', action="store_true", help="남긴 반복 사이에 공백 유지 (기본: 없음)")
     parser.add_argument('--dry-run', action="store_true", help="변경 확인만, 실제 수정 안 함")
+    parser.add_argument('--auto', action="store_true", help="패턴 파일에 없는 반복(1~--max-unit 글자 단위)도 자동 감지하여 제거, 발견된 패턴 보고")
+    parser.add_argument('--max-unit', type=int, default=8, help="자동 감지 반복 단위 최대 글자 수 (기본: 8)")
+    parser.add_argument('--append-patterns', action="store_true", help="자동 감지된 새 패턴을 패턴 파일에 추가 (--auto 필요)")
+    parser.add_argument('--no-cache', action="store_true", help="처리 상태(SRT_HOME/cache/state.json)를 무시하고 모든 파일 처리")
     args = parser.parse_args()
 
     if args.min < 2:
@@ -55,6 +131,9 @@ def main():
     if args.keep < 1:
         print("오류: --keep은 1 이상이어야 합니다.", file=sys.stderr)
         sys.exit(2)
+    if args.max_unit < 1:
+        print("오류: --max-unit은 1 이상이어야 합니다.", file=sys.stderr)
+        sys.exit(2)
 
     srt_home_path = get_srt_home()  # 기본 SRT_HOME
     if args.dir:
@@ -73,7 +152,9 @@ def main():
         print(f"오류: {process_dir}가 존재하지 않습니다.")
         sys.exit(1)
 
-    trim_repeats_all(process_dir, patterns_file, args.min, args.keep, args.keep_space, args.dry_run)
+    state = None if args.no_cache else load_state(srt_home_path)
+    trim_repeats_all(process_dir, patterns_file, args.min, args.keep, args.keep_space, args.dry_run,
+                     auto=args.auto, max_unit=args.max_unit, append_found=args.append_patterns, state=state)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
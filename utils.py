@@ -1,9 +1,17 @@
-# utils.py (변경 없음, 이전 버전 유지)
+# utils.py (공통 utils: 파일명/경로 판별, 한글 판별, SRT 파싱, 인코딩 감지, 반복 패턴 정규식, 병렬 작업(run_jobs)과 로그 레벨/진행률, mp4/srt 조회)
+import bisect
 import os
 import re
+import sys
 from pathlib import Path
 import platform
 import codecs
+import traceback
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import NamedTuple
+from metrics import count, take_counters, merge_counters
 
 def get_base_filename(filename):
     """SRT 파일의 base_filename을 반환합니다. chunk 번호 전에 첫 .까지의 문자열."""
@@ -11,11 +19,64 @@ def get_base_filename(filename):
     base = without_chunk.split('.')[0]
     return base
 
+def list_srt_names(dir_path):
+    """dir_path의 .srt 파일 이름을 한 번 읽어 정렬된 리스트로 반환 (glob('*.srt')와 같이 숨김 파일 제외, 없으면 빈 리스트)."""
+    try:
+        with os.scandir(dir_path) as it:
+            return sorted(entry.name for entry in it
+                          if entry.name.endswith('.srt') and not entry.name.startswith('.') and entry.is_file())
+    except OSError:
+        return []
+
+def names_with_prefix(sorted_names, prefix):
+    """list_srt_names 결과에서 prefix로 시작하는 이름 목록 (glob(f"{prefix}*.srt")와 같은 결과를 이진 탐색으로)."""
+    start = bisect.bisect_left(sorted_names, prefix)
+    end = start
+    while end < len(sorted_names) and sorted_names[end].startswith(prefix):
+        end += 1
+    return sorted_names[start:end]
+
+HANGUL_RE = re.compile(r'[\uAC00-\uD7A3]')
+KOREAN_MIN_BYTES = 100  # 한글 음절의 UTF-8 바이트 합 기준
+KOREAN_MIN_CHARS = -(-KOREAN_MIN_BYTES // 3)  # 한글 음절은 UTF-8 3바이트 → 34자
+KOREAN_READ_CHUNK = 64 * 1024
+
+def _count_hangul(text, limit):
+    """text의 한글 음절 수를 세되 limit에 도달하면 바로 중단."""
+    count = 0
+    for _ in HANGUL_RE.finditer(text):
+        count += 1
+        if count >= limit:
+            break
+    return count
+
 def has_korean(text):
-    hangul_chars = re.findall(r'[\uAC00-\uD7A3]', text)
-    combined_hangul = ''.join(hangul_chars)
-    byte_length = len(combined_hangul.encode('utf-8'))
-    return byte_length >= 100
+    return _count_hangul(text, KOREAN_MIN_CHARS) >= KOREAN_MIN_CHARS
+
+def has_korean_file(path, max_chars=None, chunk_size=KOREAN_READ_CHUNK, encoding=None):
+    """파일을 chunk 단위로 읽으며 한글 음절이 기준(34자 ≈ 100바이트)에 도달하면 즉시 True.
+    max_chars 지정 시 앞부분 max_chars 글자만 샘플링합니다. encoding 미지정 시 첫 chunk로 판별 (CP949 등)."""
+    remaining = KOREAN_MIN_CHARS
+    read_chars = 0
+    decoder = None
+    with open(path, 'rb') as f:
+        while True:
+            if decoder is None:  # 첫 읽기는 인코딩 판별에 충분한 크기로
+                size = max(chunk_size, ENCODING_SAMPLE_BYTES)
+                chunk = f.read(size)
+                enc = encoding or detect_encoding(chunk, complete=len(chunk) < size)
+                decoder = codecs.getincrementaldecoder(enc)(errors='replace')
+            else:
+                chunk = f.read(chunk_size)
+            text = decoder.decode(chunk, final=not chunk)
+            if max_chars is not None:
+                text = text[:max_chars - read_chars]
+            read_chars += len(text)
+            remaining -= _count_hangul(text, remaining)
+            if remaining <= 0:
+                return True
+            if not chunk or (max_chars is not None and read_chars >= max_chars):
+                return False
 
 def is_trash_path(path):
     lower_path = str(path).lower()
@@ -27,21 +88,59 @@ def is_srt_home_path(path, srt_home):
     except ValueError:
         return False
 
-def parse_srt_blocks(content):
-    blocks = []
-    current_block = []
-    time_pattern = r'^\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3}$'
-    for line in content.splitlines():
+SRT_NUM_RE = re.compile(r'^\d+$')
+SRT_TIME_RE = re.compile(r'^(\d{2}):(\d{2}):(\d{2}),(\d{3}) --> (\d{2}):(\d{2}):(\d{2}),(\d{3})$')
+
+class SrtBlock(NamedTuple):
+    """파싱된 자막 블록. num/time은 첫 두 라인(strip), lines는 블록 원본 라인 전체."""
+    num: str
+    time: str
+    start_ms: int
+    end_ms: int
+    lines: tuple
+
+    @property
+    def text(self):
+        """대사 부분 (라인 2부터, 다중 라인 유지, 앞뒤 공백 제거)."""
+        return '\n'.join(self.lines[2:]).strip()
+
+    @property
+    def raw(self):
+        """parse_srt_blocks와 동일한 블록 문자열."""
+        return '\n'.join(self.lines) + '\n'
+
+def _time_to_ms(m, offset):
+    h, mi, s, ms = (int(m.group(offset + k)) for k in range(4))
+    return ((h * 60 + mi) * 60 + s) * 1000 + ms
+
+def parse_srt_records(content):
+    """SRT 내용을 한 번의 선형 탐색으로 SrtBlock 리스트로 파싱합니다.
+    블록 경계/유효성 규칙은 parse_srt_blocks와 동일 (숫자 라인에서 새 블록, 타임스탬프 없는 블록 무시)."""
+    lines = content.splitlines()
+    records = []
+    start = 0
+    time_match = None  # 현재 블록의 첫 타임스탬프 (블록 첫 라인 제외)
+    for i, line in enumerate(lines):
         stripped = line.strip()
-        if re.match(r'^\d+$', stripped) and current_block:  # 숫자 라인: 새 블록
-            if any(re.match(time_pattern, l.strip()) for l in current_block[1:]):  # 타임스탬프 있는지 확인 (빈 블록 무시)
-                blocks.append('\n'.join(current_block) + '\n')
-            current_block = [line]
-        else:
-            current_block.append(line)
-    if current_block and any(re.match(time_pattern, l.strip()) for l in current_block[1:]):
-        blocks.append('\n'.join(current_block) + '\n')
-    return blocks
+        if i > start and SRT_NUM_RE.match(stripped):  # 숫자 라인: 새 블록
+            if time_match:
+                records.append(_make_record(lines, start, i, time_match))
+            start = i
+            time_match = None
+        elif i > start and time_match is None and '-->' in stripped:
+            time_match = SRT_TIME_RE.match(stripped)
+    if time_match:
+        records.append(_make_record(lines, start, len(lines), time_match))
+    count('cues', len(records))
+    return records
+
+def _make_record(lines, start, end, time_match):
+    block_lines = tuple(lines[start:end])
+    time = block_lines[1].strip()
+    return SrtBlock(block_lines[0].strip(), time, _time_to_ms(time_match, 1), _time_to_ms(time_match, 5), block_lines)
+
+def parse_srt_blocks(content):
+    return [record.raw for record in parse_srt_records(content)]
 
 def get_srt_home(default_windows='V:/srt_home', default_linux='/home/srt_home'):
     if platform.system() == 'Windows':
@@ -56,22 +155,88 @@ def clean_trans_text(text):
         text = re.sub(pattern, '', text, flags=re.IGNORECASE)
     return text
 
-def sniff_encoding(path: Path) -> str:
-    for enc in ("utf-8", "utf-8-sig", "utf-16", "latin-1"):
-        try:
-            path.read_text(encoding=enc)
+ENCODING_SAMPLE_BYTES = 64 * 1024
+BOM_ENCODINGS = (  # UTF-32 LE BOM이 UTF-16 LE BOM으로 시작하므로 UTF-32 먼저 확인
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+FALLBACK_ENCODINGS = ('utf-8', 'cp949', 'cp932', 'latin-1')
+KANA_RE = re.compile(r'[\u3040-\u30FF]')
+_KSX1001_HANGUL = None
+
+def _ksx1001_hangul():
+    """KS X 1001(EUC-KR) 완성형 한글 2350자. CP949 확장 영역 글자는 Shift-JIS 오판 시 주로 나타남."""
+    global _KSX1001_HANGUL
+    if _KSX1001_HANGUL is None:
+        _KSX1001_HANGUL = frozenset(bytes([lead, trail]).decode('euc_kr')
+                                    for lead in range(0xB0, 0xC9) for trail in range(0xA1, 0xFF))
+    return _KSX1001_HANGUL
+
+def _decodes(sample: bytes, enc: str, final: bool) -> str | None:
+    """sample을 enc로 디코딩 (final=False면 끝에 잘린 멀티바이트 글자 허용). 실패 시 None."""
+    try:
+        return codecs.getincrementaldecoder(enc)().decode(sample, final)
+    except UnicodeDecodeError:
+        return None
+
+def detect_encoding(data: bytes, sample_size: int = ENCODING_SAMPLE_BYTES, complete: bool | None = None) -> str:
+    """바이트 앞부분(sample_size)만 보고 인코딩을 판별합니다: BOM → UTF-16(BOM 없음) → UTF-8 → CP949/CP932 → latin-1.
+    complete=False면 data가 파일의 앞부분일 뿐이라고 보고 끝에 잘린 멀티바이트 글자를 허용합니다."""
+    for bom, enc in BOM_ENCODINGS:
+        if data.startswith(bom):
             return enc
-        except Exception:
+    sample = data[:sample_size]
+    final = len(sample) == len(data) if complete is None else complete and len(sample) == len(data)
+    # BOM 없는 UTF-16: ASCII 위주 텍스트는 짝수/홀수 위치 한쪽에 NUL이 몰림
+    if sample.count(0) * 4 >= len(sample) > 0:
+        return 'utf-16-le' if sample[1::2].count(0) > sample[0::2].count(0) else 'utf-16-be'
+    if _decodes(sample, 'utf-8', final) is not None:
+        return 'utf-8'
+    # CP949와 CP932는 서로의 바이트열을 오류 없이 디코딩하는 경우가 많아 글자 분포로 판별
+    scores = {}
+    text = _decodes(sample, 'cp949', final)
+    if text is not None:
+        hangul = _ksx1001_hangul()
+        scores['cp949'] = sum(1 for ch in text if ch in hangul)
+    text = _decodes(sample, 'cp932', final)
+    if text is not None:
+        scores['cp932'] = len(KANA_RE.findall(text))
+    if scores:
+        enc, score = max(scores.items(), key=lambda kv: kv[1])
+        if score > 0:
+            return enc
+    return 'latin-1'
+
+def decode_bytes(data: bytes) -> tuple[str, str]:
+    """detect_encoding 결과로 한 번 디코딩하여 (text, enc) 반환. 앞부분 이후에서 실패하면 다음 후보로 재시도.
+    줄바꿈은 텍스트 모드 읽기와 같이 '\\n'으로 통일합니다."""
+    enc = detect_encoding(data)
+    candidates = [enc] + [c for c in FALLBACK_ENCODINGS if c != enc]
+    for candidate in candidates:
+        try:
+            text = data.decode(candidate)
+        except UnicodeDecodeError:
             continue
-    return "latin-1"
+        return text.replace('\r\n', '\n').replace('\r', '\n'), candidate
+    raise AssertionError('latin-1 decoding cannot fail')
+
+def sniff_encoding(path: Path) -> str:
+    with open(path, 'rb') as f:
+        data = f.read(ENCODING_SAMPLE_BYTES)
+    return detect_encoding(data, complete=len(data) < ENCODING_SAMPLE_BYTES)
 
 def read_text_preserve_encoding(path: Path) -> tuple[str, str]:
-    enc = sniff_encoding(path)
-    text = path.read_text(encoding=enc)
-    return text, enc
+    """파일 바이트를 한 번만 읽어 인코딩 판별과 디코딩에 재사용합니다."""
+    data = Path(path).read_bytes()
+    count('bytes_read', len(data))
+    return decode_bytes(data)
 
 def write_text_with_encoding(path: Path, text: str, enc: str) -> None:
     path.write_text(text, encoding=enc)
+    count('bytes_written', path.stat().st_size)
 
 def load_patterns(pfile: Path) -> list[str]:
     raw, _ = read_text_preserve_encoding(pfile)
@@ -89,14 +254,139 @@ def build_regex_for_pattern(pat: str, min_repeat: int) -> re.Pattern:
     rx = rf"(?P<pre>\s*)({esc})(?:[^\S\r\n]*{esc}){{{nmin},}}(?P<post>\s*)"
     return re.compile(rx)
 
-def compress_repeats(text: str, patterns: list[str], min_repeat: int, keep_repeat: int, keep_space: bool) -> str:
+class CompiledPatterns(NamedTuple):
+    """compile_repeat_patterns 결과: 패턴별 regex (적용 순서 유지) + 전체 패턴 반복 후보 검색용 결합 regex."""
+    rules: list
+    any_rx: re.Pattern | None
+
+def compile_repeat_patterns(patterns: list[str], min_repeat: int) -> CompiledPatterns:
+    """패턴 목록을 한 번만 컴파일합니다. (파일마다 다시 컴파일하지 않도록 trim_repeats_all에서 재사용)"""
+    rules = [(p, build_regex_for_pattern(p, min_repeat)) for p in patterns]
+    if not patterns:
+        return CompiledPatterns(rules, None)
+    # 어떤 패턴이든 min_repeat회 이상 연속 반복되는 구간이 있으면 매치 (긴 패턴 우선)
+    alt = '|'.join(re.escape(p) for p in sorted(set(patterns), key=len, reverse=True))
+    nmin = max(1, min_repeat - 1)
+    any_rx = re.compile(rf"(?:{alt})(?:[^\S\r\n]*(?:{alt})){{{nmin},}}")
+    return CompiledPatterns(rules, any_rx)
+
+def compress_repeats_compiled(text: str, compiled: CompiledPatterns, keep_repeat: int, keep_space: bool) -> str:
+    """compress_repeats와 결과 동일. 결합 regex 한 번의 탐색으로 반복이 없는 텍스트는 바로 반환하고,
+    반복이 있을 때만 패턴 순서대로 적용 (현재 텍스트에 없는 패턴은 건너뜀)."""
+    if compiled.any_rx is None or compiled.any_rx.search(text) is None:
+        return text
     joiner = " " if keep_space else ""
-    for p in patterns:
+    for p, rx in compiled.rules:
+        if p not in text:
+            continue
         rep = joiner.join([p] * keep_repeat)
-        rx = build_regex_for_pattern(p, min_repeat)
-        text = rx.sub(lambda m: f"{m.group('pre')}{rep}{m.group('post')}", text)
+        text = rx.sub(lambda m, rep=rep: f"{m.group('pre')}{rep}{m.group('post')}", text)
     return text
 
+def compress_repeats(text: str, patterns: list[str], min_repeat: int, keep_repeat: int, keep_space: bool) -> str:
+    return compress_repeats_compiled(text, compile_repeat_patterns(patterns, min_repeat), keep_repeat, keep_space)
+
+AUTO_UNIT_RE = re.compile(r"[^\W\d_]+")  # 자동 감지 반복 단위: 문자만 (숫자/문장부호는 실제 내용일 수 있음, e.g., 10000000, ......)
+
+def is_auto_repeat_unit(unit: str) -> bool:
+    return AUTO_UNIT_RE.fullmatch(unit) is not None
+
+def build_auto_repeat_regex(min_repeat: int, max_unit: int = 8) -> re.Pattern:
+    """패턴 파일 없이 임의의 반복 단위(1~max_unit 글자, 문자만)가
+    min_repeat회 이상 연속 반복되는 구간을 찾는 regex. 가장 짧은 단위를 우선합니다."""
+    nmin = max(1, min_repeat - 1)
+    unit = rf"[^\W\d_]{{1,{max(1, max_unit)}}}?"
+    return re.compile(rf"(?P<unit>{unit})(?:[^\S\r\n]*(?P=unit)){{{nmin},}}")
+
+def auto_compress_repeats(text: str, rx: re.Pattern, keep_repeat: int, keep_space: bool, found: dict | None = None) -> str:
+    """자막 대사 라인에서 자동 감지한 반복을 keep_repeat회로 줄입니다. (번호/타임스탬프 라인은 건드리지 않음)
+    found 지정 시 발견된 반복 단위별 횟수를 누적합니다."""
+    joiner = " " if keep_space else ""
+
+    def repl(m):
+        unit = m.group('unit')
+        if found is not None:
+            found[unit] = found.get(unit, 0) + 1
+        return joiner.join([unit] * keep_repeat)
+
+    lines = text.splitlines(keepends=True)
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped or SRT_NUM_RE.match(stripped) or SRT_TIME_RE.match(stripped):
+            continue
+        lines[i] = rx.sub(repl, line)
+    return ''.join(lines)
+
+LOG_LEVELS = ('info', 'warning', 'error', 'summary')
+
+def log(level, msg=''):
+    """print와 같지만 메시지 레벨(LOG_LEVELS)을 함께 넘깁니다. run_log.RunLog stage 안(또는 병렬 작업의 출력 수집 중)이면
+    그 레벨로 기록되고, 그 밖에서는 print와 같습니다. (레벨 없이 print한 출력은 info)"""
+    write_log = getattr(sys.stdout, 'write_log', None)
+    if write_log is None:
+        print(msg)
+    else:
+        write_log(level, str(msg))
+
+def progress(n=1):
+    """RunLog stage 진행률: 항목(파일/base) n개 처리 끝남. stage 밖이면 아무것도 하지 않습니다."""
+    add_progress = getattr(sys.stdout, 'progress', None)
+    if add_progress is not None:
+        add_progress(n)
+
+class _CapturedOutput:
+    """process pool 작업의 출력 수집: print 출력과 log()의 레벨을 [(레벨 또는 None, 텍스트)]로 모읍니다."""
+    def __init__(self):
+        self.records = []
+
+    def write(self, text):
+        if text:
+            self.records.append((None, text))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def write_log(self, level, msg):
+        self.records.append((level, msg))
+
+def _replay_output(records):
+    for level, text in records:
+        if level is None:
+            sys.stdout.write(text)
+        else:
+            log(level, text)
+
+def _run_captured(func, default, item):
+    """process pool 작업 단위: 출력(print/log)을 모아서 (결과, 출력 기록, metrics 카운터)로 반환."""
+    take_counters()  # 이전 작업에서 센 값 제외
+    buf = _CapturedOutput()
+    with redirect_stdout(buf):
+        try:
+            result = func(item)
+        except Exception as e:
+            log('error', f"오류 발생: {item} - {e}")
+            log('error', traceback.format_exc().rstrip('\n'))
+            result = default
+    return result, buf.records, take_counters()
+
+def run_jobs(func, items, jobs=1, default=None):
+    """items 순서대로 (item, func(item))을 yield합니다.
+    jobs > 1이면 process pool에서 병렬 실행하고, 각 작업의 출력은 작업 단위로 모아 items 순서대로 출력합니다.
+    (자식 프로세스에서 센 metrics 카운터도 현재 프로세스에 합칩니다)
+    func는 pickle 가능한 모듈 최상위 함수(또는 그 partial)여야 합니다."""
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        for item in items:
+            yield item, func(item)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(partial(_run_captured, func, default), items, chunksize=max(1, len(items) // (jobs * 8)))
+        for item, (result, output, counts) in zip(items, results):
+            _replay_output(output)
+            merge_counters(counts)
+            yield item, result
+
 def find_mp4_path(base_filename, target_path):
     """target_path에서 base_filename으로 시작하는 .mp4 파일 경로 찾기."""
     for root, dirs, files in os.walk(target_path, topdown=True):
@@ -108,22 +398,27 @@ def find_mp4_path(base_filename, target_path):
                 return Path(root) / file
     return None
 
-def find_mp4_srt_status(target_path):
-    """target_path에서 모든 MP4 파일을 검색하고, SRT 파일 유무 확인. (하위 경로 포함, 휴지통 스킵)"""
+def find_mp4_srt_status(target_path, index=None):
+    """target_path에서 모든 MP4 파일을 검색하고, SRT 파일 유무 확인. (하위 경로 포함, 휴지통 스킵)
+    index(volume_index) 지정 시 디스크를 다시 탐색하지 않고 인덱스로 확인합니다."""
+    if index is None:
+        from volume_index import build_volume_index  # volume_index가 utils를 import하므로 지연 import
+        index = build_volume_index(target_path)
     mp4_without_srt = []
     total_mp4 = 0
-    for root, dirs, files in os.walk(target_path, topdown=True):
-        # 휴지통 디렉토리 스킵
-        dirs[:] = [d for d in dirs if not is_trash_path(Path(root) / d)]
-        if is_trash_path(Path(root)):
-            continue
-        
+    for dir_path, info in index['dirs'].items():
+        files = info['files']
+        # mp4_path.with_suffix('.srt').exists()와 같은 판단: Windows는 대소문자 무시 (X.mp4 옆의 X.SRT / x.srt도 존재),
+        # 그 외에는 이름이 정확히 같은 X.srt만 존재로 판단
+        fold = str.lower if os.name == 'nt' else str
+        srt_names = {fold(name): name for name in files}
         for file in files:
             if file.lower().endswith('.mp4'):
-                mp4_path = Path(root) / file
-                srt_path = mp4_path.with_suffix('.srt')
+                mp4_path = Path(dir_path) / file
                 total_mp4 += 1
-                if srt_path.exists():
+                srt_name = srt_names.get(fold(Path(file).stem + '.srt'))
+                if srt_name is not None:
+                    srt_path = mp4_path.parent / srt_name
                     print(f"OK: {mp4_path} - SRT 존재 ({srt_path})")
                 else:
                     print(f"경고: {mp4_path} - SRT 없음")
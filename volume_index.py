@@ -0,0 +1,199 @@
+# volume_index.py (볼륨 인덱스: 한 번의 os.scandir 탐색으로 mp4/srt 목록을 만들고 SRT_HOME에 저장)
+import bisect
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from utils import get_base_filename, is_trash_path, log
+
+INDEX_VERSION = 1
+INDEX_EXTS = ('.mp4', '.srt')
+DEFAULT_WALK_WORKERS = 8
+
+def get_volume_index_path(srt_home, target_path):
+    key = hashlib.sha1(str(Path(target_path).resolve()).encode('utf-8')).hexdigest()[:12]
+    return Path(srt_home) / 'cache' / f"volume_index_{key}.json"
+
+def _is_under(real_path, home_real):
+    return real_path == home_real or real_path.startswith(home_real.rstrip(os.sep) + os.sep)
+
+def _scan_dir(dir_path):
+    """dir_path 한 단계를 scandir로 읽어 (mtime_ns, 하위 디렉토리 이름 목록, {파일명: [size, mtime_ns]}) 반환."""
+    subdirs = []
+    files = {}
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not is_trash_path(entry.name):
+                        subdirs.append(entry.name)
+                elif entry.name.lower().endswith(INDEX_EXTS) and entry.is_file():
+                    st = entry.stat()
+                    files[entry.name] = [st.st_size, st.st_mtime_ns]
+            except OSError:
+                continue
+    return os.stat(dir_path).st_mtime_ns, subdirs, files
+
+def _visit_dir(dir_path, real_path, home_real, previous_dirs):
+    """디렉토리 하나 처리: (dir_path, real_path, info, 다시 읽었는지) 반환. SRT_HOME이거나 읽기 실패 시 None."""
+    if home_real and _is_under(real_path, home_real):
+        return None
+    try:
+        old = previous_dirs.get(dir_path)
+        if old is not None and os.stat(dir_path).st_mtime_ns == old['mtime_ns']:
+            return dir_path, real_path, old, False  # 변경 없음: 이전 목록 재사용
+        mtime_ns, subdirs, files = _scan_dir(dir_path)
+    except OSError as e:
+        log('warning', f"경고: 디렉토리 읽기 실패: {dir_path} - {e}")
+        return None
+    return dir_path, real_path, {'mtime_ns': mtime_ns, 'subdirs': subdirs, 'files': files}, True
+
+def _children(dir_path, real_path, info):
+    return [(os.path.join(dir_path, name), os.path.join(real_path, name)) for name in info['subdirs']]
+
+def walk_volume(target_path, srt_home=None, previous_dirs=None, workers=1):
+    """target_path 아래 디렉토리를 (dir_path, info, 다시 읽었는지)로 스트림 반환합니다. (휴지통, SRT_HOME 스킵)
+    workers > 1이면 스레드 풀로 디렉토리 목록 읽기를 겹쳐 실행하며, 결과는 완료 순서로 나옵니다."""
+    root = str(target_path)
+    if is_trash_path(root):
+        return
+    previous_dirs = previous_dirs or {}
+    home_real = str(Path(srt_home).resolve()) if srt_home else None
+    start = (root, str(Path(root).resolve()))
+
+    if workers <= 1:
+        stack = [start]
+        while stack:
+            result = _visit_dir(*stack.pop(), home_real, previous_dirs)
+            if result is None:
+                continue
+            dir_path, real_path, info, scanned = result
+            yield dir_path, info, scanned
+            stack.extend(reversed(_children(dir_path, real_path, info)))
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_visit_dir, *start, home_real, previous_dirs)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result is None:
+                    continue
+                dir_path, real_path, info, scanned = result
+                for child in _children(dir_path, real_path, info):
+                    pending.add(pool.submit(_visit_dir, *child, home_real, previous_dirs))
+                yield dir_path, info, scanned
+
+def _preorder(root, dirs):
+    """dirs를 os.walk(topdown)와 같은 순서로 재배열 (병렬 탐색 결과를 결정적으로 만들기 위함)."""
+    ordered = {}
+    stack = [root]
+    while stack:
+        dir_path = stack.pop()
+        info = dirs.get(dir_path)
+        if info is None:
+            continue
+        ordered[dir_path] = info
+        stack.extend(os.path.join(dir_path, name) for name in reversed(info['subdirs']))
+    return ordered
+
+def build_volume_index(target_path, srt_home=None, previous=None, workers=DEFAULT_WALK_WORKERS):
+    """target_path 아래 전체를 탐색해 디렉토리별 mp4/srt 목록을 만듭니다. (휴지통, SRT_HOME 스킵)
+    previous(이전 인덱스) 지정 시 증분 모드: 모든 디렉토리는 stat만 하고, mtime이 바뀐 디렉토리만 다시 읽습니다.
+    (디렉토리 mtime은 직속 항목 추가/삭제/이름 변경에만 바뀌므로 하위 디렉토리 stat은 생략할 수 없음)"""
+    root = str(target_path)
+    previous_dirs = previous['dirs'] if previous and previous.get('root') == root else {}
+    dirs = {}
+    scanned = 0
+    for dir_path, info, rescanned in walk_volume(target_path, srt_home, previous_dirs, workers):
+        dirs[dir_path] = info
+        scanned += rescanned
+    if workers > 1:
+        dirs = _preorder(root, dirs)
+    if previous_dirs:
+        print(f"볼륨 인덱스 증분 갱신: 디렉토리 {len(dirs)}개 중 {scanned}개 다시 읽음")
+    return {'version': INDEX_VERSION, 'root': root, 'dirs': dirs}
+
+def save_volume_index(index, srt_home):
+    index_path = get_volume_index_path(srt_home, index['root'])
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    data = {k: v for k, v in index.items() if not k.startswith('_')}
+    tmp_path = index_path.with_name(index_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+
+def load_volume_index(srt_home, target_path):
+    index_path = get_volume_index_path(srt_home, target_path)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get('version') != INDEX_VERSION or index.get('root') != str(target_path):
+        return None
+    return index
+
+def get_volume_index(target_path, srt_home, rescan=False, workers=DEFAULT_WALK_WORKERS):
+    """저장된 인덱스가 있으면 디렉토리 mtime 기준으로 증분 갱신하고, 없거나 rescan=True이면 전체 탐색합니다. 결과는 저장됩니다."""
+    previous = None if rescan else load_volume_index(srt_home, target_path)
+    index = build_volume_index(target_path, srt_home, previous, workers)
+    save_volume_index(index, srt_home)
+    return index
+
+def iter_index_files(index, ext):
+    """인덱스의 ext(e.g., '.srt') 파일을 (Path, size, mtime_ns)로 순회합니다."""
+    for dir_path, info in index['dirs'].items():
+        for name, (size, mtime_ns) in info['files'].items():
+            if name.lower().endswith(ext):
+                yield Path(dir_path) / name, size, mtime_ns
+
+def _mp4_bases(index):
+    """base_filename → mp4 경로 목록, 정렬된 base 목록, base → 첫 mp4의 탐색 순서 (메모리에만 유지)."""
+    if '_mp4_bases' not in index:
+        bases = {}
+        first = {}
+        for position, (path, _, _) in enumerate(iter_index_files(index, '.mp4')):
+            base = get_base_filename(path.name)
+            bases.setdefault(base, []).append(path)
+            first.setdefault(base, position)
+        index['_mp4_bases'] = (bases, sorted(bases), first)
+    return index['_mp4_bases']
+
+def find_mp4_in_index(index, base_filename):
+    """find_mp4_path와 같은 규칙(파일명이 base_filename으로 시작하는 .mp4 중 탐색 순서로 첫 파일)을 인덱스 조회로 처리합니다.
+    (e.g., HMN-520 → HMN-520.mp4 또는 HMN-520-C.mp4, 인덱스의 dirs는 os.walk와 같은 순서)"""
+    bases, sorted_bases, first = _mp4_bases(index)
+    # 파일명이 base_filename으로 시작 ⇔ 파일의 base가 base_filename으로 시작 (base_filename에는 '.', '_' 없음)
+    i = bisect.bisect_left(sorted_bases, base_filename)
+    matches = []
+    while i < len(sorted_bases) and sorted_bases[i].startswith(base_filename):
+        matches.append(sorted_bases[i])
+        i += 1
+    if not matches:
+        return None
+    base = min(matches, key=first.__getitem__)
+    if len(matches) > 1:
+        log('warning', f"경고: {base_filename}으로 시작하는 mp4 base가 여러 개입니다 ({', '.join(matches)}). 탐색 순서로 첫 파일 사용: {bases[base][0]}")
+    return bases[base][0]
+
+def add_index_file(index, path):
+    """이동/생성된 파일을 인덱스에 반영합니다."""
+    path = Path(path)
+    info = index['dirs'].get(str(path.parent))
+    if info is None or not path.name.lower().endswith(INDEX_EXTS):
+        return
+    try:
+        st = path.stat()
+    except OSError:
+        return
+    info['files'][path.name] = [st.st_size, st.st_mtime_ns]
+    index.pop('_mp4_bases', None)
+
+def remove_index_file(index, path):
+    path = Path(path)
+    info = index['dirs'].get(str(path.parent))
+    if info is not None and info['files'].pop(path.name, None) is not None:
+        index.pop('_mp4_bases', None)
@@ -0,0 +1,198 @@
+# watch_trans.py (trans_separate 감시: base_filename의 번역 chunk가 모두 도착하면 그 base만 restore → merge → compare)
+import argparse
+import os
+import time
+from pathlib import Path
+from utils import get_srt_home, get_base_filename, list_srt_names, names_with_prefix
+from restore_srt import restore_srt_file
+from merge_srt import merge_srt_file
+from compare_srt import compare_srt_file
+from compare_all import place_translation
+from volume_index import get_volume_index, save_volume_index, DEFAULT_WALK_WORKERS
+from srt_cache import get_parse_cache_dir
+from chunk_manifest import scan_separated_dir
+from state_store import load_state, save_state
+from translation_memory import get_tm_path, open_tm, add_pairs
+
+FULL_SCAN_EVERY = 12  # 디렉토리 mtime이 그대로여도 이 횟수마다 한 번은 전체 확인 (제자리 수정된 chunk 대비)
+PLACE_RETRY_MAX = 64  # mp4 경로 이동 재시도 간격 최대 (확인 횟수). 실패할 때마다 간격 2배 (재시도마다 볼륨 인덱스 갱신)
+
+def list_base_chunks(origin_separate_dir):
+    """{base_filename: [(chunk 이름, manifest의 블록 수 또는 None)]} (manifest 순서, manifest 없는 chunk는 이름 순)."""
+    manifests, loose_chunks = scan_separated_dir(origin_separate_dir)
+    bases = {}
+    for stem in sorted(manifests):
+        bases.setdefault(get_base_filename(stem), []).extend((chunk['name'], chunk['blocks']) for chunk in manifests[stem]['chunks'])
+    for file in sorted(loose_chunks):
+        bases.setdefault(get_base_filename(file.stem), []).append((file.name, None))
+    return bases
+
+def chunk_signature(trans_separate_dir, names):
+    """번역 chunk별 (크기, mtime_ns) 튜플. 없는 chunk는 None."""
+    signature = []
+    for name in names:
+        try:
+            st = os.stat(trans_separate_dir / name)
+        except OSError:
+            signature.append(None)
+            continue
+        signature.append((st.st_size, st.st_mtime_ns))
+    return tuple(signature)
+
+def _dir_stamp(*dirs):
+    stamp = []
+    for dir_path in dirs:
+        try:
+            stamp.append(os.stat(dir_path).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def process_base(base, chunks, srt_home_path, cache_dir=None, state=None, tm_path=None):
+    """base 하나의 restore(메모리) → merge → compare, OK 시 번역 메모리에 추가. 비교 OK이면 True (trans에 번역 srt 있음)."""
+    origin_separate_dir = srt_home_path / 'origin_separate'
+    trans_separate_dir = srt_home_path / 'trans_separate'
+    trans_dir = srt_home_path / 'trans'
+    docs = {}
+    tm_pairs = [] if tm_path is not None else None
+    for name, expected_blocks in chunks:
+        if not restore_srt_file(origin_separate_dir / name, origin_separate_dir, trans_separate_dir, cache_dir, docs=docs, write=False,
+                                expected_blocks=expected_blocks, tm_pairs=tm_pairs):
+            return False
+    if not merge_srt_file(base, None, origin_separate_dir, trans_separate_dir, trans_dir, docs=docs):
+        return False
+    if not compare_srt_file(base, srt_home_path / 'origin', trans_dir, cache_dir, origin_separate_dir):
+        return False
+    if tm_pairs:
+        conn = open_tm(tm_path)
+        try:
+            print(f"번역 메모리 추가: {add_pairs(conn, tm_pairs)}개")
+        finally:
+            conn.close()
+    return True
+
+def place_base(base, srt_home_path, index, state=None):
+    """비교 OK인 base의 번역 srt를 mp4 경로로 이동. 이동했으면 True."""
+    trans_dir = srt_home_path / 'trans'
+    srt_files = [trans_dir / name for name in names_with_prefix(list_srt_names(trans_dir), base)]
+    return place_translation(base, srt_files, srt_home_path, index, state=state)
+
+def watch_trans(srt_home_path, target_path, interval=5.0, settle=2.0, once=False, cache_dir=None, state=None, tm_path=None,
+                walk_workers=DEFAULT_WALK_WORKERS):
+    """interval초마다 origin_separate/trans_separate를 확인합니다. base의 번역 chunk가 모두 있고 settle초 동안 바뀌지 않으면 처리합니다.
+    restore/merge/compare에 실패한 base는 번역 chunk가 다시 바뀔 때까지 건너뛰고, 비교 OK지만 mp4가 없거나 이동에 실패한 base는
+    이동만 다시 시도합니다. 재시도 간격은 실패할 때마다 1, 2, 4, ... 확인(최대 PLACE_RETRY_MAX)으로 늘립니다.
+    (볼륨 인덱스 증분 갱신도 대상 디렉토리를 모두 stat하므로 mp4가 끝내 없는 base 때문에 확인마다 갱신하지 않도록)
+    once=True이면 한 번만 확인하고 종료합니다."""
+    origin_separate_dir = srt_home_path / 'origin_separate'
+    trans_separate_dir = srt_home_path / 'trans_separate'
+    index = None
+    seen = {}      # base → (signature, 마지막 변경 시각)
+    handled = {}   # base → 처리한 signature
+    unplaced = {}  # 비교 OK, mp4 경로로 아직 못 옮긴 base → (다음 재시도 확인 번호, 재시도 간격)
+    stamp = None
+    polls = 0
+    ok_count = 0
+    failed = 0
+
+    index_fresh = False
+
+    def refresh_index():
+        # 이동할 base가 있는 확인마다 한 번: 지난 갱신 이후 추가/삭제된 mp4 반영 (mtime이 바뀐 디렉토리만 다시 읽음)
+        nonlocal index, index_fresh
+        if not index_fresh:
+            index = get_volume_index(target_path, srt_home_path, workers=walk_workers)
+            index_fresh = True
+        return index
+
+    try:
+        while True:
+            index_fresh = False
+            for base in sorted(base for base, (due, _) in unplaced.items() if due <= polls):
+                if place_base(base, srt_home_path, refresh_index(), state):
+                    unplaced.pop(base)
+                    ok_count += 1
+                    print(f"완료: {base}")
+                else:
+                    delay = min(unplaced[base][1] * 2, PLACE_RETRY_MAX)
+                    unplaced[base] = (polls + delay, delay)
+            new_stamp = _dir_stamp(origin_separate_dir, trans_separate_dir)
+            settling = any(base not in handled or handled[base] != sig for base, (sig, _) in seen.items() if None not in sig)
+            if new_stamp != stamp or settling or polls % FULL_SCAN_EVERY == 0:
+                stamp = new_stamp
+                bases = list_base_chunks(origin_separate_dir) if origin_separate_dir.is_dir() else {}
+                now = time.monotonic()
+                for base in list(seen):
+                    if base not in bases:
+                        seen.pop(base)
+                        handled.pop(base, None)
+                        unplaced.pop(base, None)
+                for base in sorted(bases):
+                    chunks = bases[base]
+                    signature = chunk_signature(trans_separate_dir, [name for name, _ in chunks])
+                    previous = seen.get(base)
+                    if previous is None or previous[0] != signature:
+                        present = sum(1 for item in signature if item is not None)
+                        if previous is None or present != sum(1 for item in previous[0] if item is not None):
+                            print(f"진행: {base} - 번역 chunk {present}/{len(chunks)}개")
+                        seen[base] = (signature, now)
+                    changed_at = seen[base][1]
+                    if None in signature or handled.get(base) == signature:
+                        continue
+                    if not once and now - changed_at < settle:
+                        continue
+                    print(f"\n--- {base} 처리 ({len(chunks)}개 chunk) ---")
+                    handled[base] = signature
+                    unplaced.pop(base, None)
+                    if not process_base(base, chunks, srt_home_path, cache_dir, state, tm_path):
+                        failed += 1
+                        print(f"처리 실패: {base} - 번역 chunk가 바뀌면 다시 처리합니다.")
+                    else:
+                        if place_base(base, srt_home_path, refresh_index(), state):
+                            ok_count += 1
+                            print(f"완료: {base}")
+                        else:
+                            unplaced[base] = (polls + 1, 1)
+                            print(f"이동 대기: {base} - mp4 경로로 이동을 다시 시도합니다. (실패할 때마다 간격을 늘림)")
+                    save_state(state)
+            if index_fresh:
+                save_volume_index(index, srt_home_path)
+            polls += 1
+            if once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n중지됨")
+    finally:
+        if index is not None:
+            save_volume_index(index, srt_home_path)
+        save_state(state)
+    print(f"요약: 완료 {ok_count}개, 실패 {failed}개" + (f", 이동 대기 {len(unplaced)}개" if unplaced else ""))
+    return ok_count, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="SRT_HOME/trans_separate를 감시해 번역 chunk가 모두 도착한 base_filename부터 restore → merge → compare를 실행합니다. (Ctrl+C로 종료)")
+    parser.add_argument('-t', '--target', help="mp4 검색 대상 경로 (기본: Windows V:/, Linux /home)")
+    parser.add_argument('-s', '--srt_home', help="SRT_HOME 경로 (기본: Windows V:/srt_home, Linux /home/srt_home)")
+    parser.add_argument('--interval', type=float, default=5.0, help="확인 간격 (초, 기본: 5)")
+    parser.add_argument('--settle', type=float, default=2.0, help="마지막 chunk 도착 후 파일이 바뀌지 않아야 하는 시간 (초, 기본: 2, 쓰는 중인 파일 처리 방지)")
+    parser.add_argument('--once', action="store_true", help="한 번만 확인하고 종료 (완료된 base는 바로 처리)")
+    parser.add_argument('--no-cache', action="store_true", help="파싱 캐시(SRT_HOME/cache/parsed)와 처리 상태(SRT_HOME/cache/state.json) 사용 안 함")
+    parser.add_argument('--no-tm', action="store_true", help="복원한 원문/번역 대사를 번역 메모리(SRT_HOME/cache/tm.sqlite)에 추가하지 않음")
+    parser.add_argument('--walk-workers', type=int, default=DEFAULT_WALK_WORKERS, help=f"디렉토리 병렬 탐색 스레드 수 (기본: {DEFAULT_WALK_WORKERS}, 1이면 순차)")
+    args = parser.parse_args()
+
+    srt_home_path = Path(args.srt_home) if args.srt_home else get_srt_home()
+    target_path = Path(args.target) if args.target else (Path('V:/') if os.name == 'nt' else Path('/home'))
+
+    print(f"SRT_HOME: {srt_home_path}")
+    print(f"mp4 검색 경로: {target_path}")
+    print(f"감시 중: {srt_home_path / 'trans_separate'} ({args.interval}초 간격)")
+
+    cache_dir = None if args.no_cache else get_parse_cache_dir(srt_home_path)
+    state = None if args.no_cache else load_state(srt_home_path)
+    tm_path = None if args.no_tm else get_tm_path(srt_home_path)
+    watch_trans(srt_home_path, target_path, args.interval, args.settle, args.once, cache_dir, state, tm_path, args.walk_workers)
+
+if __name__ == "__main__":
+    main()